@@ -0,0 +1,244 @@
+# ==================== IMPORTS ====================
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_cache import normalize_text
+
+# ==================== DEFAULTS ====================
+# Cosine similarity above which two questions count as the same question
+SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2048"))
+TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+TOOL_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "512"))
+
+# Words, keeping dotted and hyphenated numbers ("3.1", "4-b") whole
+_WORD_PATTERN = re.compile(r"\w+(?:[.\-]\w+)*")
+
+
+def specific_tokens(question):
+    """
+    Tokens naming one specific thing, which a near-duplicate must repeat exactly
+
+    Embeddings barely separate "theorem 3.1" from "theorem 3.2", so a
+    semantic hit also requires the same numbers and identifiers.
+
+    Args:
+        question (str): The user's question
+
+    Returns:
+        tuple: Sorted lowercase tokens with a digit ("3.1", "4a"), an
+            underscore ("x_i") or a capital after the first letter ("DNA", "NaCl")
+    """
+    return tuple(sorted(
+        word.lower() for word in _WORD_PATTERN.findall(normalize_text(question))
+        if "_" in word or any(c.isdigit() for c in word) or any(c.isupper() for c in word[1:])
+    ))
+
+
+# ==================== SEMANTIC ANSWER CACHE ====================
+class SemanticAnswerCache:
+    """
+    In-memory answer cache with exact and near-duplicate question matching
+
+    A near duplicate must also have the same ``specific_tokens`` (numbers
+    and identifiers) as the cached question. Entries are namespaced by (document set, model, temperature, max_tokens),
+    so an answer is only ever reused for the same documents and generation
+    settings. Eviction is LRU with a per-entry time-to-live.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS,
+                 similarity_threshold=SIMILARITY_THRESHOLD):
+        """
+        Args:
+            max_entries (int): Entries kept before the least recently used is evicted
+            ttl_seconds (float): Age after which an entry is discarded
+            similarity_threshold (float): Minimum cosine similarity for a near-duplicate hit
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()  # (namespace, normalized question) -> entry
+        self._lock = threading.Lock()
+        self._counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def namespace(document_set, model_name, temperature, max_tokens, retrieval=()):
+        """
+        Build the key part shared by every question about the same setup
+
+        Args:
+            retrieval (tuple): Retrieval settings the answers depend on
+                (mode, reranking, context packing...)
+
+        Returns:
+            tuple: Hashable namespace
+        """
+        return (document_set, model_name, round(float(temperature), 4), int(max_tokens), tuple(retrieval))
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, entry, now):
+        return now - entry["created_at"] > self.ttl_seconds
+
+    def lookup(self, namespace, question, question_vector=None):
+        """
+        Find a cached answer for a question
+
+        Args:
+            namespace (tuple): Value from ``namespace()``
+            question (str): The user's question
+            question_vector (list[float]): Question embedding; enables near-duplicate
+                matching among cached questions with the same ``specific_tokens``
+
+        Returns:
+            dict or None: ``{"payload", "match", "similarity"}`` on a hit, None on a miss
+        """
+        key = (namespace, normalize_text(question).lower())
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._expired(entry, now):
+                del self._entries[key]
+                entry = None
+            if entry:
+                self._entries.move_to_end(key)
+                self._counters["exact_hits"] += 1
+                return {"payload": entry["payload"], "match": "exact", "similarity": 1.0}
+
+            if question_vector is not None:
+                tokens = specific_tokens(question)
+                candidates = [
+                    (k, e) for k, e in self._entries.items()
+                    if k[0] == namespace and e["tokens"] == tokens and not self._expired(e, now)
+                ]
+                if candidates:
+                    # One matrix-vector product scores every cached question at once
+                    matrix = np.stack([e["vector"] for _, e in candidates])
+                    scores = matrix @ self._unit(question_vector)
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.similarity_threshold:
+                        best_key, best_entry = candidates[best]
+                        self._entries.move_to_end(best_key)
+                        self._counters["semantic_hits"] += 1
+                        return {
+                            "payload": best_entry["payload"],
+                            "match": "semantic",
+                            "similarity": round(float(scores[best]), 4)
+                        }
+
+            self._counters["misses"] += 1
+            return None
+
+    def store(self, namespace, question, question_vector, payload):
+        """
+        Remember the answer to a question
+
+        Args:
+            namespace (tuple): Value from ``namespace()``
+            question (str): The user's question
+            question_vector (list[float]): Question embedding
+            payload (dict): Whatever the caller needs to replay the answer
+        """
+        key = (namespace, normalize_text(question).lower())
+        with self._lock:
+            self._entries[key] = {
+                "vector": self._unit(question_vector),
+                "tokens": specific_tokens(question),
+                "payload": payload,
+                "created_at": time.time()
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def stats(self):
+        """
+        Hit-rate statistics since the process started
+
+        Returns:
+            dict: Counters plus lookups, hit_rate and current size
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        stats["lookups"] = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / stats["lookups"], 3) if stats["lookups"] else 0.0
+        return stats
+
+
+# ==================== TOOL RESULT CACHE ====================
+class ToolResultCache:
+    """
+    In-memory results of the learning tools (summary, MCQs, explanation)
+
+    Keyed by the same namespace as answers plus the tool name, so results
+    survive Streamlit reruns and are reused by later sessions working on
+    the same documents and settings. Eviction is LRU with a time-to-live.
+    """
+
+    def __init__(self, max_entries=TOOL_MAX_ENTRIES, ttl_seconds=TTL_SECONDS):
+        """
+        Args:
+            max_entries (int): Results kept before the least recently used is evicted
+            ttl_seconds (float): Age after which a result is discarded
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # (namespace, tool) -> entry
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def get(self, namespace, tool):
+        """
+        Args:
+            namespace (tuple): Value from ``SemanticAnswerCache.namespace()``
+            tool (str): Tool name (including any variant, e.g. "summary:whole")
+
+        Returns:
+            dict or None: The stored result
+        """
+        key = (namespace, tool)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry["created_at"] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry["payload"]
+
+    def put(self, namespace, tool, payload):
+        """
+        Args:
+            namespace (tuple): Value from ``SemanticAnswerCache.namespace()``
+            tool (str): Tool name
+            payload (dict): The tool's result
+        """
+        key = (namespace, tool)
+        with self._lock:
+            self._entries[key] = {"payload": payload, "created_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses and current size
+        """
+        with self._lock:
+            return dict(self._counters, size=len(self._entries))
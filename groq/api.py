@@ -0,0 +1,265 @@
+"""
+HTTP service for the Smart Academic Assistant
+
+Exposes ingestion, question answering (plain and SSE-streamed) and the
+learning tools over a shared in-process corpus store, so many clients can
+query the same ingested course without rebuilding its index.
+
+Run with:
+    cd groq && uvicorn api:app --host 0.0.0.0 --port 8000
+
+Set ACADEMIC_ASSISTANT_LLM=stub to answer with a local stub model (no API key).
+"""
+# ==================== IMPORTS ====================
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from langchain_core.language_models import FakeListChatModel
+from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse
+
+from index_store import document_set_key, file_key
+from llm_client import PooledChatGroq
+from model_limits import completion_limit
+from pipeline import DEFAULT_MODEL, AcademicPipeline
+from rerank import RERANK_BUDGET_MS, RERANK_BY_DEFAULT
+from shared_models import (
+    get_answer_cache, get_index_store, get_llm_client, get_reranker, warm_up_embedding_model
+)
+from telemetry import get_metrics
+
+# ==================== LLM FACTORIES ====================
+STUB_ANSWER = "This is a stub answer generated without calling Groq."
+
+
+def groq_llm_factory(model_name, temperature, max_tokens):
+    """Build a Groq chat model from GROQ_API_KEY, served by the shared pooled client"""
+    load_dotenv()
+    groq_api_key = os.getenv("GROQ_API_KEY")
+    if not groq_api_key:
+        raise HTTPException(status_code=503, detail="GROQ_API_KEY not found in the server environment.")
+    return PooledChatGroq(
+        client=get_llm_client(),
+        groq_api_key=groq_api_key,
+        model_name=model_name,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+
+
+def stub_llm_factory(model_name, temperature, max_tokens):
+    """Deterministic local model for tests and load checks"""
+    return FakeListChatModel(responses=[STUB_ANSWER])
+
+
+# ==================== SHARED CORPUS STORE ====================
+class CorpusStore:
+    """
+    Document sets ingested by this process
+
+    Only the upload order of each set is kept here. Every request opens its
+    set through the index store, leasing the shared mapped index for as long
+    as the request's pipeline lives, so sets nobody asks about are unmapped
+    once they have been idle for SHARED_INDEX_IDLE_SECONDS.
+    """
+
+    def __init__(self):
+        self._corpora = {}
+        self._lock = threading.Lock()
+
+    def get(self, document_set):
+        """
+        Returns:
+            dict: File hash -> display name in upload order, or None if never ingested
+        """
+        with self._lock:
+            return self._corpora.get(document_set)
+
+    def put(self, document_set, files):
+        with self._lock:
+            self._corpora[document_set] = files
+
+    def __len__(self):
+        return len(self._corpora)
+
+
+# ==================== REQUEST MODELS ====================
+class GenerationSettings(BaseModel):
+    document_set: str
+    model: str = DEFAULT_MODEL
+    temperature: float = 0.5
+    max_tokens: int = 3072
+
+
+class AskRequest(GenerationSettings):
+    question: str
+    rerank: bool = RERANK_BY_DEFAULT
+    rerank_budget_ms: float = RERANK_BUDGET_MS
+
+
+class SummaryRequest(GenerationSettings):
+    whole_document: bool = True
+
+
+# ==================== APPLICATION ====================
+def create_app(llm_factory=None, embeddings=None):
+    """
+    Build the FastAPI application
+
+    Args:
+        llm_factory (callable): ``llm_factory(model, temperature, max_tokens)``
+            returning a chat model (Groq by default, stub if ACADEMIC_ASSISTANT_LLM=stub)
+        embeddings (Embeddings): Embedding model override (shared model by default)
+
+    Returns:
+        FastAPI: The service
+    """
+    if llm_factory is None:
+        use_stub = os.getenv("ACADEMIC_ASSISTANT_LLM", "groq") == "stub"
+        llm_factory = stub_llm_factory if use_stub else groq_llm_factory
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Load the shared embedding model before the first request arrives
+        if embeddings is None:
+            await run_in_threadpool(warm_up_embedding_model)
+        # Same for the cross-encoder when requests rerank unless told otherwise
+        if RERANK_BY_DEFAULT:
+            await run_in_threadpool(get_reranker)
+        yield
+
+    app = FastAPI(title="Smart Academic Assistant", lifespan=lifespan)
+    corpora = CorpusStore()
+
+    def pipeline_for(settings):
+        """
+        Pipeline with the requested settings, attached to a shared corpus
+
+        Blocking (index mapping, BM25, reranker loading), so async endpoints
+        call it through ``run_in_threadpool``.
+        """
+        files = corpora.get(settings.document_set)
+        if files is None:
+            raise HTTPException(status_code=404, detail="Unknown document_set; ingest the documents first.")
+        max_tokens = completion_limit(settings.model, settings.max_tokens)
+        rerank = getattr(settings, "rerank", False)
+        pipeline = AcademicPipeline(
+            llm_factory(settings.model, settings.temperature, max_tokens),
+            model_name=settings.model,
+            temperature=settings.temperature,
+            max_tokens=max_tokens,
+            embeddings=embeddings,
+            rerank=rerank,
+            rerank_budget_ms=getattr(settings, "rerank_budget_ms", RERANK_BUDGET_MS),
+            reranker=get_reranker() if rerank else None
+        )
+        if not pipeline.open(settings.document_set, files):
+            raise HTTPException(status_code=404, detail="The document_set is no longer stored; ingest it again.")
+        return pipeline
+
+    async def open_pipeline(settings):
+        """``pipeline_for`` off the event loop"""
+        return await run_in_threadpool(pipeline_for, settings)
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", "document_sets": len(corpora)}
+
+    @app.get("/stats")
+    def stats():
+        return {
+            "document_sets": len(corpora),
+            "answer_cache": get_answer_cache().stats(),
+            "shared_indexes": get_index_store().stats(),
+            "llm_client": get_llm_client().stats()
+        }
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        """Stage latencies, request and token counters in Prometheus text format"""
+        return PlainTextResponse(get_metrics().prometheus_text(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/traces", response_class=PlainTextResponse)
+    def traces():
+        """Recent request traces as JSON lines"""
+        return PlainTextResponse(get_metrics().to_jsonl(), media_type="application/x-ndjson")
+
+    @app.post("/ingest")
+    async def ingest(files: list[UploadFile] = File(...)):
+        uploads = [(upload.filename, await upload.read()) for upload in files]
+
+        # Already ingested by this process: nothing to parse, load or embed
+        files = {}
+        for name, data in uploads:
+            files.setdefault(file_key(data), name)
+        document_set = document_set_key(files)
+        if corpora.get(document_set) is not None:
+            return {"document_set": document_set, "status": "shared", "errors": []}
+
+        # Parsing and embedding are blocking, so run them off the event loop
+        pipeline = AcademicPipeline(None, embeddings=embeddings)
+        report = await run_in_threadpool(pipeline.ingest, uploads)
+        if not pipeline.ready:
+            raise HTTPException(status_code=422, detail={"message": "No valid documents to process.",
+                                                         "errors": report["errors"]})
+        corpora.put(pipeline.document_set, files)
+        return report
+
+    @app.post("/ask")
+    async def ask(request: AskRequest):
+        pipeline = await open_pipeline(request)
+        result, hit = await pipeline.aask(request.question)
+        return dict(result, cached=bool(hit))
+
+    @app.post("/ask/stream")
+    def ask_stream(request: AskRequest):
+        answer_stream = pipeline_for(request).stream_answer(request.question)
+
+        def events():
+            """Token events while generating, then one event with the structured answer"""
+            for token in answer_stream:
+                yield {"event": "token", "data": token}
+            result = dict(
+                answer_stream.result,
+                cached=bool(answer_stream.cache_hit),
+                seconds=round(answer_stream.seconds, 3),
+                first_token_seconds=round(answer_stream.first_token_seconds or 0.0, 3),
+                trace_id=answer_stream.trace.id
+            )
+            yield {"event": "result", "data": json.dumps(result)}
+
+        # sse_starlette iterates sync generators in a worker thread
+        return EventSourceResponse(events())
+
+    @app.post("/summarize")
+    async def summarize(request: SummaryRequest):
+        pipeline = await open_pipeline(request)
+        summary, timings = await pipeline.asummarize(request.whole_document)
+        return {"summary": summary, "timings": timings}
+
+    @app.post("/mcqs")
+    async def mcqs(request: GenerationSettings):
+        pipeline = await open_pipeline(request)
+        return {"mcqs": await pipeline.agenerate_mcqs()}
+
+    @app.post("/explain")
+    async def explain(request: GenerationSettings):
+        pipeline = await open_pipeline(request)
+        return {"explanation": await pipeline.aexplain()}
+
+    @app.post("/study-pack")
+    async def study_pack(request: SummaryRequest):
+        # Summary, MCQs and explanation concurrently; stored results are reused
+        pipeline = await open_pipeline(request)
+        return await pipeline.astudy_pack(request.whole_document)
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,172 @@
+"""
+Batch question answering from the command line
+
+Ingests a directory of documents once, then answers every question of a
+JSONL file with bounded concurrency and writes one JSON result per line.
+
+Input lines look like ``{"question": "...", "id": "q1"}``; any extra fields
+are copied to the output next to the structured answer.
+
+Usage:
+    python groq/batch_qa.py --docs readings/ --questions questions.jsonl \
+        --output answers.jsonl --concurrency 8
+"""
+# ==================== IMPORTS ====================
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from ingestion import IngestionProgress
+from pipeline import AVAILABLE_MODELS, DEFAULT_MODEL, RETRIEVAL_MODES, AcademicPipeline
+from rerank import RERANK_BUDGET_MS
+from telemetry import get_metrics
+
+
+# ==================== HELPERS ====================
+def log(message):
+    """Progress output goes to stderr so stdout can carry JSONL"""
+    print(message, file=sys.stderr, flush=True)
+
+
+def read_questions(path):
+    """
+    Read question records from a JSONL file
+
+    Args:
+        path (str): JSONL file ("-" for stdin)
+
+    Returns:
+        list[dict]: One record per non-empty line
+    """
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+
+async def answer_all(pipeline, records, concurrency, output):
+    """
+    Answer every record concurrently, writing results as they finish
+
+    Args:
+        pipeline (AcademicPipeline): Pipeline with documents already ingested
+        records (list[dict]): Question records
+        concurrency (int): Maximum questions in flight
+        output (file): Writable text stream for JSONL results
+
+    Returns:
+        dict: Counts of answered, cached and failed questions
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"answered": 0, "cached": 0, "failed": 0}
+
+    async def answer(line, record):
+        async with semaphore:
+            started = time.perf_counter()
+            result = dict(record, line=line)
+            try:
+                response, hit = await pipeline.aask(record["question"])
+                result.update(response)
+                result["cached"] = bool(hit)
+                counts["cached"] += bool(hit)
+                counts["answered"] += 1
+            except Exception as e:
+                # One bad question must not sink an overnight run
+                result["error"] = str(e)
+                counts["failed"] += 1
+            result["seconds"] = round(time.perf_counter() - started, 3)
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
+
+    await asyncio.gather(*(answer(line, record) for line, record in enumerate(records, 1)))
+    return counts
+
+
+# ==================== ENTRY POINT ====================
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions against a document directory.")
+    parser.add_argument("--docs", required=True, help="Directory of PDF/DOCX/TXT documents")
+    parser.add_argument("--questions", required=True, help="JSONL file of questions ('-' for stdin)")
+    parser.add_argument("--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Questions answered at the same time")
+    parser.add_argument("--model", default=DEFAULT_MODEL, choices=AVAILABLE_MODELS)
+    parser.add_argument("--temperature", type=float, default=0.5)
+    parser.add_argument("--max-tokens", type=int, default=3072)
+    parser.add_argument("--int8", action="store_true", help="Use the int8-quantized vector store")
+    parser.add_argument("--retrieval", default="hybrid", choices=RETRIEVAL_MODES,
+                        help="Hybrid BM25 + vector retrieval, or vector search only")
+    parser.add_argument("--rerank", action="store_true",
+                        help="Rerank over-fetched chunks with a local cross-encoder")
+    parser.add_argument("--rerank-budget-ms", type=float, default=RERANK_BUDGET_MS,
+                        help="Reranking time budget per question")
+    parser.add_argument("--no-answer-cache", action="store_true",
+                        help="Always call the LLM, even for repeated questions")
+    parser.add_argument("--trace-log", help="Append per-stage timing traces to this JSONL file")
+    parser.add_argument("--metrics", help="Write Prometheus text metrics to this file at the end")
+    args = parser.parse_args()
+
+    if args.trace_log:
+        get_metrics().jsonl_path = args.trace_log
+
+    # Load environment variables (for API keys)
+    load_dotenv()
+    groq_api_key = os.getenv("GROQ_API_KEY")
+    if not groq_api_key:
+        log("GROQ_API_KEY not found in your environment.")
+        return 1
+
+    pipeline = AcademicPipeline.from_settings(
+        groq_api_key,
+        model_name=args.model,
+        temperature=args.temperature,
+        max_tokens=args.max_tokens,
+        quantize=args.int8,
+        retrieval=args.retrieval,
+        rerank=args.rerank,
+        rerank_budget_ms=args.rerank_budget_ms,
+        use_answer_cache=not args.no_answer_cache
+    )
+
+    # ==================== INGEST ONCE ====================
+    started = time.perf_counter()
+    report = pipeline.ingest_directory(
+        args.docs,
+        progress=IngestionProgress(),
+        on_file_error=lambda name, error: log(f"Could not read '{name}': {error}")
+    )
+    if not pipeline.ready:
+        log("No valid documents to process.")
+        return 1
+    log(
+        f"Index {report['status']}: {len(pipeline.chunks)} chunks "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+    # ==================== ANSWER ====================
+    records = read_questions(args.questions)
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        counts = asyncio.run(answer_all(pipeline, records, args.concurrency, output))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - started
+
+    log(
+        f"{len(records)} questions in {elapsed:.1f}s "
+        f"({len(records) / elapsed if elapsed else 0:.2f} questions/sec) · "
+        f"{counts['answered']} answered ({counts['cached']} from cache) · {counts['failed']} failed"
+    )
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(get_metrics().prometheus_text())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Offline benchmark for the ingest -> retrieve -> answer pipeline
+
+Drives ``AcademicPipeline`` over synthetic PDF corpora of increasing size
+with a deterministic fake LLM and a hashing embedding stand-in, so no
+network or model download is needed. Every corpus runs in a fresh process,
+so its peak RSS is its own. Results are printed (or written) as JSON.
+
+Usage:
+    python groq/benchmark.py --pages 1 10 100 1000 --output bench.json
+"""
+# ==================== IMPORTS ====================
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import FakeListChatModel
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate
+
+from index_store import FaissIndexStore
+from pipeline import AcademicPipeline
+from ui_themes import theme_payload_bytes
+
+# ==================== STAND-INS ====================
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings via feature hashing
+
+    Cheap and local, yet similar texts still get similar vectors, so the
+    retrieval stage does realistic work.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(token.encode()) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+FAKE_ANSWER = "The context explains the requested concept step by step. " * 20
+
+# ==================== SYNTHETIC CORPUS ====================
+VOCABULARY = (
+    "theorem lemma proof matrix vector eigenvalue gradient entropy protein cell "
+    "market equilibrium inflation revolution empire treaty algorithm complexity "
+    "graph network neuron synapse energy momentum quantum field integral series"
+).split()
+
+
+def synthetic_page(rng, page_number, chars=2500):
+    """Pseudo-academic text of roughly one printed page"""
+    sentences = []
+    length = 0
+    while length < chars:
+        words = rng.choices(VOCABULARY, k=rng.randint(8, 18))
+        sentence = f"Theorem {page_number}.{len(sentences) + 1} states that " + " ".join(words) + "."
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def synthetic_pdf(pages, seed=0):
+    """
+    Build an in-memory PDF with the given number of pages
+
+    Returns:
+        bytes: PDF file content
+    """
+    rng = random.Random(seed)
+    styles = getSampleStyleSheet()
+    story = []
+    for page in range(1, pages + 1):
+        story.append(Paragraph(synthetic_page(rng, page), styles["Normal"]))
+        story.append(PageBreak())
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=letter).build(story)
+    return buffer.getvalue()
+
+
+# ==================== MEASUREMENT ====================
+def measure(stages, name, items, func, trace_memory=True):
+    """
+    Run one stage, recording latency, throughput and peak traced memory
+
+    Latency comes from an untraced run; tracemalloc slows Python code down
+    several times, so peak memory is taken from a second, traced run.
+
+    Args:
+        stages (dict): Result dict to add the stage to
+        name (str): Stage name
+        items (int or callable): Work items processed (callable = count from result)
+        func (callable): Stage body (must be safe to run twice)
+        trace_memory (bool): Do the extra traced run
+
+    Returns:
+        Any: Whatever ``func`` returns
+    """
+    started = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - started
+
+    count = items(result) if callable(items) else items
+    stages[name] = {
+        "seconds": round(seconds, 4),
+        "items": count,
+        "items_per_second": round(count / seconds, 2) if seconds > 0 else None
+    }
+
+    if trace_memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stages[name]["peak_python_kib"] = round(peak / 1024, 1)
+    return result
+
+
+def max_rss_kib():
+    """Peak resident memory of this process (ru_maxrss: KiB on Linux, bytes on macOS)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_corpus(pages, args):
+    """
+    Benchmark the pipeline on one synthetic corpus, as the app runs it
+
+    Ingestion goes through ``AcademicPipeline.ingest`` (parsing, splitting,
+    dedup, embedding, index build and save into a throwaway index store),
+    questions through its retriever and ``ask``. The answer cache is off,
+    so every question does the full work.
+
+    Returns:
+        dict: Per-stage measurements for this corpus size
+    """
+    rss_before = max_rss_kib()
+    data = synthetic_pdf(pages, seed=args.seed)
+    stages = {}
+    roots = []
+
+    def measure_stage(name, items, func):
+        """Measure one stage of this corpus"""
+        return measure(stages, name, items, func, trace_memory=not args.skip_memory)
+
+    def new_pipeline():
+        """Pipeline over an empty index store, so every ingest really builds"""
+        roots.append(tempfile.mkdtemp(prefix="academic-assistant-bench-"))
+        return AcademicPipeline(
+            FakeListChatModel(responses=[FAKE_ANSWER]),
+            embeddings=HashingEmbeddings(dim=args.dim),
+            index_store=FaissIndexStore(root=roots[-1], quantize=args.quantize),
+            use_answer_cache=False,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            retrieval=args.retrieval
+        )
+
+    def ingest():
+        pipeline = new_pipeline()
+        return pipeline, pipeline.ingest([("bench.pdf", data)])
+
+    try:
+        pipeline, report = measure_stage("ingest", pages, ingest)
+        # Where ingestion spent its time, from the pipeline's own trace
+        ingest_spans = defaultdict(float)
+        for span in pipeline.last_traces["ingest"].spans:
+            ingest_spans[span["name"]] += span["seconds"]
+
+        rng = random.Random(args.seed + 1)
+        questions = [
+            f"What does theorem {rng.randint(1, pages)}.1 say about {rng.choice(VOCABULARY)}?"
+            for _ in range(args.questions)
+        ]
+        retriever = pipeline.retriever
+        measure_stage("retrieve", len(questions), lambda: [retriever.invoke(q) for q in questions])
+        measure_stage("answer", len(questions), lambda: [pipeline.ask(q) for q in questions])
+    finally:
+        for root in roots:
+            shutil.rmtree(root, ignore_errors=True)
+
+    rss_after = max_rss_kib()
+    return {
+        "pages": pages,
+        "chunks": len(pipeline.chunks),
+        "pdf_bytes": len(data),
+        "vector_bytes": report["vector_bytes"],
+        "index_type": report["index_type"],
+        "dedup": report.get("dedup"),
+        "search": {key: report[key] for key in ("recall_at_10", "query_ms", "exact_query_ms", "nprobe")
+                   if key in report},
+        "ingest_spans": {name: round(seconds, 4) for name, seconds in ingest_spans.items()},
+        "stages": stages,
+        "max_rss_kib": rss_after,
+        "rss_growth_kib": rss_after - rss_before
+    }
+
+
+def run_corpus_in_subprocess(pages, args):
+    """
+    Run ``run_corpus`` in a fresh process
+
+    A process's peak RSS never goes down, so measuring corpora one after
+    another in one process would report the largest so far for each.
+
+    Returns:
+        dict: The corpus measurements
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_corpus, pages, args).result()
+
+
+# ==================== ENTRY POINT ====================
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the RAG pipeline offline.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 1000],
+                        help="Corpus sizes in pages")
+    parser.add_argument("--chunk-size", type=int, default=1500)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding call")
+    parser.add_argument("--retrieval", choices=("hybrid", "vector"), default="hybrid")
+    parser.add_argument("--dim", type=int, default=384, help="Stand-in embedding dimension")
+    parser.add_argument("--quantize", action="store_true", help="Benchmark the int8 index")
+    parser.add_argument("--questions", type=int, default=20, help="Questions per corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-memory", action="store_true",
+                        help="Skip the traced second run of every stage")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+    # Read by embedding_engine when the corpus processes import it
+    os.environ["EMBED_BATCH_SIZE"] = str(args.batch_size)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {
+            "chunk_size": args.chunk_size,
+            "chunk_overlap": args.chunk_overlap,
+            "batch_size": args.batch_size,
+            "dim": args.dim,
+            "quantize": args.quantize,
+            "retrieval": args.retrieval,
+            "questions": args.questions
+        },
+        "corpora": [run_corpus_in_subprocess(pages, args) for pages in args.pages],
+        # Stylesheet bytes the Streamlit app re-sends on every rerun
+        "theme_css_bytes": theme_payload_bytes()
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# ==================== IMPORTS ====================
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+# ==================== SETTINGS ====================
+CHUNKS_FILE = "chunks.sqlite"
+FETCH_BATCH = 500  # Ids per SQL query (well under SQLite's bound-parameter limit)
+
+
+# ==================== WRITING ====================
+def write_chunks(path, docstore, index_to_docstore_id):
+    """
+    Store the chunk text and metadata of a FAISS docstore in SQLite
+
+    One row per vector: its FAISS row number, docstore id, text and
+    metadata (as JSON). The file is created on first use and appended to
+    afterwards, so a build can write every batch as soon as it is embedded.
+
+    Args:
+        path (str): SQLite file to create or append to
+        docstore (Docstore): Chunks by docstore id
+        index_to_docstore_id (dict): FAISS row -> docstore id of the rows to write
+    """
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, "
+            "text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        rows = (
+            (row, doc_id, document.page_content, json.dumps(document.metadata, default=str))
+            for row, doc_id in sorted(index_to_docstore_id.items())
+            for document in [docstore.search(doc_id)]
+        )
+        connection.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def iter_texts(path):
+    """
+    Chunk texts in FAISS row order, streamed without loading the whole file
+
+    Args:
+        path (str): SQLite file written by ``write_chunks``
+
+    Yields:
+        str: Text of row 0, 1, 2...
+    """
+    connection = _connect(path)
+    try:
+        for (text,) in connection.execute("SELECT text FROM chunks ORDER BY row"):
+            yield text
+    finally:
+        connection.close()
+
+
+def _connect(path):
+    # Stored index directories are written once and never changed, so the file
+    # can be opened read-only without locking
+    uri = Path(os.path.abspath(path)).as_uri() + "?mode=ro&immutable=1"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+
+# ==================== LAZY DOCSTORE ====================
+class SqliteDocstore(Docstore):
+    """
+    Read-only docstore that loads chunk text from SQLite on request
+
+    Nothing is read when it is opened: FAISS hits and the chunks a learning
+    tool actually uses are fetched by id, so only their text is ever in memory.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): SQLite file written by ``write_chunks``
+        """
+        self.path = path
+        self._connection = _connect(path)
+        self._lock = threading.Lock()
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def search(self, search):
+        """Document stored under an id (LangChain's message string if it is unknown)"""
+        rows = self._query("SELECT text, metadata FROM chunks WHERE id = ?", (search,))
+        if not rows:
+            return f"ID {search} not found."
+        text, metadata = rows[0]
+        return Document(page_content=text, metadata=json.loads(metadata))
+
+    def search_many(self, ids):
+        """
+        Documents for many ids with one query per batch
+
+        Args:
+            ids (list[str]): Docstore ids
+
+        Returns:
+            list[Document]: Documents in the order of ``ids`` (unknown ids are skipped)
+        """
+        found = {}
+        for start in range(0, len(ids), FETCH_BATCH):
+            batch = list(ids[start:start + FETCH_BATCH])
+            placeholders = ",".join("?" * len(batch))
+            for doc_id, text, metadata in self._query(
+                    f"SELECT id, text, metadata FROM chunks WHERE id IN ({placeholders})", batch):
+                found[doc_id] = Document(page_content=text, metadata=json.loads(metadata))
+        return [found[i] for i in ids if i in found]
+
+    def search_row(self, row):
+        """Document stored at a FAISS row"""
+        rows = self._query("SELECT text, metadata FROM chunks WHERE row = ?", (int(row),))
+        if not rows:
+            raise IndexError(row)
+        text, metadata = rows[0]
+        return Document(page_content=text, metadata=json.loads(metadata))
+
+    def row_ids(self):
+        """FAISS row -> docstore id mapping, looked up per hit"""
+        return _RowIds(self)
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM chunks", ())[0][0]
+
+
+class ChunkWriter(SqliteDocstore, AddableMixin):
+    """
+    Writable chunk file for an index that is being built or updated
+
+    Chunks go to disk as they are added instead of piling up in an
+    in-memory docstore. Rows always match the FAISS rows: additions are
+    appended (FAISS appends too) and deletions renumber the rows after them
+    (as LangChain renumbers ``index_to_docstore_id``), so the finished file
+    is stored as it is.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): SQLite file to create, or a copy of a stored one to change
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, "
+            "text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def add(self, texts):
+        """Append documents (by docstore id) as the next rows"""
+        offset = len(self)
+        write_chunks(self.path, InMemoryDocstore(texts), {offset + row: doc_id for row, doc_id in enumerate(texts)})
+
+    def delete(self, ids):
+        """Delete documents and close the gaps they leave in the row numbers"""
+        with self._lock:
+            for start in range(0, len(ids), FETCH_BATCH):
+                batch = list(ids[start:start + FETCH_BATCH])
+                self._connection.execute(f"DELETE FROM chunks WHERE id IN ({','.join('?' * len(batch))})", batch)
+            rows = [row for (row,) in self._connection.execute("SELECT row FROM chunks ORDER BY row")]
+            # Negative rows first, so no renumbered row collides with one not yet moved
+            self._connection.executemany(
+                "UPDATE chunks SET row = ? WHERE row = ?",
+                ((-1 - new, old) for new, old in enumerate(rows) if new != old)
+            )
+            self._connection.execute("UPDATE chunks SET row = -1 - row WHERE row < 0")
+            self._connection.commit()
+
+    def update_metadata(self, updates):
+        """
+        Merge metadata fields into stored documents
+
+        Args:
+            updates (dict): Docstore id -> fields to set (unknown ids are skipped)
+        """
+        with self._lock:
+            for doc_id, fields in updates.items():
+                stored = self._connection.execute("SELECT metadata FROM chunks WHERE id = ?", (doc_id,)).fetchall()
+                for (metadata,) in stored:
+                    self._connection.execute(
+                        "UPDATE chunks SET metadata = ? WHERE id = ?",
+                        (json.dumps({**json.loads(metadata), **fields}, default=str), doc_id)
+                    )
+            self._connection.commit()
+
+    def row_ids(self):
+        """FAISS row -> docstore id, for the vector store that owns this file"""
+        return dict(self._query("SELECT row, id FROM chunks", ()))
+
+    def close(self):
+        """Close the connection (before the file is moved into place)"""
+        self._connection.close()
+
+
+class _RowIds(Mapping):
+    """``index_to_docstore_id`` for FAISS search, read from SQLite instead of held as a dict"""
+
+    def __init__(self, docstore):
+        self.docstore = docstore
+
+    def __getitem__(self, row):
+        rows = self.docstore._query("SELECT id FROM chunks WHERE row = ?", (int(row),))
+        if not rows:
+            raise KeyError(row)
+        return rows[0][0]
+
+    def __iter__(self):
+        return iter(range(len(self)))
+
+    def __len__(self):
+        return len(self.docstore)
+
+
+class LazyChunks(Sequence):
+    """
+    Chunks of a document set in upload order, text loaded on access
+
+    Indexing fetches one chunk, slicing and iteration fetch in batches, so
+    e.g. the quick tools only ever read the opening chunk.
+    """
+
+    def __init__(self, docstore, ids):
+        """
+        Args:
+            docstore (SqliteDocstore): Where the text lives
+            ids (list[str]): Docstore ids in upload order
+        """
+        self.docstore = docstore
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return self.docstore.search_many(self.ids[position])
+        return self.docstore.search(self.ids[position])
+
+    def __iter__(self):
+        for start in range(0, len(self.ids), FETCH_BATCH):
+            yield from self.docstore.search_many(self.ids[start:start + FETCH_BATCH])
+
+
+class RowChunks(Sequence):
+    """Chunks by FAISS row, text loaded on access (the positions of a stored BM25 index)"""
+
+    def __init__(self, docstore):
+        """
+        Args:
+            docstore (SqliteDocstore): Where the text lives
+        """
+        self.docstore = docstore
+
+    def __len__(self):
+        return len(self.docstore)
+
+    def __getitem__(self, row):
+        return self.docstore.search_row(row)
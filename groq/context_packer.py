@@ -0,0 +1,184 @@
+# ==================== IMPORTS ====================
+import time
+from typing import Any
+
+from langchain_core.callbacks.manager import dispatch_custom_event
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from model_limits import estimate_tokens, truncate_to_tokens
+
+# ==================== SETTINGS ====================
+SEPARATOR_TOKENS = 1      # The "\n\n" the stuff-documents chain puts between chunks
+ADJACENT_CHARS = 8        # Gap (stripped separators) under which two chunks still count as neighbours
+MIN_OVERLAP_CHARS = 20    # Shortest shared text accepted as a splitter overlap
+MAX_OVERLAP_CHARS = 400   # Longest overlap searched for when chunks carry no start_index
+
+
+# ==================== OVERLAP DETECTION ====================
+def _text_overlap(first, second, max_chars=MAX_OVERLAP_CHARS):
+    """Length of the longest suffix of ``first`` that is a prefix of ``second`` (0 if too short)"""
+    for size in range(min(len(first), len(second), max_chars), MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return size
+    return 0
+
+
+class _Span:
+    """Contiguous stretch of one page built from one or more chunks"""
+
+    def __init__(self, document):
+        self.key = (document.metadata.get("source"), document.metadata.get("page"))
+        self.start = document.metadata.get("start_index")
+        self.text = document.page_content
+        self.metadata = document.metadata
+        self.chunks = 1
+
+    @property
+    def end(self):
+        return self.start + len(self.text)
+
+    def joined(self, other):
+        """
+        Text covering both spans if they overlap or touch, else None
+
+        Uses the splitter's ``start_index`` when both sides have one, and
+        falls back to matching the overlapping text for older indexes.
+        """
+        if self.key != other.key:
+            return None
+        if self.start is not None and other.start is not None:
+            first, second = (self, other) if self.start <= other.start else (other, self)
+            gap = second.start - first.end
+            if gap > ADJACENT_CHARS:
+                return None
+            if gap > 0:
+                return first.start, first.text + "\n" + second.text
+            if second.end <= first.end:
+                return first.start, first.text
+            return first.start, first.text + second.text[first.end - second.start:]
+        if other.text in self.text:
+            return self.start, self.text
+        if self.text in other.text:
+            return other.start, other.text
+        for first, second in ((self, other), (other, self)):
+            overlap = _text_overlap(first.text, second.text)
+            if overlap:
+                return first.start, first.text + second.text[overlap:]
+        return None
+
+    def absorb(self, other, joined):
+        self.start, self.text = joined
+        self.chunks += other.chunks
+
+
+# ==================== PACKER ====================
+class ContextPacker:
+    """
+    Fits retrieved chunks into the prompt's token budget
+
+    Chunks are taken in relevance order. One that overlaps or borders an
+    already packed chunk of the same page is merged into it, so the
+    splitter's shared overlap is sent once; others are added while they fit
+    the budget. Merged stretches keep the position of their best-ranked chunk.
+    """
+
+    def __init__(self, budget_tokens):
+        """
+        Args:
+            budget_tokens (int): Tokens available for the context
+        """
+        self.budget_tokens = budget_tokens
+
+    def pack(self, documents, budget_tokens=None):
+        """
+        Merge and select chunks for the prompt
+
+        Args:
+            documents (list[Document]): Chunks, most relevant first
+            budget_tokens (int): Budget override (e.g. minus the question's tokens)
+
+        Returns:
+            tuple: (packed documents, report dict with candidates, chunks,
+                merged, dropped, tokens_in, tokens_out, tokens_saved, budget and seconds)
+        """
+        started = time.perf_counter()
+        budget = self.budget_tokens if budget_tokens is None else budget_tokens
+        spans, used, dropped = [], 0, 0
+
+        for document in documents:
+            candidate = _Span(document)
+            target, joined = next(
+                ((s, j) for s in spans for j in [s.joined(candidate)] if j is not None), (None, None)
+            )
+            if target is not None:
+                extra = estimate_tokens(joined[1]) - estimate_tokens(target.text)
+                if used + extra > budget:
+                    dropped += 1
+                    continue
+                target.absorb(candidate, joined)
+                used += extra
+                # The grown span may now bridge to another packed span of the page
+                for other in [s for s in spans if s is not target]:
+                    bridged = target.joined(other)
+                    if bridged is not None:
+                        used += estimate_tokens(bridged[1]) - estimate_tokens(target.text) - estimate_tokens(other.text)
+                        used -= SEPARATOR_TOKENS
+                        target.absorb(other, bridged)
+                        spans.remove(other)
+                continue
+
+            cost = estimate_tokens(candidate.text) + (SEPARATOR_TOKENS if spans else 0)
+            if used + cost > budget:
+                if spans:
+                    dropped += 1
+                    continue
+                # Never send an empty context: cut the best chunk down to the budget
+                candidate.text = truncate_to_tokens(candidate.text, budget)
+                cost = estimate_tokens(candidate.text)
+            spans.append(candidate)
+            used += cost
+
+        tokens_in = sum(estimate_tokens(d.page_content) for d in documents) + SEPARATOR_TOKENS * max(0, len(documents) - 1)
+        packed = [
+            Document(
+                page_content=s.text,
+                metadata=dict(s.metadata, **({"start_index": s.start} if s.start is not None else {}), merged_chunks=s.chunks)
+            )
+            for s in spans
+        ]
+        report = {
+            "candidates": len(documents),
+            "chunks": len(packed),
+            "merged": len(documents) - len(packed) - dropped,
+            "dropped": dropped,
+            "tokens_in": tokens_in,
+            "tokens_out": used,
+            "tokens_saved": tokens_in - used,
+            "budget": budget,
+            "seconds": round(time.perf_counter() - started, 6)
+        }
+        return packed, report
+
+
+class PackingRetriever(BaseRetriever):
+    """
+    Retriever whose results are packed into the prompt's token budget
+
+    The question's own tokens are taken off the budget. Emits a
+    ``context packing`` custom callback event with the packer's report,
+    which the timing callback records as a span.
+    """
+
+    base_retriever: Any
+    packer: Any
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        candidates = self.base_retriever.invoke(
+            query, config={"callbacks": run_manager.get_child() if run_manager else None}
+        )
+        budget = max(0, self.packer.budget_tokens - estimate_tokens(query))
+        documents, report = self.packer.pack(candidates, budget)
+        if run_manager:
+            dispatch_custom_event("context packing", report, config={"callbacks": run_manager.get_child()})
+        return documents
@@ -0,0 +1,142 @@
+# ==================== IMPORTS ====================
+import os
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from embedding_cache import text_hash
+
+# ==================== SETTINGS ====================
+# Set DEDUP_CHUNKS=0 to embed every chunk, duplicates included
+DEDUP_BY_DEFAULT = os.getenv("DEDUP_CHUNKS", "1") != "0"
+# Estimated Jaccard similarity (of word 3-gram sets) above which a chunk is a near-duplicate
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+
+NUM_PERM = 64        # MinHash signature length
+LSH_BANDS = 16       # 16 bands of 4 rows: pairs above ~0.5 similarity become candidates
+SHINGLE_WORDS = 3
+WORD_PATTERN = re.compile(r"\w+")
+_MASK = np.uint64(0xFFFFFFFF)
+
+
+# ==================== MINHASH ====================
+def shingles(text, size=SHINGLE_WORDS):
+    """
+    Hashed word n-grams of a text
+
+    Args:
+        text (str): Chunk text
+        size (int): Words per shingle
+
+    Returns:
+        np.ndarray: Unique uint64 shingle hashes (32-bit values)
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64))
+
+
+class MinHasher:
+    """MinHash signatures from NUM_PERM seeded multiply-add hash functions"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2 ** 32, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 32, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, text):
+        """
+        MinHash signature of a text's shingle set
+
+        Returns:
+            np.ndarray: uint32 vector of length ``num_perm``
+        """
+        hashes = shingles(text)
+        # 32-bit operands keep the products inside uint64
+        return ((self.a * hashes + self.b) & _MASK).min(axis=1).astype(np.uint32)
+
+
+# ==================== DEDUPLICATION ====================
+class ChunkDeduplicator:
+    """
+    Drops exact and near-duplicate chunks before they are embedded
+
+    Exact duplicates are found by a hash of the normalized text; near
+    duplicates by MinHash with LSH banding, confirmed by the signature
+    agreement. The first occurrence is kept and every later occurrence is
+    recorded in ``duplicate_sources`` under the kept chunk's id, for the
+    index store to write into that chunk's metadata, so nothing about where
+    the content appeared is lost. Only ids, hashes and signatures are held,
+    never the chunks themselves.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM, bands=LSH_BANDS):
+        """
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity of a near duplicate
+            num_perm (int): MinHash signature length
+            bands (int): LSH bands (``num_perm`` must be a multiple)
+        """
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._by_hash = {}
+        self._buckets = {}
+        self._signatures = {}
+        self.duplicate_sources = defaultdict(list)
+        self.counts = {"chunks": 0, "exact_duplicates": 0, "near_duplicates": 0, "bytes_saved": 0}
+
+    def check(self, doc_id, document):
+        """
+        Register a chunk, or resolve it to the chunk it duplicates
+
+        Args:
+            doc_id (str): Docstore id the chunk would get
+            document (Document): The chunk
+
+        Returns:
+            str: ``doc_id`` if the chunk is new, else the id of the kept original
+        """
+        self.counts["chunks"] += 1
+        digest = text_hash(document.page_content)
+        original = self._by_hash.get(digest)
+        if original is not None:
+            return self._drop(original, document, "exact_duplicates")
+
+        signature = self.hasher.signature(document.page_content)
+        bands = [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+        candidates = dict.fromkeys(c for band in bands for c in self._buckets.get(band, ()))
+        for candidate in candidates:
+            if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                return self._drop(candidate, document, "near_duplicates")
+
+        self._by_hash[digest] = doc_id
+        self._signatures[doc_id] = signature
+        for band in bands:
+            self._buckets.setdefault(band, []).append(doc_id)
+        return doc_id
+
+    def _drop(self, original, document, kind):
+        self.counts[kind] += 1
+        self.counts["bytes_saved"] += len(document.page_content.encode("utf-8"))
+        provenance = {key: document.metadata[key] for key in ("source", "page") if key in document.metadata}
+        self.duplicate_sources[original].append(provenance)
+        return original
+
+    def stats(self):
+        """
+        Dedup counters
+
+        Returns:
+            dict: chunks seen, exact_duplicates, near_duplicates, bytes_saved
+        """
+        return dict(self.counts)
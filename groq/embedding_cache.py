@@ -0,0 +1,197 @@
+# ==================== IMPORTS ====================
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# ==================== CACHE LOCATION ====================
+# All on-disk caches live under one directory so they can be wiped together.
+# Override with ACADEMIC_ASSISTANT_CACHE_DIR (e.g. a mounted volume in production).
+DEFAULT_CACHE_DIR = os.getenv(
+    "ACADEMIC_ASSISTANT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+
+# ==================== KEY HELPERS ====================
+def normalize_text(text):
+    """
+    Normalize chunk text so trivially different copies share one cache entry
+
+    Args:
+        text (str): Raw chunk text
+
+    Returns:
+        str: Unicode-normalized text with collapsed whitespace
+    """
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def text_hash(text):
+    """
+    Content hash used as the cache key for a chunk
+
+    Args:
+        text (str): Raw chunk text
+
+    Returns:
+        str: Hex SHA-256 digest of the normalized text
+    """
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+# ==================== DISK-BACKED VECTOR CACHE ====================
+class EmbeddingCache:
+    """
+    SQLite-backed store of embedding vectors keyed by (model name, text hash)
+
+    A single cache file is safe to share between Streamlit sessions: all
+    access goes through one connection guarded by a lock.
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): SQLite file location (defaults to DEFAULT_CACHE_DIR/embeddings.sqlite3)
+        """
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "embeddings.sqlite3")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model_name, hashes):
+        """
+        Look up stored vectors for a batch of text hashes
+
+        Args:
+            model_name (str): Embedding model the vectors were produced by
+            hashes (list[str]): Text hashes to look up
+
+        Returns:
+            dict: Mapping of text hash -> float32 numpy vector for every hit
+        """
+        found = {}
+        unique = list(set(hashes))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model_name, *batch]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model_name, items):
+        """
+        Store freshly computed vectors
+
+        Args:
+            model_name (str): Embedding model the vectors were produced by
+            items (dict): Mapping of text hash -> vector
+        """
+        rows = [
+            (model_name, key, np.asarray(vector, dtype=np.float32).tobytes())
+            for key, vector in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves stored vectors and only embeds cache misses
+
+    Drop-in replacement for the wrapped model anywhere LangChain expects an
+    ``Embeddings`` object (e.g. ``FAISS.from_documents``).
+    """
+
+    def __init__(self, embeddings, model_name, cache=None):
+        """
+        Args:
+            embeddings (Embeddings): Underlying embedding model
+            model_name (str): Name used to namespace cache entries
+            cache (EmbeddingCache): Shared cache instance (a default one is created if omitted)
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or EmbeddingCache()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        """
+        Embed document chunks, reusing cached vectors where possible
+
+        Args:
+            texts (list[str]): Chunk texts
+
+        Returns:
+            list[list[float]]: One vector per input text, in input order
+        """
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.model_name, hashes)
+
+        # Embed each missing text once, even if it appears several times
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            fresh = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing.keys(), computed)
+            }
+            self.cache.put_many(self.model_name, fresh)
+            vectors.update(fresh)
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [vectors[key].tolist() for key in hashes]
+
+    def embed_query(self, text):
+        """Queries are rarely repeated verbatim, so they bypass the cache"""
+        return self.embeddings.embed_query(text)
+
+    def stats(self):
+        """
+        Cache counters since creation (or the last reset)
+
+        Returns:
+            dict: hits, misses and hit_rate
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+    def reset_stats(self):
+        """Zero the hit/miss counters"""
+        self.hits = 0
+        self.misses = 0
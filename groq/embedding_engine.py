@@ -0,0 +1,483 @@
+# ==================== IMPORTS ====================
+import os
+import time
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+from telemetry import span
+
+# ==================== SETTINGS ====================
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))  # Chunks per embedding call
+
+# Set VECTOR_PRECISION=int8 to store index vectors scalar-quantized (~4x smaller)
+QUANTIZE_BY_DEFAULT = os.getenv("VECTOR_PRECISION", "float32").lower() == "int8"
+
+# Document sets with at least this many chunks get an IVF index instead of exact search
+ANN_MIN_VECTORS = int(os.getenv("ANN_MIN_VECTORS", "50000"))
+# nprobe is raised until the measured recall@10 against exact search reaches this
+ANN_TARGET_RECALL = float(os.getenv("ANN_TARGET_RECALL", "0.95"))
+IVF_TRAINING_PER_LIST = 40  # k-means sample size per inverted list (faiss wants 39+)
+
+# Streaming builds buffer this many vectors to train the first index on
+INDEX_TRAINING_ROWS = int(os.getenv("INDEX_TRAINING_ROWS", "4096"))
+# Vectors kept (reservoir-sampled) to measure recall and latency after a streaming build
+MEASURE_SAMPLE_ROWS = 20000
+
+# ==================== BATCHED EMBEDDING ====================
+class EmbeddingEngine:
+    """
+    Embeds texts in fixed-size batches into one contiguous float32 matrix
+
+    Rows are L2-normalized, so inner product equals cosine similarity and
+    the same matrix can feed a flat or a quantized inner-product index.
+    """
+
+    def __init__(self, embeddings, batch_size=EMBED_BATCH_SIZE, normalize=True):
+        """
+        Args:
+            embeddings (Embeddings): Embedding model (cached or not)
+            batch_size (int): Texts per embedding call
+            normalize (bool): L2-normalize every row
+        """
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.normalize = normalize
+
+    def embed(self, texts, progress=None):
+        """
+        Embed texts into a single preallocated matrix
+
+        Args:
+            texts (list[str]): Texts to embed
+            progress (IngestionProgress): Optional tracker for finished batches
+
+        Returns:
+            np.ndarray: C-contiguous float32 matrix of shape (len(texts), dim)
+        """
+        starts = range(0, len(texts), self.batch_size)
+        if progress:
+            progress.start_embedding(len(starts))
+
+        matrix = None
+        for start in starts:
+            batch = texts[start:start + self.batch_size]
+            vectors = np.asarray(self.embeddings.embed_documents(batch), dtype=np.float32)
+            if matrix is None:
+                matrix = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            matrix[start:start + len(batch)] = vectors
+            if progress:
+                progress.batch_done(len(batch))
+
+        if matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        if self.normalize:
+            faiss.normalize_L2(matrix)  # In place, no extra copy
+        return matrix
+
+    def embed_stream(self, items, progress=None):
+        """
+        Embed a stream of documents one batch at a time
+
+        Only one batch of documents and vectors is held at once, so the
+        stream can be arbitrarily long.
+
+        Args:
+            items (iterable): ``(docstore id, Document)`` pairs, consumed lazily
+            progress (IngestionProgress): Optional tracker for finished batches
+
+        Yields:
+            tuple: (ids, documents, normalized float32 matrix) per batch
+        """
+        ids, documents = [], []
+        started = False
+        for doc_id, document in items:
+            ids.append(doc_id)
+            documents.append(document)
+            if len(documents) == self.batch_size:
+                if progress and not started:
+                    progress.start_embedding()
+                started = True
+                yield ids, documents, self._embed_batch(documents, progress)
+                ids, documents = [], []
+        if documents:
+            if progress and not started:
+                progress.start_embedding()
+            yield ids, documents, self._embed_batch(documents, progress)
+
+    def _embed_batch(self, documents, progress):
+        with span("embed", accumulate=True, chunks=len(documents)):
+            matrix = np.asarray(
+                self.embeddings.embed_documents([doc.page_content for doc in documents]),
+                dtype=np.float32
+            )
+        if self.normalize:
+            faiss.normalize_L2(matrix)
+        if progress:
+            progress.batch_done(len(documents))
+        return matrix
+
+
+# ==================== INDEX CONSTRUCTION ====================
+def choose_index_type(size):
+    """
+    Pick the index type for a document set of ``size`` chunks
+
+    Exact search is fastest to build and good enough for a handful of
+    papers; from ANN_MIN_VECTORS on, an inverted-file index keeps the query
+    cost roughly flat by only scanning the ``nprobe`` closest clusters.
+
+    Returns:
+        str: "flat" or "ivf"
+    """
+    return "ivf" if size >= ANN_MIN_VECTORS else "flat"
+
+
+def ivf_list_count(size):
+    """Number of IVF clusters for ``size`` vectors (power of two near sqrt(size))"""
+    return 2 ** max(4, round(np.log2(np.sqrt(max(size, 1)))))
+
+
+def create_index(dim, quantize=False, training_matrix=None, size=None, seed=0):
+    """
+    Create an empty inner-product FAISS index, sized for the corpus
+
+    Args:
+        dim (int): Vector dimension
+        quantize (bool): Store vectors as 8-bit scalars instead of float32
+        training_matrix (np.ndarray): Vectors used to learn per-dimension ranges
+            and IVF clusters (required when ``quantize`` is True or the index is IVF)
+        size (int): Expected number of vectors (defaults to the training rows)
+        seed (int): Seed for the IVF training sample
+
+    Returns:
+        faiss.Index: Ready-to-add index
+    """
+    if size is None:
+        size = 0 if training_matrix is None else len(training_matrix)
+
+    if choose_index_type(size) == "flat":
+        if not quantize:
+            return faiss.IndexFlatIP(dim)
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(training_matrix)
+        return index
+
+    # k-means needs a few dozen points per cluster; a sample is enough to learn them
+    nlist = min(ivf_list_count(size), max(1, len(training_matrix) // IVF_TRAINING_PER_LIST))
+    sample_size = min(len(training_matrix), nlist * IVF_TRAINING_PER_LIST)
+    rng = np.random.default_rng(seed)
+    sample = training_matrix[np.sort(rng.choice(len(training_matrix), size=sample_size, replace=False))]
+
+    index = faiss.index_factory(dim, f"IVF{nlist},{'SQ8' if quantize else 'Flat'}", faiss.METRIC_INNER_PRODUCT)
+    index.train(sample)
+    index.nprobe = max(1, nlist // 32)  # Tuned by measure_index once the vectors are added
+    return index
+
+
+def index_type(index):
+    """
+    Type of an index built by ``create_index``
+
+    Returns:
+        str: "ivf" or "flat"
+    """
+    return "ivf" if faiss.try_extract_index_ivf(index) is not None else "flat"
+
+
+def create_vector_store(embeddings, index, docstore=None):
+    """
+    Wrap a raw FAISS index in LangChain's vector store
+
+    Args:
+        embeddings (Embeddings): Model used to embed queries
+        index (faiss.Index): Index created by ``create_index``
+        docstore (Docstore): Empty docstore for the chunks (in memory if omitted)
+
+    Returns:
+        FAISS: Empty vector store searching by cosine similarity
+    """
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore() if docstore is None else docstore,
+        index_to_docstore_id={},
+        # Rows are normalized by EmbeddingEngine; the query norm does not change the ranking
+        normalize_L2=False,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
+
+
+def add_matrix(vector_store, matrix, documents, ids):
+    """
+    Add a precomputed embedding matrix and its documents to a vector store
+
+    Skips the list-of-lists round trip of ``FAISS.add_embeddings``.
+
+    Args:
+        vector_store (FAISS): Target store
+        matrix (np.ndarray): Normalized float32 vectors, one row per document
+        documents (list[Document]): Documents in row order
+        ids (list[str]): Docstore ids in row order
+    """
+    offset = vector_store.index.ntotal
+    vector_store.index.add(matrix)
+    vector_store.docstore.add(dict(zip(ids, documents)))
+    for row, doc_id in enumerate(ids):
+        vector_store.index_to_docstore_id[offset + row] = doc_id
+
+
+def grow_index(vector_store, matrix, quantize=False, slice_rows=8192, seed=0):
+    """
+    Switch a flat index to IVF once new vectors push it past ANN_MIN_VECTORS
+
+    Stored vectors are read back from the index and re-added in the same
+    order (a slice at a time), so the docstore mapping stays valid and
+    nothing is re-embedded.
+
+    Args:
+        vector_store (FAISS): Store about to receive ``matrix``
+        matrix (np.ndarray): Normalized float32 vectors that will be added
+        quantize (bool): Store vectors as 8-bit scalars
+        slice_rows (int): Stored vectors copied per step
+        seed (int): Seed for the training sample
+
+    Returns:
+        bool: True if the index was rebuilt
+    """
+    index = vector_store.index
+    size = index.ntotal + len(matrix)
+    if index_type(index) != "flat" or choose_index_type(size) == "flat":
+        return False
+
+    # Train on a sample of the stored vectors plus the new ones
+    sample_size = min(index.ntotal, ivf_list_count(size) * IVF_TRAINING_PER_LIST)
+    rows = np.sort(np.random.default_rng(seed).choice(index.ntotal, size=sample_size, replace=False))
+    training_matrix = np.vstack([index.reconstruct_batch(rows), matrix])
+    new_index = create_index(index.d, quantize, training_matrix=training_matrix, size=size)
+
+    for start in range(0, index.ntotal, slice_rows):
+        new_index.add(index.reconstruct_n(start, min(slice_rows, index.ntotal - start)))
+    vector_store.index = new_index
+    return True
+
+
+def delete_vectors(vector_store, ids):
+    """
+    Delete documents and their vectors from a store
+
+    IVF indexes keep the original row ids on ``remove_ids``, while LangChain
+    assumes rows are renumbered as in a flat index; the remaining vectors
+    are therefore re-added compactly, keeping the trained clusters.
+
+    Args:
+        vector_store (FAISS): Store to delete from
+        ids (list[str]): Docstore ids to delete
+    """
+    if index_type(vector_store.index) == "flat":
+        vector_store.delete(ids)
+        return
+
+    index = vector_store.index
+    doomed = set(ids)
+    keep = [row for row in range(index.ntotal) if vector_store.index_to_docstore_id[row] not in doomed]
+    stored = index.reconstruct_n(0, index.ntotal)
+    index.reset()
+    index.add(stored[keep])
+    vector_store.docstore.delete(ids)
+    vector_store.index_to_docstore_id = {
+        new_row: vector_store.index_to_docstore_id[row] for new_row, row in enumerate(keep)
+    }
+
+
+class IndexBuilder:
+    """
+    Adds a stream of embedding batches to a new or existing vector store
+
+    A new index is created once INDEX_TRAINING_ROWS vectors (or the whole
+    stream, if shorter) have arrived, so int8 ranges are learned from real
+    data; later batches go straight into the index, which ``grow_index``
+    switches to IVF if the corpus gets large. A bounded reservoir sample of
+    the added vectors is kept for ``measure_index``.
+    """
+
+    def __init__(self, embeddings, vector_store=None, quantize=False, docstore=None,
+                 training_rows=INDEX_TRAINING_ROWS, sample_rows=MEASURE_SAMPLE_ROWS, seed=0):
+        """
+        Args:
+            embeddings (Embeddings): Model used to embed queries
+            vector_store (FAISS): Existing store to extend (None to build one)
+            docstore (Docstore): Docstore of a store built here, e.g. a ``ChunkWriter``
+                that writes each batch to disk (in memory if omitted)
+            quantize (bool): Store vectors as 8-bit scalars
+            training_rows (int): Vectors buffered before a new index is trained
+            sample_rows (int): Size of the measurement sample
+            seed (int): Seed for the reservoir sample
+        """
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.quantize = quantize
+        self.docstore = docstore
+        self.training_rows = training_rows
+        self.sample_rows = sample_rows
+        self.added = 0
+        self._pending = []
+        self._sample = []
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, matrix, documents, ids):
+        """
+        Add one batch
+
+        Args:
+            matrix (np.ndarray): Normalized float32 vectors
+            documents (list[Document]): Documents in row order
+            ids (list[str]): Docstore ids in row order
+        """
+        with span("index build", accumulate=True, vectors=len(matrix)):
+            self._keep_sample(matrix)
+            self.added += len(matrix)
+            if self.vector_store is None:
+                self._pending.append((matrix, documents, ids))
+                if sum(len(batch[0]) for batch in self._pending) >= self.training_rows:
+                    self._create()
+                return
+            grow_index(self.vector_store, matrix, self.quantize)
+            add_matrix(self.vector_store, matrix, documents, ids)
+
+    def finish(self):
+        """
+        Flush buffered batches
+
+        Returns:
+            FAISS: The vector store (None if nothing was ever added)
+        """
+        if self._pending:
+            with span("index build", accumulate=True, vectors=0):
+                self._create()
+        return self.vector_store
+
+    def sample(self):
+        """
+        Sample of the added vectors (all of them if fewer than ``sample_rows``)
+
+        Returns:
+            np.ndarray: float32 matrix
+        """
+        if isinstance(self._sample, list):
+            return np.vstack(self._sample) if self._sample else np.empty((0, 0), dtype=np.float32)
+        return self._sample
+
+    def _create(self):
+        matrix = np.vstack([batch[0] for batch in self._pending])
+        index = create_index(matrix.shape[1], self.quantize, training_matrix=matrix)
+        self.vector_store = create_vector_store(self.embeddings, index, self.docstore)
+        for batch_matrix, documents, ids in self._pending:
+            add_matrix(self.vector_store, batch_matrix, documents, ids)
+        self._pending = []
+
+    def _keep_sample(self, matrix):
+        """Reservoir sampling (algorithm R), so every added vector is equally likely to be kept"""
+        if isinstance(self._sample, list):
+            # Still filling: keep whole batches, then consolidate once the reservoir is full
+            room = self.sample_rows - self.added
+            self._sample.append(matrix[:room])
+            if room > len(matrix):
+                return
+            self._sample = np.vstack(self._sample)
+            matrix, first_seen = matrix[room:], self.added + room
+        else:
+            first_seen = self.added
+        for offset, row in enumerate(matrix):
+            slot = self._rng.integers(0, first_seen + offset + 1)
+            if slot < self.sample_rows:
+                self._sample[slot] = row
+
+
+def index_memory_bytes(index):
+    """
+    Bytes used by the stored vectors of a flat, scalar-quantized or IVF index
+
+    Returns:
+        int: Vector storage size
+    """
+    return index.ntotal * index.code_size if hasattr(index, "code_size") else index.ntotal * index.d * 4
+
+
+def _mean_query_ms(search, queries):
+    """Mean single-query latency, one query per call as a user would send them"""
+    started = time.perf_counter()
+    for row in range(len(queries)):
+        search(queries[row:row + 1])
+    return (time.perf_counter() - started) * 1000 / max(len(queries), 1)
+
+
+def measure_index(matrix, index, k=10, sample_size=200, seed=0, target_recall=ANN_TARGET_RECALL):
+    """
+    Recall@k and query latency of an index against exact search
+
+    For IVF indexes, ``nprobe`` is first raised (in powers of two) until the
+    recall target is met, and the chosen value is set on ``index``.
+
+    If ``index`` holds other vectors besides ``matrix`` (an updated document
+    set), the rows are re-added to a clone of the trained index, so the
+    numbers only ever compare like with like. Sampled rows of the matrix
+    serve as queries, a good proxy for questions landing near chunks.
+
+    Args:
+        matrix (np.ndarray): Normalized float32 vectors
+        index (faiss.Index): Trained index
+        k (int): Neighbours compared per query
+        sample_size (int): Number of query rows
+        seed (int): Seed for the query sample
+        target_recall (float): Recall@k an IVF index is tuned to reach
+
+    Returns:
+        dict: index_type, recall_at_10, query_ms, exact_query_ms (and nprobe for IVF)
+    """
+    kind = index_type(index)
+    report = {"index_type": kind, "recall_at_10": 1.0, "query_ms": 0.0, "exact_query_ms": 0.0}
+    if len(matrix) == 0:
+        return report
+    k = min(k, len(matrix))
+    if index.ntotal == len(matrix):
+        probe = index
+    else:
+        probe = faiss.clone_index(index)
+        probe.reset()
+        probe.add(matrix)
+
+    rng = np.random.default_rng(seed)
+    queries = matrix[rng.choice(len(matrix), size=min(sample_size, len(matrix)), replace=False)]
+
+    # Exact top-k by brute-force inner product (no copy of the matrix)
+    _, exact = faiss.knn(queries, matrix, k, metric=faiss.METRIC_INNER_PRODUCT)
+
+    def recall():
+        _, approx = probe.search(queries, k)
+        hits = sum(len(set(e) & set(a)) for e, a in zip(exact, approx))
+        return round(hits / (len(queries) * k), 4)
+
+    if kind == "ivf":
+        ivf = faiss.extract_index_ivf(probe)
+        nprobe = 1
+        while True:
+            ivf.nprobe = nprobe
+            report["recall_at_10"] = recall()
+            if report["recall_at_10"] >= target_recall or nprobe >= ivf.nlist:
+                break
+            nprobe = min(nprobe * 2, ivf.nlist)
+        faiss.extract_index_ivf(index).nprobe = nprobe
+        report["nprobe"] = nprobe
+    else:
+        report["recall_at_10"] = recall()
+
+    timed = queries[:20]
+    report["query_ms"] = round(_mean_query_ms(lambda q: probe.search(q, k), timed), 3)
+    report["exact_query_ms"] = round(_mean_query_ms(
+        lambda q: faiss.knn(q, matrix, k, metric=faiss.METRIC_INNER_PRODUCT), timed
+    ), 3)
+    return report
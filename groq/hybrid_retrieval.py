@@ -0,0 +1,248 @@
+# ==================== IMPORTS ====================
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from typing import Any
+
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+
+# ==================== SETTINGS ====================
+# Reciprocal rank fusion weights (override per pipeline or via environment)
+VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))
+BM25_WEIGHT = float(os.getenv("HYBRID_BM25_WEIGHT", "1.0"))
+RRF_K = 60  # Standard RRF damping constant
+FETCH_K = 20  # Candidates taken from each ranking before fusion
+
+# Words, numbers and dotted/hyphenated terms such as "3.2" or "euler-lagrange"
+TOKEN_PATTERN = re.compile(r"\w+(?:[.\-]\w+)*")
+
+# Arrays of a saved BM25 index (bm25_<name>.npy), written next to index.faiss
+BM25_ARRAYS = ("terms", "indptr", "doc_ids", "weights")
+BM25_META_FILE = "bm25.json"  # Written last: a directory without it has no complete index
+
+
+def tokenize(text):
+    """
+    Lower-cased terms, keeping compound terms and their parts
+
+    "Theorem 3.2" -> ["theorem", "3.2", "3", "2"], so both the exact
+    theorem number and its pieces can match.
+
+    Args:
+        text (str): Any text
+
+    Returns:
+        list[str]: Terms
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        if "." in token or "-" in token:
+            terms.extend(part for part in re.split(r"[.\-]", token) if part)
+    return terms
+
+
+def term_hash(term):
+    """64-bit hash a term is looked up by (collisions are negligible at vocabulary sizes)"""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _term_hashes(terms):
+    return np.fromiter((term_hash(term) for term in terms), dtype=np.uint64)
+
+
+# ==================== SPARSE INDEX ====================
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index stored as flat NumPy arrays
+
+    Postings are grouped per term (CSR layout) with their BM25 weight
+    precomputed, so scoring a query is a few array slices plus one
+    ``np.bincount`` over the matching postings. Terms are found by binary
+    search over their sorted hashes, so a saved index is used straight from
+    memory-mapped files, without loading a vocabulary.
+    """
+
+    def __init__(self, texts, k1=1.5, b=0.75, documents=None):
+        """
+        Args:
+            texts (Iterable[str]): Chunk texts, in chunk order (consumed once)
+            k1 (float): Term-frequency saturation
+            b (float): Length normalization strength
+            documents (Sequence[Document]): Chunks by position, returned by searches
+        """
+        self.documents = documents
+        vocabulary = {}
+        term_ids, doc_ids, tfs, lengths = [], [], [], []
+
+        for doc, text in enumerate(texts):
+            terms = tokenize(text)
+            lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(doc)
+                tfs.append(count)
+        self.size = len(lengths)
+
+        # Number terms in hash order, so a query term is found by binary search
+        hashes = _term_hashes(vocabulary)
+        hash_order = np.argsort(hashes, kind="stable")
+        rank = np.empty(len(vocabulary), dtype=np.int64)
+        rank[hash_order] = np.arange(len(vocabulary))
+        self.terms = hashes[hash_order]
+
+        term_ids = rank[np.asarray(term_ids, dtype=np.int64)]
+        order = np.argsort(term_ids, kind="stable")
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)[order]
+        tfs = np.asarray(tfs, dtype=np.float32)[order]
+
+        # indptr[t]:indptr[t + 1] is the posting range of term t
+        doc_freq = np.bincount(term_ids, minlength=len(vocabulary))
+        self.indptr = np.concatenate(([0], np.cumsum(doc_freq)))
+
+        lengths = np.asarray(lengths, dtype=np.float32)
+        avg_length = lengths.mean() if self.size else 1.0
+        idf = np.log1p((self.size - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        norm = k1 * (1 - b + b * lengths[self.doc_ids] / max(avg_length, 1e-9))
+        posting_idf = np.repeat(idf, doc_freq)
+        self.weights = posting_idf * tfs * (k1 + 1) / (tfs + norm)
+
+    @classmethod
+    def from_documents(cls, documents, **kwargs):
+        """Build the index over document chunks"""
+        return cls([doc.page_content for doc in documents], documents=documents, **kwargs)
+
+    def save(self, directory):
+        """
+        Write the index arrays to ``directory`` (see ``load``)
+
+        Args:
+            directory (str): Existing directory, e.g. a stored index directory
+        """
+        for name in BM25_ARRAYS:
+            np.save(os.path.join(directory, f"bm25_{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, BM25_META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"size": self.size}, f)
+
+    @classmethod
+    def load(cls, directory, documents=None):
+        """
+        Open a saved index with its arrays memory-mapped read-only
+
+        Args:
+            directory (str): Directory written by ``save``
+            documents (Sequence[Document]): Chunks by position, returned by searches
+
+        Returns:
+            BM25Index: The index, or None if the directory holds no complete index
+        """
+        try:
+            with open(os.path.join(directory, BM25_META_FILE), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        index = cls.__new__(cls)
+        index.documents = documents
+        index.size = meta["size"]
+        for name in BM25_ARRAYS:
+            setattr(index, name, np.load(os.path.join(directory, f"bm25_{name}.npy"), mmap_mode="r"))
+        return index
+
+    def scores(self, query):
+        """
+        BM25 score of every chunk for a query
+
+        Args:
+            query (str): Search text
+
+        Returns:
+            np.ndarray: float32 scores, one per chunk
+        """
+        hashes = _term_hashes(set(tokenize(query)))
+        positions = np.searchsorted(self.terms, hashes)
+        known = positions < len(self.terms)
+        term_ids = positions[known][self.terms[positions[known]] == hashes[known]]
+        if not len(term_ids):
+            return np.zeros(self.size, dtype=np.float32)
+        slices = [slice(self.indptr[t], self.indptr[t + 1]) for t in term_ids]
+        docs = np.concatenate([self.doc_ids[s] for s in slices])
+        weights = np.concatenate([self.weights[s] for s in slices])
+        return np.bincount(docs, weights=weights, minlength=self.size).astype(np.float32)
+
+    def search(self, query, k):
+        """
+        Top-k chunk positions for a query
+
+        Args:
+            query (str): Search text
+            k (int): Number of results
+
+        Returns:
+            list[int]: Chunk positions, best first (only chunks with a positive score)
+        """
+        scores = self.scores(query)
+        k = min(k, self.size)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [int(i) for i in top if scores[i] > 0]
+
+
+# ==================== FUSION ====================
+def reciprocal_rank_fusion(rankings, weights, k=RRF_K):
+    """
+    Fuse ranked lists with weighted reciprocal rank fusion
+
+    Args:
+        rankings (list[list]): Ranked lists of hashable keys, best first
+        weights (list[float]): Weight of each list
+        k (int): Damping constant (higher = flatter rank contribution)
+
+    Returns:
+        list: Keys ordered by fused score
+    """
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        # A key repeated within one list (duplicate chunks) counts once, at its best rank
+        for rank, key in enumerate(dict.fromkeys(ranking), 1):
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+def _chunk_key(doc):
+    return (doc.metadata.get("source"), doc.metadata.get("page"), doc.page_content)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense FAISS search fused with sparse BM25 via reciprocal rank fusion
+
+    Exact terms that embeddings blur (theorem numbers, formula and author
+    names) are caught by BM25, while paraphrases are caught by the vectors.
+    """
+
+    vector_store: Any
+    bm25: Any  # BM25Index whose ``documents`` holds the chunk at each position
+    k: int = 4
+    fetch_k: int = FETCH_K
+    vector_weight: float = VECTOR_WEIGHT
+    bm25_weight: float = BM25_WEIGHT
+    rrf_k: int = RRF_K
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        dense = self.vector_store.similarity_search(query, k=self.fetch_k)
+        sparse = [self.bm25.documents[i] for i in self.bm25.search(query, self.fetch_k)]
+
+        by_key = {}
+        for doc in dense + sparse:
+            by_key.setdefault(_chunk_key(doc), doc)
+        fused = reciprocal_rank_fusion(
+            [[_chunk_key(doc) for doc in dense], [_chunk_key(doc) for doc in sparse]],
+            [self.vector_weight, self.bm25_weight],
+            k=self.rrf_k
+        )
+        return [by_key[key] for key in fused[:self.k]]
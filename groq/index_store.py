@@ -0,0 +1,532 @@
+# ==================== IMPORTS ====================
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+import weakref
+from collections import defaultdict
+
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+from chunk_store import CHUNKS_FILE, ChunkWriter, LazyChunks, RowChunks, SqliteDocstore, iter_texts, write_chunks
+from embedding_cache import DEFAULT_CACHE_DIR
+from hybrid_retrieval import BM25_META_FILE, BM25Index
+from telemetry import span
+from embedding_engine import (
+    EMBED_BATCH_SIZE, EmbeddingEngine, IndexBuilder, delete_vectors, index_memory_bytes, index_type,
+    measure_index
+)
+
+# ==================== SETTINGS ====================
+# Seconds a shared index stays mapped after its last session let go of it
+SHARED_INDEX_IDLE_SECONDS = float(os.getenv("SHARED_INDEX_IDLE_SECONDS", "600"))
+# Map the stored index file instead of copying it to the heap. IO_FLAG_MMAP alone
+# only maps IVF lists; MMAP_IFC also maps the codes of flat and SQ8 indexes.
+MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+# ==================== KEY HELPERS ====================
+def file_key(data):
+    """
+    Content hash of one uploaded file
+
+    Args:
+        data (bytes): Raw file bytes
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def document_set_key(file_keys):
+    """
+    Key for a set of files, independent of upload order and duplicates
+
+    Args:
+        file_keys (list[str]): Per-file content hashes
+
+    Returns:
+        str: Hex SHA-256 digest of the sorted, de-duplicated keys
+    """
+    joined = "\n".join(sorted(set(file_keys)))
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
+def chunk_id(key, position):
+    """Stable docstore id for the n-th chunk of a file"""
+    return f"{key}:{position}"
+
+
+# ==================== SHARED INDEXES ====================
+class _SharedIndex:
+    """
+    One stored document set held once per process
+
+    The FAISS index is memory-mapped read-only, so every session (and every
+    worker process on the machine) searches the same page-cache pages, and
+    chunk text stays in SQLite until a hit or a tool asks for it.
+    Must never be written to: adding to a mapped index aborts the process.
+    """
+
+    def __init__(self, index, docstore, manifest):
+        self.index = index
+        self.docstore = docstore
+        self.index_to_docstore_id = docstore.row_ids()
+        self.manifest = manifest
+        self.refs = 0
+        self.last_used = time.monotonic()
+        self.extras = {}  # Derived per-set data (chunk lists, BM25...) built once
+
+
+# ==================== PERSISTENT INDEX STORE ====================
+class FaissIndexStore:
+    """
+    On-disk FAISS indexes, one per document set
+
+    Each index directory holds the FAISS index, the chunk text and metadata
+    in SQLite (``chunks.sqlite``) and a ``manifest.json`` that
+    maps every file hash to the docstore ids of its chunks. That mapping is
+    what allows a new document set to start from the closest stored index
+    and only add/remove the vectors of the files that changed.
+    """
+
+    def __init__(self, root=None, quantize=False):
+        """
+        Args:
+            root (str): Directory holding all indexes
+                (defaults to DEFAULT_CACHE_DIR/indexes/<flat|sq8>)
+            quantize (bool): Store vectors as 8-bit scalars (~4x less memory)
+        """
+        self.quantize = quantize
+        self.root = root or os.path.join(DEFAULT_CACHE_DIR, "indexes", "sq8" if quantize else "flat")
+        os.makedirs(self.root, exist_ok=True)
+        # One lock per document set: sessions building different sets don't wait
+        self._locks_guard = threading.Lock()
+        self._locks = defaultdict(threading.Lock)
+        # Reentrant: a session's finalizer may release its lease while this thread holds the lock
+        self._live_lock = threading.RLock()
+        self._live = {}
+
+    # ---------- disk layout ----------
+    def _path(self, set_key):
+        return os.path.join(self.root, set_key)
+
+    def _read_manifest(self, set_key):
+        try:
+            with open(os.path.join(self._path(set_key), "manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _chunks_path(self, set_key):
+        """SQLite chunk file of a stored set, converted from an older pickled docstore if needed"""
+        path = os.path.join(self._path(set_key), CHUNKS_FILE)
+        if not os.path.exists(path):
+            with span("docstore convert"):
+                with open(os.path.join(self._path(set_key), "index.pkl"), "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)  # Only ever reads files this store wrote
+                tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                write_chunks(tmp_path, docstore, index_to_docstore_id)
+                os.replace(tmp_path, path)
+        return path
+
+    def _load(self, set_key, embeddings, directory):
+        """
+        Writable copy of a stored set, used as the base of an update
+
+        The vectors are read into memory; the chunk file is copied into
+        ``directory`` and changed there, so no chunk text is loaded.
+        """
+        with span("index load"):
+            chunks_path = os.path.join(directory, CHUNKS_FILE)
+            shutil.copyfile(self._chunks_path(set_key), chunks_path)
+            docstore = ChunkWriter(chunks_path)
+            return FAISS(
+                embeddings,
+                faiss.read_index(os.path.join(self._path(set_key), "index.faiss")),
+                docstore,
+                docstore.row_ids(),
+                distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+            )
+
+    def _map(self, set_key, manifest):
+        """Memory-map a stored index and open its chunk file; nothing is deserialized"""
+        with span("index map"):
+            index = faiss.read_index(os.path.join(self._path(set_key), "index.faiss"), MMAP_FLAGS)
+            docstore = SqliteDocstore(self._chunks_path(set_key))
+        return _SharedIndex(index, docstore, manifest)
+
+    def _acquire(self, set_key, manifest=None):
+        """Lease the shared entry of a stored set, mapping it on first use"""
+        with self._live_lock:
+            entry = self._live.get(set_key)
+        if entry is None:
+            entry = self._map(set_key, manifest or self._read_manifest(set_key))
+        with self._live_lock:
+            # Another thread may have mapped it meanwhile: keep the first one
+            entry = self._live.setdefault(set_key, entry)
+            entry.refs += 1
+            entry.last_used = time.monotonic()
+        self.evict_idle()
+        return entry
+
+    def _release(self, set_key, entry):
+        with self._live_lock:
+            entry.refs -= 1
+            entry.last_used = time.monotonic()
+        self.evict_idle()
+
+    def _session_store(self, set_key, entry, embeddings):
+        """Per-session vector store over a shared entry; its lease ends when it is collected"""
+        vector_store = FAISS(
+            embeddings,
+            entry.index,
+            entry.docstore,
+            entry.index_to_docstore_id,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+        weakref.finalize(vector_store, self._release, set_key, entry)
+        return vector_store
+
+    def _save(self, set_key, vector_store, manifest, tmp_path):
+        """
+        Complete a temp directory, then move it into place so readers never
+        see half an index
+
+        The chunk file was written there by the ``ChunkWriter`` during the build.
+        """
+        final_path = self._path(set_key)
+        with span("index save"):
+            vector_store.docstore.close()
+            faiss.write_index(vector_store.index, os.path.join(tmp_path, "index.faiss"))
+            self._write_bm25(os.path.join(tmp_path, CHUNKS_FILE), tmp_path)
+            with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+        try:
+            os.rename(tmp_path, final_path)
+        except OSError:
+            # Another session saved the same document set first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @staticmethod
+    def _write_bm25(chunks_path, directory):
+        """BM25 arrays over the rows of a chunk file, streamed from SQLite and saved to ``directory``"""
+        with span("bm25 build"):
+            BM25Index(iter_texts(chunks_path)).save(directory)
+
+    def _closest_stored_set(self, wanted):
+        """Stored document set sharing the most files with ``wanted``"""
+        best_key, best_manifest, best_score = None, None, (0, 0)
+        for name in os.listdir(self.root):
+            if name.startswith("."):
+                continue
+            manifest = self._read_manifest(name)
+            if not manifest:
+                continue
+            stored = set(manifest["files"])
+            overlap = len(stored & wanted)
+            # Prefer the most shared files, then the fewest vectors to delete
+            score = (overlap, -len(stored - wanted))
+            if overlap and score > best_score:
+                best_key, best_manifest, best_score = name, manifest, score
+        return best_key, best_manifest
+
+    def _build(self, files, embeddings, load_chunks, progress, batch_size, deduplicator, report, tmp_path):
+        """
+        Build or update the index of a document set that is not stored yet
+
+        Starts from the closest stored set, if any, and saves the result.
+        Arguments are those of ``get_or_update``; ``report`` is filled in.
+
+        Args:
+            tmp_path (str): Empty temp directory the new index is written to
+
+        Returns:
+            dict: The saved manifest (None if nothing could be indexed)
+        """
+        base_key, manifest = self._closest_stored_set(set(files))
+        if base_key:
+            vector_store = self._load(base_key, embeddings, tmp_path)
+            docstore = vector_store.docstore
+            report["status"] = "updated"
+        else:
+            vector_store, manifest = None, {"files": {}}
+            docstore = ChunkWriter(os.path.join(tmp_path, CHUNKS_FILE))
+            report["status"] = "built"
+
+        # Drop vectors of files that are no longer part of the set, unless a
+        # remaining file shares them through deduplication
+        removed = [key for key in manifest["files"] if key not in files]
+        stale_ids = list(dict.fromkeys(i for key in removed for i in manifest["files"].pop(key)["ids"]))
+        still_used = {i for entry in manifest["files"].values() for i in entry["ids"]}
+        stale_ids = [i for i in stale_ids if i not in still_used]
+        if stale_ids:
+            with span("index delete", vectors=len(stale_ids)):
+                delete_vectors(vector_store, stale_ids)
+        report["removed_files"] = len(removed)
+        report["removed_chunks"] = len(stale_ids)
+
+        # Parse only the files the base index does not have
+        added = [key for key in files if key not in manifest["files"]]
+        if progress:
+            progress.total_files = len(added)
+        # Entries join the manifest only once their file has parsed completely
+        new_files = {key: {"name": files[key], "ids": []} for key in added}
+        contributed = defaultdict(list)  # Vectors each new file added itself
+        failed = []
+        # A file that failed before may have left chunks that other files share
+        stored_ids = {i for entry in manifest["files"].values() for i in entry["ids"]}
+
+        def numbered_chunks():
+            """Give every streamed chunk its stable docstore id, skipping duplicates"""
+            for key, chunk in load_chunks(added):
+                if chunk is None:
+                    failed.append(key)
+                    continue
+                ids = new_files[key]["ids"]
+                doc_id = chunk_id(key, len(ids))
+                if doc_id in stored_ids:
+                    ids.append(doc_id)
+                    continue
+                kept_id = doc_id
+                if deduplicator:
+                    with span("dedup", accumulate=True, chunks=1):
+                        kept_id = deduplicator.check(doc_id, chunk)
+                ids.append(kept_id)
+                if kept_id == doc_id:
+                    contributed[key].append(doc_id)
+                    yield doc_id, chunk
+
+        # Embed and index batch by batch as chunks arrive; no full chunk list or matrix,
+        # and every batch's chunks go straight to the chunk file
+        builder = IndexBuilder(embeddings, vector_store, self.quantize, docstore=docstore)
+        engine = EmbeddingEngine(embeddings, batch_size=batch_size)
+        stream = numbered_chunks() if added else ()
+        for ids, documents, matrix in engine.embed_stream(stream, progress):
+            builder.add(matrix, documents, ids)
+        vector_store = builder.finish()
+        for key in failed:
+            new_files.pop(key, None)
+        manifest["files"].update(new_files)
+
+        if deduplicator and vector_store is not None:
+            docstore.update_metadata({
+                original: {"duplicate_sources": sources}
+                for original, sources in deduplicator.duplicate_sources.items()
+            })
+
+        # A file that failed part-way already streamed some pages: roll its
+        # vectors back, except those a kept file shares through deduplication
+        still_used = {i for entry in manifest["files"].values() for i in entry["ids"]}
+        rolled_back = [i for key in failed for i in contributed[key] if i not in still_used]
+        if rolled_back:
+            with span("index rollback", vectors=len(rolled_back)):
+                delete_vectors(vector_store, rolled_back)
+        report["added_files"] = len(new_files)
+        report["added_chunks"] = builder.added - len(rolled_back)
+        if deduplicator:
+            report["dedup"] = deduplicator.stats()
+
+        # Measure what int8 storage / IVF search cost in recall, and what they save in latency
+        if report["added_chunks"]:
+            with span("index measure"):
+                manifest["search"] = measure_index(builder.sample(), vector_store.index)
+
+        if vector_store is None or not vector_store.index.ntotal:
+            docstore.close()
+            return None
+        if failed:
+            # Store what was indexed under its own key; the full set stays unknown
+            report["document_set"] = document_set_key(manifest["files"])
+        self._save(report["document_set"], vector_store, manifest, tmp_path)
+        return manifest
+
+    # ---------- public API ----------
+    def get_or_update(self, files, embeddings, load_chunks, progress=None,
+                      batch_size=EMBED_BATCH_SIZE, deduplicator=None):
+        """
+        Return the index for a document set, building only what is missing
+
+        Args:
+            files (dict): Mapping of file hash -> display name, in upload order
+            embeddings (Embeddings): Embedding model used for new chunks
+            load_chunks (callable): ``load_chunks(file_hashes)`` returning an iterable of
+                ``(file hash, chunk)`` pairs, each file's chunks in order; only called with
+                files not already indexed, and consumed lazily. A ``(file hash, None)`` pair
+                marks a file that failed to parse: it is left out of the stored set, so a
+                later upload parses it again
+            progress (IngestionProgress): Optional tracker for embedding batches
+            batch_size (int): Chunks per embedding call
+            deduplicator (ChunkDeduplicator): Optional filter; a duplicate chunk is not
+                embedded, its file lists the id of the kept original instead
+
+        Returns:
+            tuple: (vector_store or None, chunks in upload order, report dict); when files
+                failed, ``report["document_set"]`` is the key of the files that were indexed
+        """
+        set_key = document_set_key(files)
+        report = {
+            "document_set": set_key,
+            "status": "loaded",
+            "added_files": 0,
+            "removed_files": 0,
+            "added_chunks": 0,
+            "removed_chunks": 0,
+            "quantized": self.quantize
+        }
+
+        with self._locks_guard:
+            set_lock = self._locks[set_key]
+
+        with set_lock:
+            with self._live_lock:
+                entry = self._live.get(set_key)
+            manifest = entry.manifest if entry else self._read_manifest(set_key)
+            if entry:
+                report["status"] = "shared"
+            if not manifest:
+                # The new index is written to a temp directory as it is built
+                tmp_path = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+                os.makedirs(tmp_path)
+                try:
+                    manifest = self._build(files, embeddings, load_chunks, progress, batch_size,
+                                           deduplicator, report, tmp_path)
+                finally:
+                    shutil.rmtree(tmp_path, ignore_errors=True)
+                if manifest is None:
+                    return None, [], report
+                set_key = report["document_set"]
+
+            # Sessions search the mapped file; the heap copy built above is freed on return
+            entry = self._acquire(set_key, manifest)
+
+        vector_store, chunks = self._session(set_key, entry, files, embeddings)
+        report["vector_bytes"] = index_memory_bytes(entry.index)
+        report["index_type"] = index_type(entry.index)
+        report["shared_sessions"] = entry.refs
+        report.update(entry.manifest.get("search", {}))
+        return vector_store, chunks, report
+
+    def lease(self, set_key, files, embeddings):
+        """
+        Open a stored document set for one session, without parsing or embedding
+
+        The lease ends when the returned vector store is collected, so a set
+        no session holds is unmapped after SHARED_INDEX_IDLE_SECONDS.
+
+        Args:
+            set_key (str): Document set key returned by ``get_or_update``
+            files (dict): Mapping of file hash -> display name, in upload order
+            embeddings (Embeddings): Embedding model for queries
+
+        Returns:
+            tuple: (vector_store, chunks in upload order), or None if the set is not stored
+        """
+        with self._live_lock:
+            entry = self._live.get(set_key)
+        manifest = entry.manifest if entry else self._read_manifest(set_key)
+        if not manifest:
+            return None
+        return self._session(set_key, self._acquire(set_key, manifest), files, embeddings)
+
+    def _session(self, set_key, entry, files, embeddings):
+        """Session vector store and ordered chunks over a leased entry"""
+        vector_store = self._session_store(set_key, entry, embeddings)
+
+        # Ordered chunk list for the learning tools, its text read only when used;
+        # a deduplicated chunk appears once, at its first position
+        def ordered_chunks():
+            indexed = entry.manifest["files"]
+            ordered_ids = dict.fromkeys(i for key in files if key in indexed for i in indexed[key]["ids"])
+            return LazyChunks(entry.docstore, list(ordered_ids))
+
+        return vector_store, self.shared(set_key, ("chunks", tuple(files)), ordered_chunks)
+
+    def bm25_index(self, set_key):
+        """
+        BM25 index of a stored set, memory-mapped from its directory
+
+        Its positions are FAISS rows, so every session of the set shares it
+        whatever its upload order. Directories saved before the index was
+        stored get it built and saved on first use.
+
+        Args:
+            set_key (str): Document set key (must currently be leased)
+
+        Returns:
+            BM25Index: Shared index whose ``documents`` load chunk text by row
+        """
+        def open_bm25():
+            path = self._path(set_key)
+            with self._live_lock:
+                entry = self._live.get(set_key)
+            documents = RowChunks(entry.docstore if entry else SqliteDocstore(self._chunks_path(set_key)))
+            index = BM25Index.load(path, documents)
+            if index is None:
+                tmp_path = os.path.join(path, f".bm25-{uuid.uuid4().hex}")
+                os.makedirs(tmp_path)
+                self._write_bm25(self._chunks_path(set_key), tmp_path)
+                # The metadata file goes last, so readers never open half an index
+                for name in sorted(os.listdir(tmp_path), key=lambda n: n == BM25_META_FILE):
+                    os.replace(os.path.join(tmp_path, name), os.path.join(path, name))
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                index = BM25Index.load(path, documents)
+            return index
+
+        return self.shared(set_key, "bm25", open_bm25)
+
+    def shared(self, set_key, name, factory):
+        """
+        Per-document-set value built once and shared by every session of the set
+
+        Args:
+            set_key (str): Document set key (must currently be leased)
+            name (hashable): Value name, e.g. ("chunks", upload order)
+            factory (callable): Builds the value on first request
+
+        Returns:
+            The shared value (``factory()`` itself if the set is not held)
+        """
+        with self._live_lock:
+            entry = self._live.get(set_key)
+            if entry is not None and name in entry.extras:
+                return entry.extras[name]
+        value = factory()
+        if entry is not None:
+            with self._live_lock:
+                value = entry.extras.setdefault(name, value)
+        return value
+
+    def evict_idle(self, idle_seconds=SHARED_INDEX_IDLE_SECONDS):
+        """
+        Unmap document sets no session has used for ``idle_seconds``
+
+        Returns:
+            int: Number of sets evicted
+        """
+        now = time.monotonic()
+        with self._live_lock:
+            idle = [key for key, entry in self._live.items()
+                    if entry.refs <= 0 and now - entry.last_used >= idle_seconds]
+            for key in idle:
+                del self._live[key]
+        return len(idle)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Mapped document sets, sessions holding them and vector bytes mapped
+        """
+        with self._live_lock:
+            entries = list(self._live.values())
+        return {
+            "sets": len(entries),
+            "sessions": sum(entry.refs for entry in entries),
+            "vector_bytes": sum(index_memory_bytes(entry.index) for entry in entries)
+        }
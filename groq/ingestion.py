@@ -0,0 +1,359 @@
+# ==================== IMPORTS ====================
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import docx2txt
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+# ==================== DEFAULTS ====================
+# Worker processes for parsing; PDF text extraction is CPU-bound, so threads
+# would serialize on the GIL. Override with INGEST_WORKERS.
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0")) or os.cpu_count() or 1
+# PDF pages parsed per worker task, so a worker never sends back a whole long file
+INGEST_PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "16"))
+
+# ==================== PROGRESS TRACKING ====================
+class IngestionProgress:
+    """
+    Counters for the real work done during ingestion
+
+    UI code passes a ``listener`` that is called after every update, so the
+    progress display is driven by the pipeline instead of simulated delays.
+    """
+
+    def __init__(self, total_files=0, listener=None):
+        """
+        Args:
+            total_files (int): Number of files that will be parsed
+            listener (callable): ``listener(progress)`` called after every update
+        """
+        self.total_files = total_files
+        self.listener = listener
+        self.stage = "parsing"
+        self.files_done = 0
+        self.pages = 0
+        self.chunks = 0
+        self.batches_done = 0
+        self.batches_total = 0
+        self.embedded_chunks = 0
+        self._embed_started = None
+        self._lock = threading.Lock()
+
+    def _update(self, **changes):
+        with self._lock:
+            for name, delta in changes.items():
+                setattr(self, name, getattr(self, name) + delta)
+        if self.listener:
+            self.listener(self)
+
+    def page_parsed(self, count=1):
+        """Record pages (or whole text documents) returned by a loader"""
+        self._update(pages=count)
+
+    def file_done(self, chunk_count=0):
+        """Record a fully parsed file (and its chunks if already split)"""
+        self._update(files_done=1, chunks=chunk_count)
+
+    def chunks_produced(self, count):
+        """Record chunks produced by the splitter"""
+        self._update(chunks=count)
+
+    def start_embedding(self, batches_total=0):
+        """Switch to the embedding stage and start the throughput clock (0 = total unknown)"""
+        self.stage = "embedding"
+        self.batches_total = batches_total
+        self._embed_started = time.perf_counter()
+        self._update()
+
+    def batch_done(self, chunk_count):
+        """Record one embedding batch"""
+        self._update(batches_done=1, embedded_chunks=chunk_count)
+
+    def chunks_per_second(self):
+        """
+        Embedding throughput since the embedding stage started
+
+        Returns:
+            float: Chunks embedded per second (0.0 before the first batch)
+        """
+        if self._embed_started is None or not self.embedded_chunks:
+            return 0.0
+        elapsed = time.perf_counter() - self._embed_started
+        return self.embedded_chunks / elapsed if elapsed > 0 else 0.0
+
+    def fraction(self):
+        """
+        Overall completion in [0, 1], parsing and embedding weighted equally
+
+        Streaming ingestion embeds while files are still being parsed, so the
+        embedded share is taken of the chunks produced so far.
+
+        Returns:
+            float: Progress fraction for a progress bar
+        """
+        parsed = self.files_done / self.total_files if self.total_files else 1.0
+        if self.batches_total:
+            embedded = self.batches_done / self.batches_total
+        else:
+            embedded = self.embedded_chunks / self.chunks if self.chunks else 0.0
+        return 0.5 * parsed + 0.5 * parsed * min(embedded, 1.0)
+
+
+# ==================== IN-MEMORY PARSING ====================
+def parse_document_bytes(name, data):
+    """
+    Parse an uploaded file straight from its bytes (no temp file)
+
+    Produces the same documents as PyPDFLoader / Docx2txtLoader / TextLoader:
+    one document per PDF page, one per DOCX or TXT file.
+
+    Args:
+        name (str): Original file name (used for the format and ``source`` metadata)
+        data (bytes): Raw file content
+
+    Returns:
+        list[Document]: Parsed documents
+
+    Raises:
+        ValueError: If the file format is not supported
+    """
+    return list(iter_document_pages(name, data))
+
+
+def iter_document_pages(name, data):
+    """
+    Lazily parse an uploaded file, one page at a time
+
+    Only the current page's text is extracted, so a long PDF is never held
+    as a full list of pages.
+
+    Args:
+        name (str): Original file name (used for the format and ``source`` metadata)
+        data (bytes): Raw file content
+
+    Yields:
+        Document: One document per PDF page, one per DOCX or TXT file
+
+    Raises:
+        ValueError: If the file format is not supported
+    """
+    suffix = name.rsplit(".", 1)[-1].lower()
+    if suffix == "pdf":
+        reader = PdfReader(io.BytesIO(data))
+        for i in range(len(reader.pages)):
+            yield Document(page_content=reader.pages[i].extract_text(), metadata={"source": name, "page": i})
+    elif suffix == "docx":
+        yield Document(page_content=docx2txt.process(io.BytesIO(data)), metadata={"source": name})
+    elif suffix == "txt":
+        yield Document(page_content=data.decode("utf-8"), metadata={"source": name})
+    else:
+        raise ValueError(f"Unsupported file format: {suffix}")
+
+
+class LoadResult:
+    """Outcome of parsing one uploaded file"""
+
+    def __init__(self, key, name, documents=None, error=None, seconds=0.0):
+        """
+        Args:
+            key (str): Content hash of the file
+            name (str): Original file name
+            documents (iterable): Parsed documents (empty on failure); a lazy
+                iterator for files streamed by ``iter_parsed_files``
+            error (str): Error message if parsing failed
+            seconds (float): Parsing time (accumulated as a streamed file is consumed)
+        """
+        self.key = key
+        self.name = name
+        self.documents = documents or []
+        self.error = error
+        self.seconds = seconds
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool():
+    """
+    Return the process-wide parsing pool, starting it on first use
+
+    The pool is kept alive between questions so worker start-up is paid once.
+    "spawn" is used because forking a multi-threaded server is unsafe.
+
+    Returns:
+        ProcessPoolExecutor: Shared worker pool
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=INGEST_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+
+def _discard_pool(pool):
+    """Drop a broken pool (a worker died, e.g. out of memory) so the next caller starts a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_timed(name, data, start=0, stop=None):
+    """
+    Worker entry point: one range of pages plus the worker's own parsing time
+
+    Args:
+        name (str): Original file name
+        data (bytes): Raw file content
+        start (int): First page to parse
+        stop (int): Page after the last one to parse (None = to the end)
+
+    Returns:
+        tuple: ``(documents, page_count, seconds)`` where ``page_count`` is the
+            number of pages in the whole file (1 for DOCX and TXT)
+    """
+    started = time.perf_counter()
+    if name.rsplit(".", 1)[-1].lower() == "pdf":
+        reader = PdfReader(io.BytesIO(data))
+        page_count = len(reader.pages)
+        stop = page_count if stop is None else min(stop, page_count)
+        documents = [
+            Document(page_content=reader.pages[i].extract_text(), metadata={"source": name, "page": i})
+            for i in range(start, stop)
+        ]
+    else:
+        page_count = 1
+        documents = parse_document_bytes(name, data) if start == 0 else []
+    return documents, page_count, time.perf_counter() - started
+
+
+def _submit(pool, *args):
+    """Submit a parsing task, replacing the pool first if it is already broken"""
+    try:
+        return pool.submit(_parse_timed, *args), pool
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        pool = get_parse_pool()
+        return pool.submit(_parse_timed, *args), pool
+
+
+def _pool_error(error, pool):
+    """Message for a failed parsing task (dropping the pool if a worker died)"""
+    if isinstance(error, BrokenProcessPool):
+        _discard_pool(pool)
+        return "Parser process crashed (out of memory?) while this file was parsed"
+    return str(error)
+
+
+def iter_parsed_files(files, window=INGEST_WORKERS, pages_per_task=INGEST_PAGES_PER_TASK):
+    """
+    Parse files and yield each one as soon as its pages are available
+
+    A single file is parsed lazily in this process, page by page. Several
+    files are parsed by the worker pool in ranges of ``pages_per_task``
+    pages: the first range of up to ``window`` files is in flight at once,
+    and a file's remaining ranges are parsed (at most ``window`` ahead) while
+    its pages are consumed. Only those ranges are ever held, never a whole
+    file's page list.
+
+    If a streamed file fails part-way, iteration of its pages stops and
+    the error is set on its result once the pages are consumed. If a
+    worker process dies, the files it took down with the pool are reported
+    as failed and the rest are parsed by a fresh pool.
+
+    Args:
+        files (list[tuple]): ``(key, name, data)`` for every file to parse
+        window (int): Maximum files (and ranges of the current file) parsed
+            ahead of the consumer
+        pages_per_task (int): PDF pages parsed per worker task
+
+    Yields:
+        LoadResult: One per file, in the order their first pages complete
+    """
+    if len(files) == 1:
+        key, name, data = files[0]
+        result = LoadResult(key, name)
+
+        def pages():
+            """Pages of the file, timing only the parsing (not the consumer's work)"""
+            parser = iter_document_pages(name, data)
+            while True:
+                started = time.perf_counter()
+                try:
+                    page = next(parser)
+                except StopIteration:
+                    return
+                except Exception as e:
+                    result.error = str(e)
+                    return
+                finally:
+                    result.seconds += time.perf_counter() - started
+                yield page
+
+        result.documents = pages()
+        yield result
+        return
+
+    def remaining_pages(result, data, first, page_count):
+        """The file's pages: the first range, then the rest as workers finish them"""
+        ranges = iter(range(pages_per_task, page_count, pages_per_task))
+        in_flight = []
+        try:
+            yield from first
+            del first
+            while True:
+                for start in ranges:
+                    future, pool = _submit(get_parse_pool(), result.name, data, start, start + pages_per_task)
+                    in_flight.append((future, pool))
+                    if len(in_flight) >= window:
+                        break
+                if not in_flight:
+                    return
+                future, pool = in_flight.pop(0)
+                try:
+                    documents, _, seconds = future.result()
+                except Exception as e:
+                    result.error = _pool_error(e, pool)
+                    return
+                result.seconds += seconds
+                yield from documents
+        finally:
+            # A consumer that stops early leaves nothing running
+            for future, _ in in_flight:
+                future.cancel()
+
+    pending = {}
+    remaining = iter(files)
+    while True:
+        # Keep the window full, then hand over whichever file starts first
+        for key, name, data in remaining:
+            future, pool = _submit(get_parse_pool(), name, data, 0, pages_per_task)
+            pending[future] = (key, name, data, pool)
+            if len(pending) >= window:
+                break
+        if not pending:
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            key, name, data, owner = pending.pop(future)
+            try:
+                first, page_count, seconds = future.result()
+            except Exception as e:
+                # One unreadable file never aborts the rest of the batch
+                yield LoadResult(key, name, error=_pool_error(e, owner))
+                continue
+            result = LoadResult(key, name, seconds=seconds)
+            result.documents = remaining_pages(result, data, first, page_count)
+            yield result
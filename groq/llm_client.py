@@ -0,0 +1,436 @@
+# ==================== IMPORTS ====================
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+from typing import Any, Optional
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.pydantic_v1 import SecretStr
+
+# ==================== SETTINGS ====================
+# Point at a local stub (see stub_llm_server.py) to test without the real API
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))       # Backoff ceiling of the first retry
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))  # ... and of any retry
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+
+class LLMRequestError(RuntimeError):
+    """Chat completion request that failed (after any retries)"""
+
+    def __init__(self, status_code, message):
+        super().__init__(f"LLM request failed ({status_code}): {message}")
+        self.status_code = status_code
+
+
+# ==================== HELPERS ====================
+def request_key(api_key, payload):
+    """
+    Key under which identical in-flight requests are coalesced
+
+    Args:
+        api_key (str): Credentials (only requests sent with the same key are shared)
+        payload (dict): Chat completion body: model, parameters and messages
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    key_digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{key_digest}\0{body}".encode("utf-8")).hexdigest()
+
+
+def backoff_delay(attempt, response=None, base=LLM_BACKOFF_SECONDS, cap=LLM_BACKOFF_MAX_SECONDS):
+    """
+    Seconds to wait before retry number ``attempt`` (0-based)
+
+    Full jitter: a random delay up to ``base * 2**attempt`` (capped), so
+    sessions rate-limited together do not retry together. A ``Retry-After``
+    header is honoured, with the same jitter on top.
+    """
+    jitter = random.uniform(0, min(cap, base * 2 ** attempt))
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after)) + jitter
+        except ValueError:
+            pass
+    return jitter
+
+
+def _error_message(response):
+    try:
+        return response.json()["error"]["message"]
+    except (ValueError, KeyError, TypeError):
+        return response.text[:200]
+
+
+class _StreamFanout:
+    """One upstream stream delivered to every identical request that joins it"""
+
+    def __init__(self):
+        self.events = []  # Everything received so far, replayed to late joiners
+        self.sinks = []
+        self.task = None
+
+    def subscribe(self, sink):
+        for event in self.events:
+            sink(event)
+        self.sinks.append(sink)
+
+    def publish(self, event):
+        self.events.append(event)
+        for sink in list(self.sinks):
+            try:
+                sink(event)
+            except RuntimeError:
+                # The subscriber's event loop has closed: it is gone
+                self.sinks.remove(sink)
+
+
+# ==================== POOLED CLIENT ====================
+class GroqClient:
+    """
+    Process-wide async client for the Groq chat completions API
+
+    Owns one event loop (in a daemon thread) and one pooled HTTP client, so
+    every session reuses the same keep-alive connections whatever thread or
+    event loop it calls from. Requests are retried with jittered backoff on
+    429/5xx and connection errors, and identical requests already in flight
+    (same key, model, parameters and messages) share one upstream call.
+    Streams are retried until the response starts; an identical stream
+    joining later first receives the chunks already streamed.
+    """
+
+    def __init__(self, base_url=GROQ_BASE_URL, max_connections=LLM_MAX_CONNECTIONS,
+                 max_retries=LLM_MAX_RETRIES, backoff_seconds=LLM_BACKOFF_SECONDS,
+                 backoff_max_seconds=LLM_BACKOFF_MAX_SECONDS, timeout_seconds=LLM_TIMEOUT_SECONDS):
+        """
+        Args:
+            base_url (str): API root, e.g. https://api.groq.com/openai/v1
+            max_connections (int): Connections kept open to the API
+            max_retries (int): Retries after the first attempt
+            backoff_seconds (float): Backoff ceiling of the first retry (doubles per retry)
+            backoff_max_seconds (float): Largest backoff ceiling
+            timeout_seconds (float): Per-attempt HTTP timeout
+        """
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.timeout_seconds = timeout_seconds
+        self._loop = None
+        self._http = None
+        # Request key -> upstream task / stream fanout; only touched on the client loop
+        self._inflight = {}
+        self._streams = {}
+        self._start_lock = threading.Lock()
+        self._counters_lock = threading.Lock()
+        self._counters = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0, "failures": 0}
+
+    # ---------- event loop ----------
+    def _ensure_loop(self):
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    self._http = httpx.AsyncClient(
+                        base_url=self.base_url,
+                        timeout=self.timeout_seconds,
+                        limits=httpx.Limits(max_connections=self.max_connections,
+                                            max_keepalive_connections=self.max_connections)
+                    )
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="llm-client", daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self._counters[name] += amount
+
+    def close(self):
+        """Close the pooled connections and stop the client loop"""
+        if self._loop is not None:
+            self._submit(self._http.aclose()).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+    # ---------- public API ----------
+    def chat(self, api_key, payload):
+        """
+        Chat completion, blocking the calling thread (not the client loop)
+
+        Args:
+            api_key (str): Groq API key
+            payload (dict): Request body (model, messages, temperature...)
+
+        Returns:
+            dict: Completion response
+        """
+        return self._submit(self._coalesced(api_key, payload)).result()
+
+    async def achat(self, api_key, payload):
+        """Async variant of ``chat``, usable from any event loop"""
+        return await asyncio.wrap_future(self._submit(self._coalesced(api_key, payload)))
+
+    def stream(self, api_key, payload):
+        """
+        Streamed chat completion
+
+        Yields:
+            dict: Parsed server-sent chunks
+        """
+        events = queue.Queue()
+        future = self._submit(self._stream_into(api_key, payload, events.put))
+        try:
+            while True:
+                event = events.get()
+                if event is None:
+                    return
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        finally:
+            future.cancel()
+
+    async def astream(self, api_key, payload):
+        """Async variant of ``stream``"""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        future = self._submit(
+            self._stream_into(api_key, payload, lambda event: loop.call_soon_threadsafe(events.put_nowait, event))
+        )
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    return
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        finally:
+            future.cancel()
+
+    def stats(self):
+        """
+        Returns:
+            dict: requests, upstream_calls, coalesced, retries, failures and in_flight
+        """
+        with self._counters_lock:
+            return dict(self._counters, in_flight=len(self._inflight) + len(self._streams))
+
+    # ---------- on the client loop ----------
+    async def _coalesced(self, api_key, payload):
+        self._count("requests")
+        key = request_key(api_key, payload)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._complete(api_key, payload))
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self._count("upstream_calls")
+        else:
+            self._count("coalesced")
+        # Shielded: a caller giving up does not cancel the call others are waiting on
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            self._count("failures")
+
+    async def _complete(self, api_key, payload):
+        response = await self._send(api_key, payload)
+        try:
+            await response.aread()
+            return response.json()
+        finally:
+            await response.aclose()
+
+    async def _stream_into(self, api_key, payload, sink):
+        """Push parsed chunks to ``sink``, then None (or the exception that ended the stream)"""
+        self._count("requests")
+        payload = dict(payload, stream=True)
+        key = request_key(api_key, payload)
+        fanout = self._streams.get(key)
+        if fanout is None:
+            fanout = self._streams[key] = _StreamFanout()
+            fanout.task = asyncio.ensure_future(self._pump(api_key, payload, fanout))
+            fanout.task.add_done_callback(lambda done: self._stream_finished(key, fanout))
+            self._count("upstream_calls")
+        else:
+            self._count("coalesced")
+        fanout.subscribe(sink)
+        try:
+            await asyncio.shield(fanout.task)
+        finally:
+            if sink in fanout.sinks:
+                fanout.sinks.remove(sink)
+            # Last reader gone: stop streaming an answer nobody reads
+            if not fanout.sinks and not fanout.task.done():
+                self._stream_finished(key, fanout)
+                fanout.task.cancel()
+
+    def _stream_finished(self, key, fanout):
+        if self._streams.get(key) is fanout:
+            del self._streams[key]
+
+    async def _pump(self, api_key, payload, fanout):
+        try:
+            response = await self._send(api_key, payload)
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    fanout.publish(json.loads(data))
+            finally:
+                await response.aclose()
+        except Exception as error:
+            self._count("failures")
+            fanout.publish(error)
+        else:
+            fanout.publish(None)
+
+    async def _send(self, api_key, payload):
+        """POST with retries; returns a response whose body is not read yet"""
+        headers = {"Authorization": f"Bearer {api_key}"}
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                request = self._http.build_request("POST", "/chat/completions", json=payload, headers=headers)
+                response = await self._http.send(request, stream=True)
+            except httpx.TransportError as error:
+                failure = error
+            else:
+                if response.status_code < 400:
+                    return response
+                await response.aread()
+                await response.aclose()
+                failure = LLMRequestError(response.status_code, _error_message(response))
+                if response.status_code not in RETRY_STATUSES:
+                    raise failure
+            if attempt == self.max_retries:
+                raise failure
+            self._count("retries")
+            await asyncio.sleep(backoff_delay(attempt, response, self.backoff_seconds, self.backoff_max_seconds))
+
+
+# ==================== LANGCHAIN CHAT MODEL ====================
+def _message_dict(message):
+    return {"role": ROLES.get(message.type, "user"), "content": message.content}
+
+
+def _usage_metadata(usage):
+    return {
+        "input_tokens": usage.get("prompt_tokens", 0),
+        "output_tokens": usage.get("completion_tokens", 0),
+        "total_tokens": usage.get("total_tokens", 0)
+    }
+
+
+class PooledChatGroq(BaseChatModel):
+    """
+    Groq chat model served through the shared ``GroqClient``
+
+    A drop-in for ``ChatGroq`` in the pipeline: building one per request is
+    cheap, since connections, retries and request coalescing live in the
+    process-wide client.
+    """
+
+    client: Any
+    groq_api_key: SecretStr
+    model_name: str
+    temperature: float = 0.7
+    max_tokens: Optional[int] = None
+
+    @property
+    def _llm_type(self):
+        return "groq-pooled"
+
+    @property
+    def _identifying_params(self):
+        return {"model_name": self.model_name, "temperature": self.temperature, "max_tokens": self.max_tokens}
+
+    def _payload(self, messages, stop, **kwargs):
+        payload = {
+            "model": self.model_name,
+            "messages": [_message_dict(m) for m in messages],
+            "temperature": self.temperature
+        }
+        if self.max_tokens is not None:
+            payload["max_tokens"] = self.max_tokens
+        if stop:
+            payload["stop"] = stop
+        payload.update(kwargs)
+        return payload
+
+    def _result(self, response):
+        usage = response.get("usage") or {}
+        message = AIMessage(
+            content=response["choices"][0]["message"].get("content") or "",
+            usage_metadata=_usage_metadata(usage) if usage else None
+        )
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={"token_usage": usage, "model_name": self.model_name}
+        )
+
+    @staticmethod
+    def _chunk(event):
+        """Generation chunk of one streamed event (None if it carries nothing)"""
+        choices = event.get("choices") or []
+        text = ""
+        if choices:
+            text = (choices[0].get("delta") or {}).get("content") or ""
+        # Groq reports usage on the last chunk, under x_groq
+        usage = event.get("usage") or (event.get("x_groq") or {}).get("usage")
+        if not text and not usage:
+            return None
+        return ChatGenerationChunk(
+            message=AIMessageChunk(content=text, usage_metadata=_usage_metadata(usage) if usage else None)
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        api_key = self.groq_api_key.get_secret_value()
+        return self._result(self.client.chat(api_key, self._payload(messages, stop, **kwargs)))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        api_key = self.groq_api_key.get_secret_value()
+        return self._result(await self.client.achat(api_key, self._payload(messages, stop, **kwargs)))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        api_key = self.groq_api_key.get_secret_value()
+        for event in self.client.stream(api_key, self._payload(messages, stop, **kwargs)):
+            chunk = self._chunk(event)
+            if chunk is None:
+                continue
+            if run_manager and chunk.text:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        api_key = self.groq_api_key.get_secret_value()
+        async for event in self.client.astream(api_key, self._payload(messages, stop, **kwargs)):
+            chunk = self._chunk(event)
+            if chunk is None:
+                continue
+            if run_manager and chunk.text:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
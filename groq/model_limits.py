@@ -0,0 +1,119 @@
+# ==================== IMPORTS ====================
+import os
+import re
+
+# ==================== MODEL CONTEXT LIMITS ====================
+# Context window (prompt + completion tokens) of the selectable Groq models
+MODEL_CONTEXT_WINDOWS = {
+    "llama3-70b-8192": 8192,
+    "llama3-8b-8192": 8192,
+    "gemma-7b-it": 8192,
+    "mixtral-8x22b": 65536
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Conservative characters-per-token ratio: English prose averages about 4 with
+# Llama-style tokenizers, so 3 over-counts ordinary text
+CHARS_PER_TOKEN = 3
+# The pieces Llama 3 (tiktoken-style BPE) splits text into before merging:
+# letter runs, up to 3 digits, punctuation runs and whitespace. Every piece is
+# at least one token, so formulas and tables, which are far denser than 3
+# characters per token, are counted by piece.
+TOKEN_PIECES = re.compile(r"[^\r\n\w]?[^\W\d_]+|\d{1,3}| ?(?:[^\s\w]|_)+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+")
+# Tokens every prompt leaves unused, for the error of the estimate
+PROMPT_SAFETY_TOKENS = int(os.getenv("PROMPT_SAFETY_TOKENS", "256"))
+
+# Smallest prompt worth sending (instructions plus at least a little context)
+MIN_PROMPT_TOKENS = 512
+
+
+def context_window(model_name):
+    """
+    Context window of a model in tokens
+
+    Falls back to the ``-<n>`` suffix used in Groq model ids, then to 8192.
+
+    Args:
+        model_name (str): Groq model id
+
+    Returns:
+        int: Maximum prompt + completion tokens
+    """
+    if model_name in MODEL_CONTEXT_WINDOWS:
+        return MODEL_CONTEXT_WINDOWS[model_name]
+    suffix = model_name.rsplit("-", 1)[-1]
+    return int(suffix) if suffix.isdigit() else DEFAULT_CONTEXT_WINDOW
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate that needs no tokenizer download
+
+    Errs high: the larger of the character ratio and the count of
+    pre-tokenizer pieces (each at least one token).
+
+    Args:
+        text (str): Any text
+
+    Returns:
+        int: Approximate token count
+    """
+    return max(len(text) // CHARS_PER_TOKEN, sum(1 for _ in TOKEN_PIECES.finditer(text))) + 1
+
+
+def truncate_to_tokens(text, tokens):
+    """
+    Longest prefix of a text whose estimate fits a token budget
+
+    Args:
+        text (str): Any text
+        tokens (int): Token budget
+
+    Returns:
+        str: ``text`` or a prefix of it ("" if the budget is below 2 tokens)
+    """
+    text = text[:max(0, tokens - 1) * CHARS_PER_TOKEN]
+    estimate = estimate_tokens(text)
+    while text and estimate > tokens:
+        # Dense text: cut in proportion to the overshoot until it fits
+        text = text[:len(text) * (tokens - 1) // estimate]
+        estimate = estimate_tokens(text)
+    return text
+
+
+def completion_limit(model_name, max_tokens, reserve=256):
+    """
+    Completion tokens that still leave room for a usable prompt
+
+    A request for more than the window can hold minus the prompt minimum
+    is clamped, so the prompt and the answer always fit together.
+
+    Args:
+        model_name (str): Groq model id
+        max_tokens (int): Completion tokens requested by the user
+        reserve (int): Headroom for the prompt template and chat formatting
+
+    Returns:
+        int: ``max_tokens``, clamped to ``window - reserve - PROMPT_SAFETY_TOKENS - MIN_PROMPT_TOKENS``
+    """
+    return min(max_tokens, context_window(model_name) - reserve - PROMPT_SAFETY_TOKENS - MIN_PROMPT_TOKENS)
+
+
+def prompt_budget(model_name, max_tokens, reserve=256):
+    """
+    Tokens left for prompt input once the completion is reserved
+
+    PROMPT_SAFETY_TOKENS are kept free as well, in case the estimate
+    still falls short of the model's tokenizer.
+
+    Args:
+        model_name (str): Groq model id
+        max_tokens (int): Completion tokens requested from the model
+        reserve (int): Headroom for the prompt template and chat formatting
+
+    Returns:
+        int: Input token budget (at least MIN_PROMPT_TOKENS, as the
+            completion is clamped by ``completion_limit``)
+    """
+    return (context_window(model_name) - completion_limit(model_name, max_tokens, reserve)
+            - reserve - PROMPT_SAFETY_TOKENS)
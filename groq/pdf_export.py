@@ -0,0 +1,222 @@
+# ==================== IMPORTS ====================
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, Preformatted, SimpleDocTemplate, Spacer
+
+# ==================== SETTINGS ====================
+# Rendered PDFs kept in memory (by total size) so repeated downloads skip reportlab
+PDF_CACHE_BYTES = int(os.getenv("PDF_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+BULLET_PATTERN = re.compile(r"^(\s*)[-*+•]\s+(.*)$")
+NUMBERED_PATTERN = re.compile(r"^(\s*)((?:\d+|[A-Za-z])[.)])\s+(.*)$")
+RULE_PATTERN = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+INLINE_RULES = (
+    (re.compile(r"`([^`]+)`"), r'<font face="Courier">\1</font>'),
+    (re.compile(r"\*\*(.+?)\*\*|__(.+?)__"), lambda m: f"<b>{m.group(1) or m.group(2)}</b>"),
+    (re.compile(r"(?<![\*\w])\*(?!\s)(.+?)(?<!\s)\*(?!\*)"), r"<i>\1</i>"),
+)
+
+
+# ==================== STYLES ====================
+@lru_cache(maxsize=1)
+def _styles():
+    """Paragraph styles, built once per process"""
+    styles = getSampleStyleSheet()
+    body = styles["Normal"]
+    return {
+        "title": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            spaceAfter=30,
+            textColor='Black'
+        ),
+        "headings": [styles["Heading2"], styles["Heading3"], styles["Heading4"]],
+        "body": ParagraphStyle("Body", parent=body, spaceAfter=6),
+        "bullet": ParagraphStyle("Bullet", parent=body, leftIndent=18, bulletIndent=6, spaceAfter=3),
+        "code": styles["Code"]
+    }
+
+
+def _inline(text):
+    """Markdown emphasis and code spans to reportlab paragraph markup"""
+    text = escape(text)
+    for pattern, replacement in INLINE_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _paragraph(text, style, **kwargs):
+    try:
+        return Paragraph(_inline(text), style, **kwargs)
+    except ValueError:
+        # Unbalanced emphasis can produce invalid markup: fall back to plain text
+        return Paragraph(escape(text), style, **kwargs)
+
+
+# ==================== MARKDOWN LAYOUT ====================
+def markdown_flowables(text):
+    """
+    Lay out LLM Markdown output as one flowable per block
+
+    Handles headings, bullet and numbered lists, code fences and plain
+    paragraphs (consecutive lines are joined). Each line is looked at once,
+    so the work grows linearly with the text.
+
+    Args:
+        text (str): Generated text
+
+    Returns:
+        list: reportlab flowables
+    """
+    styles = _styles()
+    flowables, paragraph, code = [], [], None
+
+    def flush():
+        if paragraph:
+            flowables.append(_paragraph(" ".join(paragraph), styles["body"]))
+            paragraph.clear()
+
+    for line in text.splitlines():
+        if code is not None:
+            if FENCE_PATTERN.match(line):
+                flowables.append(Preformatted("\n".join(code), styles["code"]))
+                code = None
+            else:
+                code.append(line)
+            continue
+        if FENCE_PATTERN.match(line):
+            flush()
+            code = []
+            continue
+        if not line.strip() or RULE_PATTERN.match(line):
+            flush()
+            continue
+
+        heading = HEADING_PATTERN.match(line)
+        bullet = BULLET_PATTERN.match(line)
+        numbered = NUMBERED_PATTERN.match(line)
+        if heading:
+            flush()
+            level = min(len(heading.group(1)), len(styles["headings"])) - 1
+            flowables.append(_paragraph(heading.group(2), styles["headings"][level]))
+        elif bullet:
+            flush()
+            indent = 12 * (len(bullet.group(1).expandtabs(4)) // 2)
+            flowables.append(_paragraph(bullet.group(2), _indented(styles["bullet"], indent), bulletText="•"))
+        elif numbered:
+            flush()
+            indent = 12 * (len(numbered.group(1).expandtabs(4)) // 2)
+            flowables.append(_paragraph(numbered.group(3), _indented(styles["bullet"], indent),
+                                        bulletText=numbered.group(2)))
+        else:
+            paragraph.append(line.strip())
+
+    flush()
+    if code is not None:
+        flowables.append(Preformatted("\n".join(code), styles["code"]))
+    return flowables
+
+
+@lru_cache(maxsize=8)
+def _indented(style, indent):
+    """List style shifted right for nested items"""
+    if not indent:
+        return style
+    return ParagraphStyle(f"{style.name}{indent}", parent=style,
+                          leftIndent=style.leftIndent + indent, bulletIndent=style.bulletIndent + indent)
+
+
+def create_pdf_summary(summary_text, title="Document Summary"):
+    """
+    Convert summary text to PDF format with professional styling
+
+    Args:
+        summary_text (str): The text content to convert to PDF (Markdown is laid out)
+        title (str): The title for the PDF document
+
+    Returns:
+        bytes: PDF file content as bytes
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=1*inch)
+    story = [Paragraph(escape(title), _styles()["title"]), Spacer(1, 20)]
+    story += markdown_flowables(summary_text)
+    doc.build(story)
+    return buffer.getvalue()
+
+
+# ==================== PDF CACHE ====================
+class PdfCache:
+    """
+    Rendered PDFs keyed by a hash of their title and text
+
+    The same text (a cached summary, say) is rendered once per process no
+    matter how many sessions download it. Eviction is LRU by total size.
+    """
+
+    def __init__(self, max_bytes=PDF_CACHE_BYTES):
+        """
+        Args:
+            max_bytes (int): Total PDF bytes kept before the least recently used is evicted
+        """
+        self.max_bytes = max_bytes
+        self._pdfs = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "renders": 0}
+
+    @staticmethod
+    def key(text, title):
+        return hashlib.sha256(f"{title}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text, title="Document Summary"):
+        """
+        PDF bytes for a text, rendered on first request only
+
+        Args:
+            text (str): The text content
+            title (str): The title for the PDF document
+
+        Returns:
+            bytes: PDF file content
+        """
+        key = self.key(text, title)
+        with self._lock:
+            pdf = self._pdfs.get(key)
+            if pdf is not None:
+                self._pdfs.move_to_end(key)
+                self._counters["hits"] += 1
+                return pdf
+
+        # Render outside the lock so other downloads are not held up
+        pdf = create_pdf_summary(text, title)
+        with self._lock:
+            self._counters["renders"] += 1
+            if key not in self._pdfs:
+                self._pdfs[key] = pdf
+                self._size += len(pdf)
+            while self._size > self.max_bytes and len(self._pdfs) > 1:
+                _, evicted = self._pdfs.popitem(last=False)
+                self._size -= len(evicted)
+        return pdf
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, renders, entries and bytes held
+        """
+        with self._lock:
+            return dict(self._counters, entries=len(self._pdfs), bytes=self._size)
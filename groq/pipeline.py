@@ -0,0 +1,660 @@
+# ==================== IMPORTS ====================
+import asyncio
+import os
+import time
+
+from langchain.chains import create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.prompts import ChatPromptTemplate
+
+from context_packer import ContextPacker, PackingRetriever
+from dedup import DEDUP_BY_DEFAULT, ChunkDeduplicator
+from embedding_engine import QUANTIZE_BY_DEFAULT
+from hybrid_retrieval import BM25_WEIGHT, FETCH_K, VECTOR_WEIGHT, BM25Index, HybridRetriever
+from index_store import file_key
+from ingestion import IngestionProgress, iter_parsed_files
+from llm_client import PooledChatGroq
+from model_limits import completion_limit, prompt_budget
+from rerank import RERANK_BUDGET_MS, RERANK_BY_DEFAULT, RERANK_FETCH_K, RERANK_TOP_N, RerankingRetriever
+from shared_models import (
+    get_answer_cache, get_cached_embeddings, get_index_store, get_llm_client, get_reranker, get_tool_cache
+)
+from summarize import MAX_CONCURRENCY, map_reduce_summary
+from telemetry import LLMTimingCallback, Trace, record, span
+
+# ==================== DEFAULTS ====================
+DEFAULT_MODEL = "llama3-70b-8192"
+AVAILABLE_MODELS = ["llama3-70b-8192", "llama3-8b-8192", "gemma-7b-it", "mixtral-8x22b"]
+CHUNK_SIZE = 1500
+CHUNK_OVERLAP = 200
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+RETRIEVAL_MODES = ("hybrid", "vector")
+RETRIEVAL_K = 4  # Chunks passed to the prompt without reranking
+STUDY_PACK_TOOLS = ("summary", "mcqs", "explanation")
+
+# ==================== PROMPTS ====================
+QA_PROMPT = ChatPromptTemplate.from_template("""
+You are a helpful academic assistant. Use the context below to answer the question.
+
+<context>
+{context}
+</context>
+
+Question: {input}
+Provide a clear and helpful answer.
+""")
+
+SUMMARY_TEMPLATE = "Summarize the following academic content clearly:\n{input}"
+MCQ_TEMPLATE = "Generate 3 MCQs from the following content with 4 options each and mark the correct one:\n{input}"
+EXPLANATION_TEMPLATE = "Provide a simple topic-wise explanation of:\n{input}"
+
+
+# ==================== ANSWER STREAM ====================
+class AnswerStream:
+    """
+    Iterable of answer tokens for one question
+
+    Iterating drives retrieval and generation (or replays a cached answer);
+    once exhausted, ``result`` holds the structured response and the timing
+    attributes are filled in.
+    """
+
+    def __init__(self, pipeline, question):
+        self.pipeline = pipeline
+        self.question = question
+        self.result = None
+        self.cache_hit = None
+        self.seconds = None
+        self.first_token_seconds = None
+        self.trace = None
+
+    def __iter__(self):
+        pipeline = self.pipeline
+        self.trace = trace = Trace("answer", model=pipeline.model_name, document_set=pipeline.document_set)
+        pipeline.last_traces["answer"] = trace
+        start = time.time()
+        try:
+            with trace.span("answer cache lookup"):
+                namespace, vector, self.cache_hit = pipeline._lookup_answer(self.question)
+
+            if self.cache_hit:
+                trace.attributes["cache"] = self.cache_hit["match"]
+                self.result = dict(self.cache_hit["payload"], question=self.question)
+                self.seconds = self.first_token_seconds = time.time() - start
+                yield self.result["answer"]
+                return
+
+            # Retrieval, prompt assembly and LLM spans come from the chain's callbacks
+            config = {"callbacks": [LLMTimingCallback(trace)]}
+            parts, context_docs = [], []
+            for part in pipeline.retrieval_chain.stream({"input": self.question}, config=config):
+                if "context" in part:
+                    context_docs = part["context"]
+                token = part.get("answer")
+                if token:
+                    if self.first_token_seconds is None:
+                        self.first_token_seconds = time.time() - start
+                    parts.append(token)
+                    yield token
+            self.seconds = time.time() - start
+
+            self.result = pipeline._structure(self.question, "".join(parts), context_docs)
+            pipeline._remember_answer(namespace, self.question, vector, self.result)
+        finally:
+            trace.finish()
+
+
+# ==================== PIPELINE ====================
+class AcademicPipeline:
+    """
+    Headless RAG pipeline: load, split, index, ask and the learning tools
+
+    Used by the Streamlit app, the batch CLI and the HTTP service alike, so
+    none of the logic depends on a UI.
+    """
+
+    def __init__(self, llm, model_name=DEFAULT_MODEL, temperature=0.5, max_tokens=3072,
+                 quantize=QUANTIZE_BY_DEFAULT, embeddings=None, index_store=None,
+                 answer_cache=None, use_answer_cache=True,
+                 chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                 retrieval="hybrid", vector_weight=VECTOR_WEIGHT, bm25_weight=BM25_WEIGHT,
+                 dedup=DEDUP_BY_DEFAULT, rerank=RERANK_BY_DEFAULT, rerank_top_n=RERANK_TOP_N,
+                 rerank_budget_ms=RERANK_BUDGET_MS, reranker=None, pack_context=True):
+        """
+        Args:
+            llm (BaseChatModel): Chat model used for answers and tools
+            model_name (str): Model id (used for context limits and cache keys)
+            temperature (float): Sampling temperature the llm was built with
+            max_tokens (int): Completion limit the llm was built with (clamped
+                to leave a usable prompt, see ``completion_limit``)
+            quantize (bool): Use the int8 vector store
+            embeddings (Embeddings): Embedding model (shared cached model by default)
+            index_store (FaissIndexStore): Index store (shared store by default)
+            answer_cache (SemanticAnswerCache): Answer cache (shared cache by default)
+            use_answer_cache (bool): Set False to always call the LLM (answers and tool results)
+            chunk_size (int): Characters per chunk
+            chunk_overlap (int): Characters shared by neighbouring chunks
+            retrieval (str): "hybrid" (BM25 + vector, fused) or "vector" (dense only)
+            vector_weight (float): Fusion weight of the dense ranking
+            bm25_weight (float): Fusion weight of the BM25 ranking
+            dedup (bool): Drop exact and near-duplicate chunks before embedding
+            rerank (bool): Over-fetch candidates and keep the best by cross-encoder score
+            rerank_top_n (int): Chunks kept after reranking
+            rerank_budget_ms (float): Reranking time budget (retriever order is kept if exceeded)
+            reranker (CrossEncoderReranker): Reranker override (shared model by default)
+            pack_context (bool): Merge overlapping chunks and fit them into the model's
+                context window after reserving ``max_tokens`` for the answer
+        """
+        self.llm = llm
+        self.model_name = model_name
+        self.temperature = temperature
+        self.max_tokens = completion_limit(model_name, max_tokens)
+        self.embeddings = embeddings or get_cached_embeddings()
+        self.index_store = index_store or get_index_store(quantize)
+        self.answer_cache = (answer_cache or get_answer_cache()) if use_answer_cache else None
+        self.tool_cache = get_tool_cache() if use_answer_cache else None
+        # start_index lets the context packer merge neighbouring chunks exactly
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+        )
+        self.retrieval = retrieval
+        self.vector_weight = vector_weight
+        self.bm25_weight = bm25_weight
+        self.dedup = dedup
+        self.rerank = rerank
+        self.rerank_top_n = rerank_top_n
+        self.rerank_budget_ms = rerank_budget_ms
+        self.reranker = reranker
+        self.pack_context = pack_context
+        self.last_traces = {}  # Most recent timing trace per request kind
+
+        # Filled in by ingest()
+        self.vector_store = None
+        self.bm25 = None
+        self.chunks = []
+        self.document_set = None
+        self._retrieval_chain = None
+
+    @classmethod
+    def from_settings(cls, groq_api_key, model_name=DEFAULT_MODEL, temperature=0.5,
+                      max_tokens=3072, **kwargs):
+        """
+        Build a pipeline backed by a Groq chat model
+
+        The model goes through the shared client, so pipelines built per
+        request still reuse pooled connections and in-flight calls.
+
+        Args:
+            groq_api_key (str): Groq API key
+            model_name (str): Groq model id
+            temperature (float): Sampling temperature
+            max_tokens (int): Completion limit (clamped to the model's context window)
+            **kwargs: Passed on to the constructor
+
+        Returns:
+            AcademicPipeline: Ready-to-ingest pipeline
+        """
+        max_tokens = completion_limit(model_name, max_tokens)
+        llm = PooledChatGroq(
+            client=get_llm_client(),
+            groq_api_key=groq_api_key,
+            model_name=model_name,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return cls(llm, model_name=model_name, temperature=temperature,
+                   max_tokens=max_tokens, **kwargs)
+
+    # ---------- ingestion ----------
+    def ingest(self, files, progress=None, on_file_error=None):
+        """
+        Load, split and index a document set (reusing stored indexes)
+
+        Args:
+            files (list[tuple]): ``(file name, bytes)`` for every document
+            progress (IngestionProgress): Optional progress tracker
+            on_file_error (callable): ``on_file_error(name, message)`` for files that fail to parse
+
+        Returns:
+            dict: Index report plus embedding cache stats, per-file errors and
+                the id of the timing trace (also kept in ``last_traces["ingest"]``)
+        """
+        with Trace("ingest", files=len(files)) as trace:
+            report = self._ingest(files, progress, on_file_error)
+        self.last_traces["ingest"] = trace
+        report["trace_id"] = trace.id
+        return report
+
+    def _ingest(self, files, progress, on_file_error):
+        files_by_key = {}
+        for name, data in files:
+            files_by_key.setdefault(file_key(data), (name, data))
+        progress = progress or IngestionProgress(total_files=len(files_by_key))
+        errors = []
+
+        def load_chunks(keys):
+            """Stream the missing files page by page, splitting each page as it arrives"""
+            for result in iter_parsed_files([(key, *files_by_key[key]) for key in keys]):
+                pages = 0
+                for page in result.documents:
+                    pages += 1
+                    progress.page_parsed()
+                    # The splitter works per document, so per-page splitting gives the same chunks
+                    with span("split", accumulate=True, pages=1) as split_span:
+                        chunks = self.splitter.split_documents([page])
+                        split_span["chunks"] = len(chunks)
+                    progress.chunks_produced(len(chunks))
+                    for chunk in chunks:
+                        yield result.key, chunk
+                record("load", result.seconds, file=result.name, pages=pages, error=result.error)
+                if result.error:
+                    errors.append({"file": result.name, "error": result.error})
+                    if on_file_error:
+                        on_file_error(result.name, result.error)
+                    # Keep the file out of the stored set so a later upload retries it
+                    yield result.key, None
+                progress.file_done()
+
+        embedding_stats_before = self._embedding_stats()
+        self.vector_store, self.chunks, report = self.index_store.get_or_update(
+            {key: name for key, (name, _) in files_by_key.items()},
+            self.embeddings,
+            load_chunks,
+            progress=progress,
+            deduplicator=ChunkDeduplicator() if self.dedup else None
+        )
+        self.document_set = report["document_set"]
+        self._retrieval_chain = None
+
+        self.bm25 = self._shared_bm25()
+
+        embedding_stats = self._embedding_stats()
+        report["embedding_cache"] = {
+            name: embedding_stats[name] - embedding_stats_before[name] for name in ("hits", "misses")
+        }
+        report["errors"] = errors
+        return report
+
+    def _shared_bm25(self):
+        """
+        Sparse index for hybrid retrieval, stored with the document set's
+        vectors and shared by all of its sessions
+        """
+        if self.retrieval != "hybrid" or self.vector_store is None:
+            return None
+        with span("bm25 open"):
+            return self.index_store.bm25_index(self.document_set)
+
+    def open(self, document_set, files):
+        """
+        Attach a document set that is already stored, leasing its shared index
+
+        The lease lasts as long as this pipeline, so a service can open the
+        set per request and let idle sets be unmapped between requests.
+
+        Args:
+            document_set (str): Document set key from an earlier ``ingest``
+            files (dict): Mapping of file hash -> display name, in upload order
+
+        Returns:
+            bool: False if the document set is not stored
+        """
+        leased = self.index_store.lease(document_set, files, self.embeddings)
+        if leased is None:
+            return False
+        self.document_set = document_set
+        self.vector_store, self.chunks = leased
+        self.bm25 = self._shared_bm25()
+        self._retrieval_chain = None
+        return True
+
+    def attach(self, document_set, vector_store, chunks, bm25=None):
+        """
+        Reuse a document set already ingested by another pipeline
+
+        Lets many pipelines (different models or settings) share one index.
+
+        Args:
+            document_set (str): Document set key
+            vector_store (FAISS): Index over the document set
+            chunks (Sequence[Document]): Chunks in upload order
+            bm25 (BM25Index): Sparse index with its ``documents`` set (built over
+                the chunks if missing)
+        """
+        self.document_set = document_set
+        self.vector_store = vector_store
+        self.chunks = chunks
+        if bm25 is None and self.retrieval == "hybrid":
+            bm25 = BM25Index.from_documents(chunks)
+        self.bm25 = bm25
+        self._retrieval_chain = None
+
+    def ingest_directory(self, path, progress=None, on_file_error=None):
+        """
+        Ingest every supported document below a directory
+
+        Args:
+            path (str): Directory to scan recursively
+            progress (IngestionProgress): Optional progress tracker
+            on_file_error (callable): ``on_file_error(name, message)`` for failures
+
+        Returns:
+            dict: Same report as ``ingest``
+        """
+        files = []
+        for root, _, names in os.walk(path):
+            for name in sorted(names):
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    with open(os.path.join(root, name), "rb") as f:
+                        files.append((name, f.read()))
+        return self.ingest(files, progress=progress, on_file_error=on_file_error)
+
+    def _embedding_stats(self):
+        stats = getattr(self.embeddings, "stats", None)
+        return stats() if stats else {"hits": 0, "misses": 0}
+
+    @property
+    def ready(self):
+        """True once a non-empty document set has been ingested"""
+        return self.vector_store is not None
+
+    # ---------- question answering ----------
+    @property
+    def retriever(self):
+        """Hybrid BM25 + vector retriever, or plain vector search, optionally reranked and packed"""
+        k = RERANK_FETCH_K if self.rerank else RETRIEVAL_K
+        if self.retrieval == "hybrid" and self.bm25 is not None:
+            retriever = HybridRetriever(
+                vector_store=self.vector_store,
+                bm25=self.bm25,
+                k=k,
+                fetch_k=max(k, FETCH_K),
+                vector_weight=self.vector_weight,
+                bm25_weight=self.bm25_weight
+            )
+        else:
+            retriever = self.vector_store.as_retriever(search_kwargs={"k": k})
+        if self.rerank:
+            retriever = RerankingRetriever(
+                base_retriever=retriever,
+                reranker=self.reranker or get_reranker(),
+                top_n=self.rerank_top_n,
+                budget_ms=self.rerank_budget_ms
+            )
+        if self.pack_context:
+            retriever = PackingRetriever(
+                base_retriever=retriever,
+                packer=ContextPacker(prompt_budget(self.model_name, self.max_tokens))
+            )
+        return retriever
+
+    @property
+    def retrieval_chain(self):
+        """Retriever + stuff-documents chain over the ingested documents"""
+        if self._retrieval_chain is None:
+            document_chain = create_stuff_documents_chain(self.llm, QA_PROMPT)
+            self._retrieval_chain = create_retrieval_chain(self.retriever, document_chain)
+        return self._retrieval_chain
+
+    def _cache_namespace(self, retrieval=True):
+        """
+        Cache key part for the current settings
+
+        Answers also depend on how their context was retrieved; the learning
+        tools read the chunks directly, so their namespace leaves that out.
+        """
+        settings = ()
+        if retrieval:
+            settings = (
+                self.retrieval,
+                (self.vector_weight, self.bm25_weight) if self.retrieval == "hybrid" else None,
+                (self.rerank_top_n, self.rerank_budget_ms) if self.rerank else None,
+                self.pack_context
+            )
+        return self.answer_cache.namespace(
+            self.document_set, self.model_name, self.temperature, self.max_tokens, settings
+        )
+
+    def _lookup_answer(self, question):
+        """Return (namespace, question vector, cache hit or None)"""
+        if self.answer_cache is None:
+            return None, None, None
+        namespace = self._cache_namespace()
+        vector = self.embeddings.embed_query(question)
+        return namespace, vector, self.answer_cache.lookup(namespace, question, vector)
+
+    def _remember_answer(self, namespace, question, vector, result):
+        if self.answer_cache is not None:
+            self.answer_cache.store(namespace, question, vector, result)
+
+    def _structure(self, question, answer, context_docs):
+        """Shape an answer into the structured response shown to users"""
+        context_docs = context_docs or self.chunks
+        source_doc = "Uploaded Document"
+
+        # Get source document name if available
+        if context_docs:
+            source_doc = context_docs[0].metadata.get("source", "Uploaded Document")
+
+        # Calculate confidence score (simplified estimation)
+        confidence_score = round(min(1.0, 0.95 - 0.05 * len(context_docs)), 2)
+
+        return {
+            "question": question,
+            "answer": answer or "No answer generated.",
+            "source_document": os.path.basename(source_doc),
+            "confidence_score": str(confidence_score)
+        }
+
+    def stream_answer(self, question):
+        """
+        Stream the answer to a question token by token
+
+        Args:
+            question (str): The user's question
+
+        Returns:
+            AnswerStream: Iterate for tokens, then read ``result``
+        """
+        return AnswerStream(self, question)
+
+    def ask(self, question):
+        """
+        Answer a question (blocking)
+
+        Args:
+            question (str): The user's question
+
+        Returns:
+            dict: Structured response
+        """
+        stream = self.stream_answer(question)
+        for _ in stream:
+            pass
+        return stream.result
+
+    async def aask(self, question):
+        """
+        Answer a question without blocking the event loop
+
+        Args:
+            question (str): The user's question
+
+        Returns:
+            tuple: (structured response, cache hit dict or None)
+        """
+        trace = Trace("answer", model=self.model_name, document_set=self.document_set)
+        self.last_traces["answer"] = trace
+        try:
+            namespace, vector, hit = None, None, None
+            with trace.span("answer cache lookup"):
+                if self.answer_cache is not None:
+                    namespace = self._cache_namespace()
+                    vector = await self.embeddings.aembed_query(question)
+                    hit = self.answer_cache.lookup(namespace, question, vector)
+            if hit:
+                trace.attributes["cache"] = hit["match"]
+                return dict(hit["payload"], question=question), hit
+
+            response = await self.retrieval_chain.ainvoke(
+                {"input": question}, config={"callbacks": [LLMTimingCallback(trace)]}
+            )
+            result = self._structure(question, response.get("answer"), response.get("context"))
+            self._remember_answer(namespace, question, vector, result)
+            return result, None
+        finally:
+            trace.finish()
+
+    # ---------- learning tools ----------
+    @property
+    def doc_content(self):
+        """Opening chunk of the document set (input of the quick tools)"""
+        return self.chunks[0].page_content if self.chunks else ""
+
+    def run_tool(self, template, input_text):
+        """
+        Run a simple prompt-LLM chain
+
+        Args:
+            template (str): Prompt template with {input} placeholder
+            input_text (str): Text to process
+
+        Returns:
+            str: Generated response from the language model
+        """
+        prompt = ChatPromptTemplate.from_template(template)
+        return (prompt | self.llm).invoke({"input": input_text}).content
+
+    async def arun_tool(self, template, input_text):
+        """Async variant of ``run_tool``"""
+        prompt = ChatPromptTemplate.from_template(template)
+        return (await (prompt | self.llm).ainvoke({"input": input_text})).content
+
+    def tool_results(self, whole_document=True):
+        """
+        Learning-tool results already generated for this document set and settings
+
+        Args:
+            whole_document (bool): Which summary variant to look up
+
+        Returns:
+            dict: Any of summary (+ summary_timings), mcqs and explanation
+        """
+        results = {}
+        if self.tool_cache is None or self.document_set is None:
+            return results
+        namespace = self._cache_namespace(retrieval=False)
+        for tool in (self._summary_tool(whole_document), "mcqs", "explanation"):
+            results.update(self.tool_cache.get(namespace, tool) or {})
+        return results
+
+    @staticmethod
+    def _summary_tool(whole_document):
+        return "summary:whole" if whole_document else "summary:opening"
+
+    def _remember_tool(self, tool, payload):
+        if self.tool_cache is not None:
+            self.tool_cache.put(self._cache_namespace(retrieval=False), tool, payload)
+
+    def summarize(self, whole_document=True, on_progress=None, max_concurrency=MAX_CONCURRENCY):
+        """
+        Summarize the document set
+
+        Args:
+            whole_document (bool): Map-reduce over every chunk instead of the opening chunk
+            on_progress (callable): ``on_progress(stage, done, total)`` for map-reduce calls
+            max_concurrency (int): Maximum LLM calls in flight
+
+        Returns:
+            tuple: (summary text, list of per-stage timing dicts)
+        """
+        if not whole_document:
+            summary = self.run_tool(SUMMARY_TEMPLATE, self.doc_content)
+            self._remember_tool(self._summary_tool(False), {"summary": summary, "summary_timings": []})
+            return summary, []
+        return asyncio.run(self.asummarize(True, on_progress, max_concurrency))
+
+    async def asummarize(self, whole_document=True, on_progress=None, max_concurrency=MAX_CONCURRENCY):
+        """Async variant of ``summarize``"""
+        if not whole_document:
+            summary, timings = await self.arun_tool(SUMMARY_TEMPLATE, self.doc_content), []
+        else:
+            summary, timings = await map_reduce_summary(
+                self.llm,
+                self.chunks,
+                prompt_budget(self.model_name, self.max_tokens),
+                max_concurrency=max_concurrency,
+                on_progress=on_progress
+            )
+        self._remember_tool(self._summary_tool(whole_document), {"summary": summary, "summary_timings": timings})
+        return summary, timings
+
+    def generate_mcqs(self):
+        """Multiple-choice practice questions from the opening chunk"""
+        mcqs = self.run_tool(MCQ_TEMPLATE, self.doc_content)
+        self._remember_tool("mcqs", {"mcqs": mcqs})
+        return mcqs
+
+    def explain(self):
+        """Topic-wise explanation of the opening chunk"""
+        explanation = self.run_tool(EXPLANATION_TEMPLATE, self.doc_content)
+        self._remember_tool("explanation", {"explanation": explanation})
+        return explanation
+
+    async def agenerate_mcqs(self):
+        """Async variant of ``generate_mcqs``"""
+        mcqs = await self.arun_tool(MCQ_TEMPLATE, self.doc_content)
+        self._remember_tool("mcqs", {"mcqs": mcqs})
+        return mcqs
+
+    async def aexplain(self):
+        """Async variant of ``explain``"""
+        explanation = await self.arun_tool(EXPLANATION_TEMPLATE, self.doc_content)
+        self._remember_tool("explanation", {"explanation": explanation})
+        return explanation
+
+    def study_pack(self, whole_document=True, on_progress=None, max_concurrency=MAX_CONCURRENCY):
+        """
+        Summary, MCQs and explanation in one go, reusing stored results
+
+        Args:
+            whole_document (bool): Map-reduce summary of every chunk instead of the opening chunk
+            on_progress (callable): ``on_progress(stage, done, total)`` for map-reduce calls
+            max_concurrency (int): Maximum map-reduce calls in flight
+
+        Returns:
+            dict: summary, summary_timings, mcqs and explanation, plus ``cached``
+                (tools served from stored results) and ``seconds``
+        """
+        return asyncio.run(self.astudy_pack(whole_document, on_progress, max_concurrency))
+
+    async def astudy_pack(self, whole_document=True, on_progress=None, max_concurrency=MAX_CONCURRENCY):
+        """
+        Async variant of ``study_pack``
+
+        The missing tools run as concurrent LLM calls, so the wall-clock time
+        is about that of the slowest one rather than their sum.
+        """
+        async def timed(tool, call):
+            with span(tool):
+                return tool, await call
+
+        with Trace("study pack", model=self.model_name, document_set=self.document_set) as trace:
+            results = self.tool_results(whole_document)
+            cached = [tool for tool in STUDY_PACK_TOOLS if tool in results]
+            calls = {
+                "summary": lambda: self.asummarize(whole_document, on_progress, max_concurrency),
+                "mcqs": self.agenerate_mcqs,
+                "explanation": self.aexplain
+            }
+            trace.attributes["cached"] = cached
+            for tool, output in await asyncio.gather(
+                *(timed(tool, call()) for tool, call in calls.items() if tool not in cached)
+            ):
+                if tool == "summary":
+                    results["summary"], results["summary_timings"] = output
+                else:
+                    results[tool] = output
+        self.last_traces["study pack"] = trace
+        return dict(results, cached=cached, seconds=round(trace.seconds, 3))
@@ -0,0 +1,168 @@
+# ==================== IMPORTS ====================
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from langchain_core.callbacks.manager import dispatch_custom_event
+from langchain_core.retrievers import BaseRetriever
+
+from embedding_cache import text_hash
+
+# ==================== SETTINGS ====================
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# Set RERANK=1 to rerank by default (the app and CLIs can switch it per request)
+RERANK_BY_DEFAULT = os.getenv("RERANK", "0") == "1"
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "20"))      # Candidates over-fetched from the retriever
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "4"))           # Chunks kept for the prompt
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_CACHE_ENTRIES = int(os.getenv("RERANK_CACHE_ENTRIES", "50000"))
+
+
+# ==================== SCORE CACHE ====================
+class RerankScoreCache:
+    """Thread-safe LRU of cross-encoder scores keyed by (query, chunk) content"""
+
+    def __init__(self, max_entries=RERANK_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        """
+        Args:
+            keys (list[tuple]): (query digest, chunk digest) pairs
+
+        Returns:
+            dict: Cached scores for the keys that are present
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                    found[key] = score
+        return found
+
+    def put_many(self, items):
+        """
+        Args:
+            items (dict): Mapping of (query digest, chunk digest) -> score
+        """
+        with self._lock:
+            for key, score in items.items():
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+
+# ==================== RERANKER ====================
+class CrossEncoderReranker:
+    """
+    Reorders retrieved chunks by cross-encoder relevance within a time budget
+
+    Pairs are scored in batches, reusing cached scores. Each batch is sized
+    from the measured scoring throughput to fit the time left, so a batch
+    never starts that would overrun the budget. When the budget runs out,
+    the scored documents are ranked by score and the rest follow in the
+    retriever's order (their scores are still computed next time).
+    """
+
+    def __init__(self, model, batch_size=RERANK_BATCH_SIZE, cache=None):
+        """
+        Args:
+            model: Cross-encoder with ``predict(pairs, batch_size=...)``
+                (e.g. ``sentence_transformers.CrossEncoder``)
+            batch_size (int): Pairs scored per model call
+            cache (RerankScoreCache): Score cache (a new one by default)
+        """
+        self.model = model
+        self.batch_size = batch_size
+        self.cache = cache or RerankScoreCache()
+        self.seconds_per_pair = None  # Measured scoring time, smoothed across calls
+
+    def rerank(self, query, documents, top_n=RERANK_TOP_N, budget_ms=RERANK_BUDGET_MS):
+        """
+        Keep the ``top_n`` most relevant documents
+
+        Args:
+            query (str): The question
+            documents (list[Document]): Candidates in retriever order
+            top_n (int): Documents to keep
+            budget_ms (float): Time allowed for scoring
+
+        Returns:
+            tuple: (kept documents, report dict with candidates, cached,
+                scored, seconds and fallback flag)
+        """
+        started = time.perf_counter()
+        deadline = started + budget_ms / 1000
+        query_digest = text_hash(query)
+        keys = [(query_digest, text_hash(doc.page_content)) for doc in documents]
+        scores = self.cache.get_many(keys)
+        report = {"candidates": len(documents), "cached": len(scores), "scored": 0, "fallback": False}
+
+        missing = list(dict.fromkeys(key for key in keys if key not in scores))
+        texts = {key: doc.page_content for key, doc in zip(keys, documents)}
+        while missing:
+            # Score as many pairs as the measured throughput fits in the time left;
+            # until there is a measurement, a single pair measures it
+            left = deadline - time.perf_counter()
+            if self.seconds_per_pair is None:
+                size = 1
+            else:
+                size = min(self.batch_size, int(left / max(self.seconds_per_pair, 1e-9)))
+            if left <= 0 or size < 1:
+                report["fallback"] = True
+                break
+            batch, missing = missing[:size], missing[size:]
+            batch_started = time.perf_counter()
+            batch_scores = self.model.predict([(query, texts[key]) for key in batch], batch_size=self.batch_size)
+            self._measured(time.perf_counter() - batch_started, len(batch))
+            new_scores = {key: float(score) for key, score in zip(batch, batch_scores)}
+            self.cache.put_many(new_scores)
+            scores.update(new_scores)
+            report["scored"] += len(batch)
+
+        report["seconds"] = round(time.perf_counter() - started, 4)
+        # Scored documents by score, then unscored ones in retriever order;
+        # the sort is stable, so equal scores keep the retriever's order too
+        scored = [i for i in range(len(documents)) if keys[i] in scores]
+        unscored = [i for i in range(len(documents)) if keys[i] not in scores]
+        order = sorted(scored, key=lambda i: -scores[keys[i]]) + unscored
+        return [documents[i] for i in order[:top_n]], report
+
+    def _measured(self, seconds, pairs):
+        """Fold one batch's time per pair into the throughput estimate"""
+        per_pair = seconds / pairs
+        if self.seconds_per_pair is None:
+            self.seconds_per_pair = per_pair
+        else:
+            self.seconds_per_pair = 0.5 * self.seconds_per_pair + 0.5 * per_pair
+
+
+class RerankingRetriever(BaseRetriever):
+    """
+    Over-fetching retriever whose candidates are reranked by a cross-encoder
+
+    Emits a ``rerank`` custom callback event with the reranker's report,
+    which the timing callback records as a span.
+    """
+
+    base_retriever: Any
+    reranker: Any
+    top_n: int = RERANK_TOP_N
+    budget_ms: float = RERANK_BUDGET_MS
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        candidates = self.base_retriever.invoke(
+            query, config={"callbacks": run_manager.get_child() if run_manager else None}
+        )
+        documents, report = self.reranker.rerank(query, candidates, self.top_n, self.budget_ms)
+        if run_manager:
+            dispatch_custom_event("rerank", report, config={"callbacks": run_manager.get_child()})
+        return documents
@@ -0,0 +1,217 @@
+# ==================== IMPORTS ====================
+import os
+import threading
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from answer_cache import SemanticAnswerCache, ToolResultCache
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from embedding_engine import QUANTIZE_BY_DEFAULT
+from index_store import FaissIndexStore
+from llm_client import GroqClient
+from pdf_export import PdfCache
+from rerank import RERANK_MODEL_NAME, CrossEncoderReranker
+
+# ==================== DEFAULTS ====================
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# CPU threads for the embedding model (unset = library default)
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))
+
+# Set EMBEDDING_WARMUP=0 to skip the dummy batch at startup (e.g. in CI)
+WARMUP_ENABLED = os.getenv("EMBEDDING_WARMUP", "1") != "0"
+
+# ==================== PROCESS-WIDE SINGLETONS ====================
+# Streamlit re-executes the app script on every rerun, but imported modules
+# stay in sys.modules, so these live for the whole server process and are
+# shared by every session.
+_lock = threading.Lock()
+_embedding_models = {}
+_warmed_up = set()
+_embedding_cache = None
+_index_stores = {}
+_answer_cache = None
+_tool_cache = None
+_pdf_cache = None
+_rerankers = {}
+_llm_client = None
+
+
+def get_embedding_model(model_name=EMBEDDING_MODEL_NAME):
+    """
+    Return the shared embedding model, loading the weights on first use only
+
+    Args:
+        model_name (str): HuggingFace sentence-transformers model id
+
+    Returns:
+        HuggingFaceEmbeddings: Model instance shared by all sessions
+    """
+    model = _embedding_models.get(model_name)
+    if model is None:
+        with _lock:
+            # Re-check under the lock so concurrent first requests load once
+            model = _embedding_models.get(model_name)
+            if model is None:
+                if EMBED_THREADS:
+                    import torch  # Installed with sentence-transformers
+                    torch.set_num_threads(EMBED_THREADS)
+                model = HuggingFaceEmbeddings(model_name=model_name)
+                _embedding_models[model_name] = model
+    return model
+
+
+def get_embedding_cache():
+    """
+    Return the shared on-disk embedding cache
+
+    Returns:
+        EmbeddingCache: One cache connection per process
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache()
+    return _embedding_cache
+
+
+def get_index_store(quantize=QUANTIZE_BY_DEFAULT):
+    """
+    Return the shared on-disk FAISS index store
+
+    Args:
+        quantize (bool): Use the int8 scalar-quantized store instead of float32
+
+    Returns:
+        FaissIndexStore: One store per process and precision, so per-set build locks are shared
+    """
+    store = _index_stores.get(quantize)
+    if store is None:
+        with _lock:
+            store = _index_stores.get(quantize)
+            if store is None:
+                store = FaissIndexStore(quantize=quantize)
+                _index_stores[quantize] = store
+    return store
+
+
+def get_answer_cache():
+    """
+    Return the shared semantic answer cache
+
+    Returns:
+        SemanticAnswerCache: One cache per process, so a whole cohort shares hits
+    """
+    global _answer_cache
+    if _answer_cache is None:
+        with _lock:
+            if _answer_cache is None:
+                _answer_cache = SemanticAnswerCache()
+    return _answer_cache
+
+
+def get_tool_cache():
+    """
+    Return the shared learning-tool result cache
+
+    Returns:
+        ToolResultCache: One cache per process, so every session reuses study packs
+    """
+    global _tool_cache
+    if _tool_cache is None:
+        with _lock:
+            if _tool_cache is None:
+                _tool_cache = ToolResultCache()
+    return _tool_cache
+
+
+def get_pdf_cache():
+    """
+    Return the shared cache of rendered PDF exports
+
+    Returns:
+        PdfCache: One cache per process, so each text is rendered once
+    """
+    global _pdf_cache
+    if _pdf_cache is None:
+        with _lock:
+            if _pdf_cache is None:
+                _pdf_cache = PdfCache()
+    return _pdf_cache
+
+
+def get_reranker(model_name=RERANK_MODEL_NAME):
+    """
+    Return the shared cross-encoder reranker, loading the model on first use
+
+    Its score cache is shared too, so a question asked in one session
+    reuses the scores computed in another.
+
+    Args:
+        model_name (str): HuggingFace cross-encoder model id
+
+    Returns:
+        CrossEncoderReranker: Reranker shared by all sessions
+    """
+    reranker = _rerankers.get(model_name)
+    if reranker is None:
+        with _lock:
+            reranker = _rerankers.get(model_name)
+            if reranker is None:
+                from sentence_transformers import CrossEncoder  # Only needed when reranking
+                reranker = CrossEncoderReranker(CrossEncoder(model_name))
+                _rerankers[model_name] = reranker
+    return reranker
+
+
+def get_llm_client():
+    """
+    Return the shared Groq API client
+
+    Returns:
+        GroqClient: One connection pool, retry policy and in-flight request table per process
+    """
+    global _llm_client
+    if _llm_client is None:
+        with _lock:
+            if _llm_client is None:
+                _llm_client = GroqClient()
+    return _llm_client
+
+
+def get_cached_embeddings(model_name=EMBEDDING_MODEL_NAME):
+    """
+    Build a per-request cache wrapper around the shared model
+
+    The wrapper is cheap to create and keeps its own hit/miss counters,
+    while the model weights and cache file are shared.
+
+    Args:
+        model_name (str): HuggingFace sentence-transformers model id
+
+    Returns:
+        CachedEmbeddings: Embeddings object ready for FAISS
+    """
+    return CachedEmbeddings(
+        get_embedding_model(model_name),
+        model_name=model_name,
+        cache=get_embedding_cache()
+    )
+
+
+def warm_up_embedding_model(model_name=EMBEDDING_MODEL_NAME):
+    """
+    Load the model and push a dummy batch through it once per process
+
+    The first forward pass pays for lazy initialisation (kernels, tokenizer
+    caches), so doing it at startup keeps it out of the first answer.
+
+    Args:
+        model_name (str): HuggingFace sentence-transformers model id
+    """
+    if not WARMUP_ENABLED or model_name in _warmed_up:
+        return
+    model = get_embedding_model(model_name)
+    model.embed_documents(["warm-up sentence for the embedding model"])
+    _warmed_up.add(model_name)
@@ -1,69 +1,20 @@
 # ==================== IMPORTS ====================
 import streamlit as st
-import time
 import os
-import tempfile
 from dotenv import load_dotenv
 
-# LangChain imports for document processing and AI
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-
-# PDF generation imports
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-import io
-
 # Import your custom theme module
 from ui_themes import setup_theme_system
 
-# ==================== PDF CREATION FUNCTION ====================
-def create_pdf_summary(summary_text, title="Document Summary"):
-    """
-    Convert summary text to PDF format with professional styling
-    
-    Args:
-        summary_text (str): The text content to convert to PDF
-        title (str): The title for the PDF document
-    
-    Returns:
-        bytes: PDF file content as bytes
-    """
-    # Create a BytesIO buffer to store PDF content
-    buffer = io.BytesIO()
-    
-    # Create PDF document with letter page size and 1-inch top margin
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=1*inch)
-    
-    # Get default styles and create custom title style
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=30,
-        textColor='Black'  
-    )
-    
-    # Build PDF content
-    story = []
-    story.append(Paragraph(title, title_style))  # Add title
-    story.append(Spacer(1, 20))  # Add space after title
-    # Convert newlines to HTML breaks for proper PDF formatting
-    story.append(Paragraph(summary_text.replace('\n', '<br/>'), styles['Normal']))
-    
-    # Generate PDF and return as bytes
-    doc.build(story)
-    buffer.seek(0)
-    return buffer.getvalue()
+# Headless RAG pipeline shared with the batch CLI
+from pipeline import AVAILABLE_MODELS, AcademicPipeline
+from ingestion import IngestionProgress
+from embedding_engine import QUANTIZE_BY_DEFAULT
+from rerank import RERANK_BUDGET_MS, RERANK_BY_DEFAULT
+
+# Process-wide embedding model (loaded once) and PDF export cache
+from shared_models import get_pdf_cache, warm_up_embedding_model
+from telemetry import get_metrics
 
 # ==================== PAGE CONFIGURATION ====================
 st.set_page_config(page_title="Smart Academic Assistant", layout="centered")
@@ -71,13 +22,18 @@ st.set_page_config(page_title="Smart Academic Assistant", layout="centered")
 # ==================== APPLY THEME SYSTEM ====================
 setup_theme_system()
 
+# ==================== EMBEDDING MODEL WARM-UP ====================
+# Loads the shared model once per server process (no-op on later reruns)
+with st.spinner("🔧 Loading embedding model..."):
+    warm_up_embedding_model()
+
 # ==================== MODEL SETTINGS SIDEBAR ====================
 st.sidebar.header("🧠 Model Configuration")
 
 # AI Model selection dropdown
 model_name = st.sidebar.selectbox(
     "Select AI Model:",
-    ["llama3-70b-8192", "llama3-8b-8192", "gemma-7b-it", "mixtral-8x22b"],
+    AVAILABLE_MODELS,
     index=0  # Default to first option
 )
 
@@ -87,6 +43,41 @@ temperature = st.sidebar.slider("Creativity (Temperature):", 0.0, 1.0, 0.5, step
 # Max tokens slider for response length control
 max_tokens = st.sidebar.slider("Max Response Length:", 512, 8192, 3072, step=64)
 
+# Vector precision toggle: int8 storage uses ~4x less index memory
+quantize_vectors = st.sidebar.toggle(
+    "🗜️ Compress vectors (int8)",
+    value=QUANTIZE_BY_DEFAULT,
+    help="Stores index vectors as 8-bit scalars; recall against float32 is reported."
+)
+
+# Retrieval mode: BM25 keyword search fused with vector search, or vectors only
+retrieval_mode = st.sidebar.radio(
+    "Retrieval:",
+    ["hybrid", "vector"],
+    format_func={"hybrid": "Hybrid (keywords + semantic)", "vector": "Semantic only"}.get,
+    help="Hybrid also matches exact terms such as theorem numbers and author names."
+)
+
+# Optional cross-encoder reranking of over-fetched chunks, within a latency budget
+rerank_chunks = st.sidebar.toggle(
+    "🎯 Rerank chunks (cross-encoder)",
+    value=RERANK_BY_DEFAULT,
+    help="Scores 20 candidates with a small local model and keeps the best 4 for the prompt."
+)
+rerank_budget_ms = RERANK_BUDGET_MS
+if rerank_chunks:
+    rerank_budget_ms = st.sidebar.slider(
+        "Rerank time budget (ms):", 50, 2000, int(RERANK_BUDGET_MS), step=50,
+        help="If scoring would take longer, the retriever's own order is used."
+    )
+
+# Per-stage timings of the last ingestion and answer (ours vs Groq's time)
+show_timings = st.sidebar.toggle(
+    "⏱️ Show timing breakdown",
+    value=False,
+    help="Loading, splitting, embedding, indexing, retrieval, prompt assembly and LLM time per request."
+)
+
 # ==================== MAIN TITLE ====================
 st.title("📚 Smart Academic Assistant")
 st.write("Upload your academic documents and ask questions to get structured answers.")
@@ -119,194 +110,207 @@ if st.button("🧠 Get Answer"):
             st.error("🚨 GROQ_API_KEY not found in your environment.")
             st.stop()
 
-        # ==================== DOCUMENT LOADING ====================
-        raw_docs = []  # List to store all loaded documents
-        
-        # Process each uploaded file
-        for i, file in enumerate(uploaded_files):
-            # Get file extension to determine loader type
-            suffix = file.name.split(".")[-1]
-            
-            # Create temporary file for processing
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f".{suffix}") as tmp:
-                tmp.write(file.read())
-                tmp_path = tmp.name
-
-            # Load document with appropriate loader and show progress
-            with st.spinner(f"📖 Reading and interpreting '{file.name}'..."):
-                time.sleep(0.75 + i * 0.25)  # Simulate processing time
-                try:
-                    # Select appropriate document loader based on file type
-                    if suffix == "pdf":
-                        loader = PyPDFLoader(tmp_path)
-                    elif suffix == "docx":
-                        loader = Docx2txtLoader(tmp_path)
-                    elif suffix == "txt":
-                        loader = TextLoader(tmp_path)
-                    else:
-                        st.warning(f"❌ Unsupported file format: {suffix}")
-                        continue
-                    
-                    # Load and add documents to collection
-                    raw_docs.extend(loader.load())
-                finally:
-                    # Clean up temporary file
-                    os.remove(tmp_path)
-
-        # Check if any documents were successfully loaded
-        if not raw_docs:
-            st.warning("❌ No valid documents to process.")
-            st.stop()
+        # Headless pipeline with the user's model settings
+        pipeline = AcademicPipeline.from_settings(
+            groq_api_key,
+            model_name=model_name,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            quantize=quantize_vectors,
+            retrieval=retrieval_mode,
+            rerank=rerank_chunks,
+            rerank_budget_ms=rerank_budget_ms
+        )
 
         # ==================== DOCUMENT PROCESSING & RETRIEVAL ====================
         with st.spinner("🔄 🔍 Consulting the academic oracle... please wait ✨"):
-            # Split documents into smaller chunks for better processing
-            splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=200)
-            chunks = splitter.split_documents(raw_docs)
-            st.session_state.chunks = chunks  # Store for later use
-
-            # Show embedding progress with progress bar
-            embed_progress = st.progress(0, text="🔗 Converting documents to embeddings...")
-            for i in range(3):
-                time.sleep(0.3)
-                embed_progress.progress((i + 1) / 3.0)
-
-            # Create embeddings and vector store for similarity search
-            embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-            vector_store = FAISS.from_documents(chunks, embeddings)
-            retriever = vector_store.as_retriever()
-
-            # ==================== AI CHAIN SETUP ====================
-            # Create prompt template for the AI model
-            prompt = ChatPromptTemplate.from_template("""
-            You are a helpful academic assistant. Use the context below to answer the question.
-
-            <context>
-            {context}
-            </context>
-
-            Question: {input}
-            Provide a clear and helpful answer.
-            """)
-
-            # Initialize the language model with user settings
-            llm = ChatGroq(
-                groq_api_key=groq_api_key,
-                model_name=model_name,
-                temperature=temperature,
-                max_tokens=max_tokens
+            # Progress bar driven by the real pipeline: pages, chunks, embedding batches
+            ingest_progress = st.progress(0.0, text="📖 Reading uploaded documents...")
+
+            def show_progress(p):
+                """Render the current ingestion counters"""
+                # Pages are split and embedded while later pages are still being parsed
+                text = f"📖 Parsed {p.pages} pages from {p.files_done}/{p.total_files} files"
+                if p.stage == "embedding":
+                    text += (
+                        f" · 🔗 Embedded {p.embedded_chunks}/{p.chunks} chunks · "
+                        f"{p.chunks_per_second():.1f} chunks/sec"
+                    )
+                else:
+                    text += f" · {p.chunks} chunks produced"
+                ingest_progress.progress(p.fraction(), text=text)
+
+            progress = IngestionProgress(total_files=len(uploaded_files), listener=show_progress)
+
+            # Load the stored index for this document set, or update the closest
+            # stored one; files are parsed straight from memory and streamed page by
+            # page through splitting, embedding and indexing
+            index_report = pipeline.ingest(
+                [(file.name, file.getvalue()) for file in uploaded_files],
+                progress=progress,
+                on_file_error=lambda name, error: st.warning(f"❌ Could not read '{name}': {error}")
+            )
+            ingest_progress.progress(
+                1.0,
+                text=(
+                    f"✅ Ingestion done · {progress.pages} pages · {progress.chunks} new chunks · "
+                    f"{progress.chunks_per_second():.1f} chunks/sec"
+                )
             )
-            st.session_state.llm = llm  # Store for later use
 
-            # Create document processing and retrieval chains
-            document_chain = create_stuff_documents_chain(llm, prompt)
-            retrieval_chain = create_retrieval_chain(retriever, document_chain)
+            # Check if any documents were successfully loaded
+            if not pipeline.ready:
+                st.warning("❌ No valid documents to process.")
+                st.stop()
+            st.session_state.pipeline = pipeline  # Store for the learning tools
 
             # ==================== GENERATE ANSWER ====================
-            # Measure response time
-            start = time.time()
-            response = retrieval_chain.invoke({"input": question})
-            end = time.time()
-
-            # Extract response components
-            answer = response.get("answer", "No answer generated.")
-            context_docs = response.get("context", chunks)
-            source_doc = "Uploaded Document"
-
-            # Get source document name if available
-            if context_docs:
-                source_doc = context_docs[0].metadata.get("source", "Uploaded Document")
-
-            # Calculate confidence score (simplified estimation)
-            confidence_score = round(min(1.0, 0.95 - 0.05 * len(context_docs)), 2)
+            # Stream answer tokens into the page as they arrive from Groq
+            # (repeated or near-identical questions are replayed from the answer cache)
+            st.subheader("🎓 Your Answer:")
+            answer_stream = pipeline.stream_answer(question)
+            st.write_stream(answer_stream)
+            structured_response = answer_stream.result
 
             # ==================== DISPLAY RESULTS ====================
-            # Structure the response for display
-            structured_response = {
-                "question": question,
-                "answer": answer,
-                "source_document": os.path.basename(source_doc),
-                "confidence_score": str(confidence_score)
-            }
-            
-            # Display the answer in JSON format
-            st.subheader("🎓 Your Answer:")
+            # Display the assembled answer in JSON format
             st.json(structured_response)
-            st.caption(f"⏱️ Answer generated in {round(end - start, 2)} seconds")
+            if answer_stream.cache_hit:
+                st.caption(
+                    f"♻️ Served from answer cache ({answer_stream.cache_hit['match']} match, "
+                    f"similarity {answer_stream.cache_hit['similarity']}) "
+                    f"in {round(answer_stream.seconds, 2)} seconds"
+                )
+            else:
+                timing = f"⏱️ Answer generated in {round(answer_stream.seconds, 2)} seconds"
+                if answer_stream.first_token_seconds is not None:
+                    timing += f" · first token after {round(answer_stream.first_token_seconds, 2)} seconds"
+                st.caption(timing)
+
+            answer_stats = pipeline.answer_cache.stats()
+            st.caption(
+                f"💾 Answer cache: {answer_stats['hit_rate']:.0%} hit rate · "
+                f"{answer_stats['exact_hits']} exact / {answer_stats['semantic_hits']} similar hits · "
+                f"{answer_stats['misses']} misses"
+            )
+            cache_stats = index_report["embedding_cache"]
+            st.caption(
+                f"🧮 Embedding cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses"
+            )
+            st.caption(
+                f"🗂️ Index {index_report['status']}: "
+                f"+{index_report['added_files']} files ({index_report['added_chunks']} chunks) · "
+                f"-{index_report['removed_files']} files ({index_report['removed_chunks']} chunks) · "
+                f"memory-mapped, shared by {index_report['shared_sessions']} session(s)"
+            )
+            if index_report.get("dedup"):
+                dedup_stats = index_report["dedup"]
+                st.caption(
+                    f"♻️ Dedup: {dedup_stats['exact_duplicates']} exact + "
+                    f"{dedup_stats['near_duplicates']} near-duplicate chunks skipped · "
+                    f"{dedup_stats['bytes_saved'] / 1024:.1f} KiB not embedded"
+                )
+            vector_caption = f"📐 Vectors: {index_report['vector_bytes'] / 1024:.0f} KiB"
+            if index_report["quantized"]:
+                vector_caption += " (int8)"
+            if index_report["index_type"] == "ivf":
+                vector_caption += f" · IVF index (nprobe {index_report.get('nprobe', '?')})"
+            if "query_ms" in index_report:
+                vector_caption += (
+                    f" · recall@10 vs exact: {index_report['recall_at_10']:.1%} · "
+                    f"{index_report['query_ms']:.2f} ms/query (exact: {index_report['exact_query_ms']:.2f} ms)"
+                )
+            st.caption(vector_caption)
             
 # ==================== AGENTIC TOOLS SECTION ====================
 # Additional utilities that become available after document processing
-if "chunks" in st.session_state and "llm" in st.session_state:
-    # Get stored chunks and language model from session state
-    chunks = st.session_state.chunks
-    llm = st.session_state.llm
-
-    def run_chain(template, input_text):
-        """
-        Helper function to run a simple prompt-LLM chain
-        
-        Args:
-            template (str): Prompt template with {input} placeholder
-            input_text (str): Text to process
-        
-        Returns:
-            str: Generated response from the language model
-        """
-        prompt = ChatPromptTemplate.from_template(template)
-        return (prompt | llm).invoke({"input": input_text}).content
+if "pipeline" in st.session_state:
+    # Get the pipeline built for the last answered question
+    pipeline = st.session_state.pipeline
 
     # ==================== UTILITY TOOLS UI ====================
     st.markdown("---")
     st.subheader("🧰 Extra Learning Utilities")
 
+    # Summary mode: whole document via map-reduce, or just the opening section
+    whole_document = st.toggle(
+        "📚 Summarize the whole document (map-reduce)",
+        value=True,
+        help="Summarizes every chunk with concurrent calls, then merges the partial summaries."
+    )
+
+    # ==================== GENERATE ALL ====================
+    # Summary, MCQs and explanation as concurrent LLM calls. Results are stored
+    # per document set and model, so reruns and later visits reuse them
+    if st.button("⚡ Generate all (summary, MCQs, explanation)"):
+        pack_progress = st.progress(0.0, text="Generating study pack...")
+
+        def show_pack_progress(stage, done, total):
+            """Render map/reduce progress of the summary as calls complete"""
+            pack_progress.progress(done / total if total else 1.0, text=f"Summary {stage}: {done}/{total} calls")
+
+        pack = pipeline.study_pack(whole_document, on_progress=show_pack_progress)
+        pack_progress.empty()
+        reused = f" · reused: {', '.join(pack['cached'])}" if pack["cached"] else ""
+        st.caption(f"⚡ Study pack ready in {pack['seconds']} seconds{reused}")
+
     # Create three columns for different tools
     col1, col2, col3 = st.columns(3)
 
-    # Initialize variables to store generated content
-    summary, mcqs, explanation = None, None, None
-    
-    # Get first chunk content for processing (or empty string if no chunks)
-    doc_content = chunks[0].page_content if chunks else ""
-
     # ==================== TOOL BUTTONS ====================
+    # Each button regenerates one tool; results land in the shared tool cache
     # Column 1: Document Summarization
     with col1:
         if st.button("📑 Summarize Document"):
-            with st.spinner("Generating summary..."):
-                summary = run_chain(
-                    "Summarize the following academic content clearly:\n{input}", 
-                    doc_content
-                )
+            if whole_document:
+                summary_progress = st.progress(0.0, text="Summarizing chunks...")
+
+                def show_summary_progress(stage, done, total):
+                    """Render map/reduce progress as calls complete"""
+                    summary_progress.progress(
+                        done / total if total else 1.0,
+                        text=f"{stage}: {done}/{total} calls"
+                    )
+
+                pipeline.summarize(on_progress=show_summary_progress)
+                summary_progress.empty()
+            else:
+                with st.spinner("Generating summary..."):
+                    pipeline.summarize(whole_document=False)
 
     # Column 2: MCQ Generation
     with col2:
         if st.button("📝 Generate MCQs"):
             with st.spinner("Generating MCQs..."):
-                mcqs = run_chain(
-                    "Generate 3 MCQs from the following content with 4 options each and mark the correct one:\n{input}",
-                    doc_content
-                )
+                pipeline.generate_mcqs()
 
     # Column 3: Topic-wise Explanation
     with col3:
         if st.button("📚 Topic-wise Explanation"):
             with st.spinner("Generating explanation..."):
-                explanation = run_chain(
-                    "Provide a simple topic-wise explanation of:\n{input}", 
-                    doc_content
-                )
+                pipeline.explain()
+
+    # Results generated so far for this document set and model (survive reruns)
+    tool_results = pipeline.tool_results(whole_document)
+    summary = tool_results.get("summary")
+    summary_timings = tool_results.get("summary_timings", [])
+    mcqs = tool_results.get("mcqs")
+    explanation = tool_results.get("explanation")
 
     # ==================== DISPLAY GENERATED CONTENT ====================
     # Display Summary with PDF download option
     if summary:
         with st.expander("📄 Document Summary", expanded=True):
             st.markdown(summary)
-            # Generate PDF and create download button
-            pdf_data = create_pdf_summary(summary, "Document Summary")
+            if summary_timings:
+                st.caption("⏱️ " + " · ".join(
+                    f"{t['stage']}: {t['calls']} calls in {t['seconds']}s" for t in summary_timings
+                ))
+            # PDF is rendered only when the download is clicked (then cached by content)
             st.download_button(
-                "📥 Download Summary", 
-                pdf_data, 
-                file_name="summary.pdf", 
+                "📥 Download Summary",
+                lambda text=summary: get_pdf_cache().get(text, "Document Summary"),
+                file_name="summary.pdf",
                 mime="application/pdf"
             )
 
@@ -314,12 +318,11 @@ if "chunks" in st.session_state and "llm" in st.session_state:
     if mcqs:
         with st.expander("🧠 Practice Questions", expanded=True):
             st.markdown(mcqs)
-            # Generate PDF and create download button
-            pdf_data = create_pdf_summary(mcqs, "Practice Questions")
+            # PDF is rendered only when the download is clicked (then cached by content)
             st.download_button(
-                "📥 Download MCQs", 
-                pdf_data, 
-                file_name="mcqs.pdf", 
+                "📥 Download MCQs",
+                lambda text=mcqs: get_pdf_cache().get(text, "Practice Questions"),
+                file_name="mcqs.pdf",
                 mime="application/pdf"
             )
 
@@ -327,15 +330,39 @@ if "chunks" in st.session_state and "llm" in st.session_state:
     if explanation:
         with st.expander("🔍 Topic-wise Explanation", expanded=True):
             st.markdown(explanation)
-            # Generate PDF and create download button
-            pdf_data = create_pdf_summary(explanation, "Topic-wise Explanation")
+            # PDF is rendered only when the download is clicked (then cached by content)
             st.download_button(
-                "📥 Download Explanation", 
-                pdf_data, 
-                file_name="explanation.pdf", 
+                "📥 Download Explanation",
+                lambda text=explanation: get_pdf_cache().get(text, "Topic-wise Explanation"),
+                file_name="explanation.pdf",
                 mime="application/pdf"
             )
 
+# ==================== TIMING BREAKDOWN ====================
+# Sidebar view of the spans of the last requests, plus metric exports
+if show_timings and "pipeline" in st.session_state:
+    st.sidebar.markdown("### ⏱️ Timing breakdown")
+    for kind, trace in st.session_state.pipeline.last_traces.items():
+        if trace.seconds is None:
+            continue
+        st.sidebar.markdown(f"**{kind.capitalize()}** · {trace.seconds * 1000:.0f} ms total")
+        for span in trace.breakdown():
+            details = span.get("file") or ""
+            if "prompt_tokens" in span:
+                estimated = " (est.)" if span.get("tokens_estimated") else ""
+                details = f"{span['prompt_tokens']} → {span['completion_tokens']} tokens{estimated}"
+            elif "tokens_saved" in span:
+                details = f"{span['tokens_out']}/{span['budget']} tokens, {span['tokens_saved']} saved"
+            st.sidebar.caption(f"{span['name']}: {span['ms']:.1f} ms ({span['share']:.0%}) {details}")
+
+    metrics = get_metrics()
+    st.sidebar.download_button(
+        "📥 Traces (JSON lines)", metrics.to_jsonl(), file_name="traces.jsonl", mime="application/x-ndjson"
+    )
+    st.sidebar.download_button(
+        "📥 Metrics (Prometheus)", metrics.prometheus_text(), file_name="metrics.prom", mime="text/plain"
+    )
+
 # ==================== FOOTER ====================
 st.markdown("---")
 st.caption("Mentox Bootcamp · Final Capstone Project · Phase 1")
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Local stand-in for the Groq chat completions API
+
+Answers every request with a deterministic text after a configurable
+latency, and answers 429 (with Retry-After) once a token-bucket rate limit
+is exceeded, so the pooled client's retries and request coalescing can be
+exercised without an API key:
+
+    python stub_llm_server.py --port 8001 --latency 0.5 --rps 2
+    GROQ_BASE_URL=http://127.0.0.1:8001/openai/v1 streamlit run streamlit_app.py
+"""
+# ==================== IMPORTS ====================
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+# ==================== RATE LIMIT ====================
+class TokenBucket:
+    """``rate`` requests per second with bursts of up to ``burst``"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """
+        Returns:
+            float: 0 if the request may go ahead, else seconds until it could
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+# ==================== APPLICATION ====================
+def create_stub_app(latency_seconds=0.2, requests_per_second=0.0, burst=5, error_rate=0.0, seed=0):
+    """
+    Build the stub API
+
+    Args:
+        latency_seconds (float): Delay before each answer (and spread over streamed tokens)
+        requests_per_second (float): Sustained rate limit (0 for none)
+        burst (int): Requests allowed at once before the limit applies
+        error_rate (float): Share of requests failed with a 503
+        seed (int): Seed of the simulated failures
+
+    Returns:
+        FastAPI: The stub; ``GET /stats`` returns its request counters
+    """
+    app = FastAPI(title="Groq API stub")
+    bucket = TokenBucket(requests_per_second, burst) if requests_per_second else None
+    rng = random.Random(seed)
+    counters = {"requests": 0, "answered": 0, "rate_limited": 0, "failed": 0, "streams_cancelled": 0}
+
+    @app.get("/stats")
+    def stats():
+        return counters
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        counters["requests"] += 1
+        wait = bucket.take() if bucket else 0.0
+        if wait:
+            counters["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (stub)", "type": "requests"}},
+                status_code=429,
+                headers={"retry-after": f"{wait:.3f}"}
+            )
+        if rng.random() < error_rate:
+            counters["failed"] += 1
+            return JSONResponse({"error": {"message": "Service unavailable (stub)"}}, status_code=503)
+
+        prompt = body["messages"][-1]["content"] if body.get("messages") else ""
+        words = f"Stub answer from {body.get('model')}: {' '.join(prompt.split()[:12])}".split(" ")
+        usage = {
+            "prompt_tokens": sum(len(m["content"]) for m in body.get("messages", [])) // 4 + 1,
+            "completion_tokens": len(words),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        counters["answered"] += 1
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency_seconds)
+            return {
+                "id": "stub",
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                             "finish_reason": "stop"}],
+                "usage": usage
+            }
+
+        async def events():
+            finished = False
+            try:
+                for i, word in enumerate(words):
+                    await asyncio.sleep(latency_seconds / len(words))
+                    delta = {"content": word if i == 0 else " " + word}
+                    yield f"data: {json.dumps({'choices': [{'index': 0, 'delta': delta}]})}\n\n"
+                final = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+                finished = True
+            finally:
+                if not finished:
+                    # The client hung up mid-stream
+                    counters["streams_cancelled"] += 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+# ==================== CLI ====================
+def main():
+    parser = argparse.ArgumentParser(description="Local Groq API stub with latency and rate limits")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per answer")
+    parser.add_argument("--rps", type=float, default=0.0, help="Sustained requests per second (0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=5, help="Requests allowed at once")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    args = parser.parse_args()
+    app = create_stub_app(args.latency, args.rps, args.burst, args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# ==================== IMPORTS ====================
+import asyncio
+import os
+import time
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from model_limits import estimate_tokens, truncate_to_tokens
+
+# ==================== SETTINGS ====================
+# Upper bound on simultaneous Groq calls (stay below the account rate limit)
+MAX_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))
+
+MAP_TEMPLATE = "Summarize the following academic content clearly:\n{input}"
+REDUCE_TEMPLATE = (
+    "The following are summaries of consecutive parts of one academic document. "
+    "Combine them into a single clear summary, keeping the key arguments and their order:\n{input}"
+)
+
+# ==================== GROUPING ====================
+def pack_texts(texts, token_budget, min_group=1, separator="\n\n"):
+    """
+    Pack consecutive texts into groups that fit a token budget
+
+    Args:
+        texts (list[str]): Texts in document order
+        token_budget (int): Maximum estimated tokens per group
+        min_group (int): Minimum texts per group (2 guarantees each reduce
+            level shrinks the list); texts that cannot fit together are
+            trimmed to an equal share of the budget instead of overflowing it
+        separator (str): Joiner between texts of one group
+
+    Returns:
+        list[str]: Joined groups, in order
+    """
+    # Per-text share when min_group texts must share one call (one token spare for the separator)
+    share_tokens = max(1, token_budget // min_group - 1)
+    groups, current, current_tokens = [], [], 0
+    for text in texts:
+        text = truncate_to_tokens(text, token_budget)  # A single oversized text is truncated to fit
+        tokens = estimate_tokens(text)
+        if current and current_tokens + tokens > token_budget:
+            if len(current) >= min_group:
+                groups.append(separator.join(current))
+                current, current_tokens = [], 0
+            else:
+                # The group is too small to close, so split the budget between its texts
+                current = [truncate_to_tokens(t, share_tokens) for t in current]
+                current_tokens = sum(estimate_tokens(t) for t in current)
+                text = truncate_to_tokens(text, share_tokens)
+                tokens = estimate_tokens(text)
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(separator.join(current))
+    return groups
+
+
+# ==================== MAP-REDUCE SUMMARY ====================
+async def map_reduce_summary(llm, chunks, token_budget, max_concurrency=MAX_CONCURRENCY,
+                             on_progress=None):
+    """
+    Summarize a whole document with concurrent map calls and hierarchical reduces
+
+    Args:
+        llm (BaseChatModel): Chat model (must support ``ainvoke``)
+        chunks (list[Document]): Document chunks in reading order
+        token_budget (int): Input tokens allowed per call
+        max_concurrency (int): Maximum LLM calls in flight at once
+        on_progress (callable): ``on_progress(stage, done, total)`` after every call
+
+    Returns:
+        tuple: (summary text, list of per-stage timing dicts)
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    timings = []
+
+    async def run_stage(stage, template, inputs):
+        """Run one template over all inputs concurrently, preserving order"""
+        chain = ChatPromptTemplate.from_template(template) | llm
+        started = time.perf_counter()
+        done = 0
+        if on_progress:
+            on_progress(stage, 0, len(inputs))
+
+        async def call(text):
+            nonlocal done
+            async with semaphore:
+                result = await chain.ainvoke({"input": text})
+            done += 1
+            if on_progress:
+                on_progress(stage, done, len(inputs))
+            return result.content
+
+        outputs = await asyncio.gather(*(call(text) for text in inputs))
+        timings.append({
+            "stage": stage,
+            "calls": len(inputs),
+            "seconds": round(time.perf_counter() - started, 2)
+        })
+        return list(outputs)
+
+    texts = [chunk.page_content for chunk in chunks if chunk.page_content.strip()]
+    if not texts:
+        return "", timings
+
+    # Map: summarize every group of consecutive chunks that fits one call
+    partials = await run_stage("map", MAP_TEMPLATE, pack_texts(texts, token_budget))
+
+    # Reduce: merge partial summaries level by level until one remains
+    level = 1
+    while len(partials) > 1:
+        groups = pack_texts(partials, token_budget, min_group=2)
+        stage = "final reduce" if len(groups) == 1 else f"reduce level {level}"
+        partials = await run_stage(stage, REDUCE_TEMPLATE, groups)
+        level += 1
+
+    return partials[0], timings
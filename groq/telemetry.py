@@ -0,0 +1,345 @@
+# ==================== IMPORTS ====================
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from model_limits import estimate_tokens
+
+# ==================== SETTINGS ====================
+# Append every finished trace as one JSON line to this file (disabled when unset)
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH")
+METRIC_PREFIX = "academic_assistant"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RECENT_TRACES = 200  # Finished traces kept in memory for export
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+# ==================== TRACES ====================
+class Trace:
+    """
+    Timing spans of one request (an ingestion or an answer)
+
+    Use as a context manager: while active, ``span``/``record`` calls
+    anywhere below (embedding, index building...) land in this trace, and
+    on exit it is finished and handed to the process-wide metrics.
+    """
+
+    def __init__(self, kind, **attributes):
+        """
+        Args:
+            kind (str): Request type, e.g. "ingest" or "answer"
+            **attributes: Request-level attributes (model, document set...)
+        """
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.attributes = attributes
+        self.spans = []
+        self.started_at = time.time()
+        self.seconds = None
+        self._started = time.perf_counter()
+        self._accumulated = {}
+        self._token = None
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, accumulate=False, **attributes):
+        """
+        Add a finished span
+
+        Args:
+            name (str): Stage name
+            seconds (float): Duration
+            accumulate (bool): Sum into one span per name (for per-batch work)
+                instead of adding a new span; numeric attributes are summed too
+            **attributes: Counts and labels (file name, chunks, tokens...)
+        """
+        with self._lock:
+            if not accumulate:
+                self.spans.append(dict(attributes, name=name, seconds=seconds))
+                return
+            span = self._accumulated.get(name)
+            if span is None:
+                span = self._accumulated[name] = dict(attributes, name=name, seconds=0.0, calls=0)
+                self.spans.append(span)
+            else:
+                for key, value in attributes.items():
+                    span[key] = span.get(key, 0) + value if isinstance(value, (int, float)) else value
+            span["seconds"] += seconds
+            span["calls"] += 1
+
+    @contextmanager
+    def span(self, name, accumulate=False, **attributes):
+        """Time a block; the yielded dict can receive attributes known only at the end"""
+        started = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.record(name, time.perf_counter() - started, accumulate, **attributes)
+
+    def finish(self):
+        """Close the trace and publish it to the process-wide metrics"""
+        if self.seconds is None:
+            self.seconds = time.perf_counter() - self._started
+            get_metrics().observe(self)
+
+    def breakdown(self):
+        """
+        Spans with their share of the request time, for display
+
+        Returns:
+            list[dict]: name, milliseconds, share and the span attributes
+        """
+        total = self.seconds or (time.perf_counter() - self._started)
+        return [
+            dict(span, ms=round(span["seconds"] * 1000, 1), share=span["seconds"] / total if total else 0.0)
+            for span in self.spans
+        ]
+
+    def to_dict(self):
+        return {
+            "trace_id": self.id,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "attributes": self.attributes,
+            "spans": [dict(span, seconds=round(span["seconds"], 6)) for span in self.spans]
+        }
+
+    def __enter__(self):
+        self._token = _current_trace.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _current_trace.reset(self._token)
+        self.finish()
+
+
+def current_trace():
+    """The trace active in this context, or None"""
+    return _current_trace.get()
+
+
+def record(name, seconds, accumulate=False, **attributes):
+    """``Trace.record`` on the active trace (no-op without one)"""
+    trace = current_trace()
+    if trace is not None:
+        trace.record(name, seconds, accumulate, **attributes)
+
+
+@contextmanager
+def span(name, accumulate=False, **attributes):
+    """``Trace.span`` on the active trace (just runs the block without one)"""
+    trace = current_trace()
+    if trace is None:
+        yield attributes
+        return
+    with trace.span(name, accumulate, **attributes) as span_attributes:
+        yield span_attributes
+
+
+# ==================== LLM CALLBACKS ====================
+class LLMTimingCallback(BaseCallbackHandler):
+    """
+    Splits a retrieval chain run into retrieval, prompt assembly and LLM spans
+
+    Records time to first token, total LLM time and token counts (from the
+    provider's usage data, estimated from the text when it is missing).
+    """
+
+    run_inline = True  # Keep timestamps exact under async chains
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.retrievers = {}  # run id -> (start time, parent run id)
+        self.wrappers = set()  # Run ids of retrievers that wrap another retriever
+        self.retrieval_done = None
+        self.llm_started = None
+        self.first_token = None
+        self.prompt_text = ""
+        self.completion = []
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        self.retrievers[run_id] = (time.perf_counter(), parent_run_id)
+        self.wrappers.add(parent_run_id)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        started, parent_run_id = self.retrievers.pop(run_id, (None, None))
+        if started is None:
+            return
+        ended = time.perf_counter()
+        if parent_run_id in self.retrievers:
+            # Innermost retriever below reranking/packing wrappers: the candidates.
+            # Middle wrappers report their own work through custom events.
+            if run_id not in self.wrappers:
+                self.trace.record("retrieval candidates", ended - started, documents=len(documents))
+            return
+        self.retrieval_done = ended
+        self.trace.record("retrieval", ended - started, documents=len(documents))
+
+    def on_custom_event(self, name, data, *, run_id, **kwargs):
+        if name in ("rerank", "context packing"):
+            self.trace.record(name, data["seconds"], **{k: v for k, v in data.items() if k != "seconds"})
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.llm_started = time.perf_counter()
+        self.prompt_text = "\n".join(str(m.content) for batch in messages for m in batch)
+        if self.retrieval_done is not None:
+            self.trace.record("prompt assembly", self.llm_started - self.retrieval_done)
+
+    def on_llm_new_token(self, token, **kwargs):
+        if self.first_token is None and self.llm_started is not None:
+            self.first_token = time.perf_counter()
+            self.trace.record("llm first token", self.first_token - self.llm_started)
+        self.completion.append(token)
+
+    def on_llm_end(self, response, **kwargs):
+        if self.llm_started is None:
+            return
+        usage = self._usage(response)
+        self.trace.record("llm total", time.perf_counter() - self.llm_started, **usage)
+
+    def _usage(self, response):
+        """Prompt and completion token counts from the LLM result"""
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        if token_usage.get("prompt_tokens") is not None:
+            return {
+                "prompt_tokens": token_usage["prompt_tokens"],
+                "completion_tokens": token_usage.get("completion_tokens", 0)
+            }
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    return {"prompt_tokens": usage["input_tokens"], "completion_tokens": usage["output_tokens"]}
+        text = "".join(self.completion) or "".join(g.text for gs in response.generations for g in gs)
+        return {
+            "prompt_tokens": estimate_tokens(self.prompt_text),
+            "completion_tokens": estimate_tokens(text),
+            "tokens_estimated": True
+        }
+
+
+# ==================== PROCESS-WIDE METRICS ====================
+class MetricsRegistry:
+    """
+    Aggregates finished traces into Prometheus metrics and a JSON-lines log
+
+    Stage latencies become one histogram per (request kind, stage); token
+    counts and request counts become counters.
+    """
+
+    def __init__(self, jsonl_path=TRACE_LOG_PATH):
+        """
+        Args:
+            jsonl_path (str): File every finished trace is appended to (None to disable)
+        """
+        self.jsonl_path = jsonl_path
+        self.recent = deque(maxlen=RECENT_TRACES)
+        self._histograms = {}
+        self._requests = {}
+        self._tokens = {}
+        self._tokens_saved = 0
+        self._lock = threading.Lock()
+
+    def observe(self, trace):
+        """Add a finished trace"""
+        line = json.dumps(trace.to_dict(), default=str)
+        with self._lock:
+            self.recent.append(line)
+            self._requests[trace.kind] = self._requests.get(trace.kind, 0) + 1
+            self._observe_seconds((trace.kind, "total"), trace.seconds)
+            for span in trace.spans:
+                self._observe_seconds((trace.kind, span["name"]), span["seconds"])
+                for kind in ("prompt", "completion"):
+                    if f"{kind}_tokens" in span:
+                        self._tokens[kind] = self._tokens.get(kind, 0) + span[f"{kind}_tokens"]
+                self._tokens_saved += span.get("tokens_saved", 0)
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+
+    def _observe_seconds(self, key, seconds):
+        histogram = self._histograms.setdefault(key, {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0})
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+    def to_jsonl(self):
+        """
+        Recent traces, one JSON object per line
+
+        Returns:
+            str: JSON lines (newest last)
+        """
+        with self._lock:
+            return "".join(line + "\n" for line in self.recent)
+
+    def prometheus_text(self):
+        """
+        All metrics in the Prometheus text exposition format
+
+        Returns:
+            str: Exposition text
+        """
+        name = f"{METRIC_PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Duration of request stages.",
+            f"# TYPE {name} histogram"
+        ]
+        with self._lock:
+            for (kind, stage), histogram in sorted(self._histograms.items()):
+                labels = f'kind="{kind}",stage="{stage}"'
+                for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram['sum']:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {histogram['count']}")
+
+            lines += [
+                f"# HELP {METRIC_PREFIX}_requests_total Finished requests.",
+                f"# TYPE {METRIC_PREFIX}_requests_total counter"
+            ]
+            lines += [f'{METRIC_PREFIX}_requests_total{{kind="{kind}"}} {count}'
+                      for kind, count in sorted(self._requests.items())]
+
+            lines += [
+                f"# HELP {METRIC_PREFIX}_llm_tokens_total LLM tokens (estimated when the provider reports none).",
+                f"# TYPE {METRIC_PREFIX}_llm_tokens_total counter"
+            ]
+            lines += [f'{METRIC_PREFIX}_llm_tokens_total{{type="{kind}"}} {count}'
+                      for kind, count in sorted(self._tokens.items())]
+
+            lines += [
+                f"# HELP {METRIC_PREFIX}_context_tokens_saved_total Prompt tokens saved by context packing.",
+                f"# TYPE {METRIC_PREFIX}_context_tokens_saved_total counter",
+                f"{METRIC_PREFIX}_context_tokens_saved_total {self._tokens_saved}"
+            ]
+        return "\n".join(lines) + "\n"
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Return the process-wide metrics registry
+
+    Returns:
+        MetricsRegistry: Shared registry
+    """
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = MetricsRegistry()
+    return _metrics
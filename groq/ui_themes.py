@@ -1,3 +1,7 @@
+import re
+from functools import lru_cache
+from string import Template
+
 import streamlit as st
 
 def init_theme_state():
@@ -9,741 +13,623 @@ def render_theme_toggle():
     """Render the theme toggle in sidebar"""
     st.sidebar.toggle("🌙 Dark Mode", key="dark_mode")
 
+class ThemeConfig:
+    """Configuration class for theme customization"""
+
+    # Values are any CSS color; "primary" must be a hex color (glows are derived from it)
+    DARK_COLORS = {
+        'scheme': 'dark',
+        'primary': '#8b5cf6',
+        'primary_hover': '#7c3aed',
+        'primary_active': '#6d28d9',
+        'on_primary': 'white',
+        'on_primary_small': '#ffffff',
+        'background': '#1a1a1a',
+        'background_end': '#1a1a1a',
+        'canvas': '#1a1a1a',
+        'sidebar': '#2d2d2d',
+        'sidebar_border': '#2d2d2d',
+        'surface': '#404040',
+        'surface_hover': '#555555',
+        'surface_border': '#555555',
+        'panel': 'rgba(45, 45, 45, 0.95)',
+        'panel_hover': 'rgba(55, 55, 55, 0.95)',
+        'panel_body': 'rgba(40, 40, 40, 0.95)',
+        'uploader': 'rgba(45, 45, 45, 0.95)',
+        'uploader_hover': 'rgba(55, 55, 55, 0.95)',
+        'uploaded_file': 'rgba(35, 35, 35, 0.9)',
+        'text': '#e5e5e5',
+        'heading': '#ffffff',
+        'input_text': '#ffffff',
+        'text_secondary': '#aaaaaa',
+        'border': '#555555',
+        'border_subtle': 'rgba(255, 255, 255, 0.1)',
+        'border_dashed': '#666666',
+        'shadow': 'rgba(0, 0, 0, 0.15)'
+    }
+
+    LIGHT_COLORS = {
+        'scheme': 'light',
+        'primary': '#8b5cf6',
+        'primary_hover': '#7c3aed',
+        'primary_active': '#6d28d9',
+        'on_primary': 'white',
+        'on_primary_small': '#ffffff',
+        'background': '#ffffff',
+        'background_end': '#f8fafc',
+        'canvas': '#1a1a1a',  # Painted over by the background gradient
+        'sidebar': 'rgba(248, 250, 252, 0.95)',
+        'sidebar_border': '#e2e8f0',
+        'surface': 'rgba(255, 255, 255, 0.8)',
+        'surface_hover': 'rgba(228, 232, 237, 0.8)',
+        'surface_border': '#e2e8f0',
+        'panel': 'rgba(248, 250, 252, 0.8)',
+        'panel_hover': 'rgba(228, 232, 237, 0.8)',
+        'panel_body': 'rgba(255, 255, 255, 0.6)',
+        'uploader': 'rgba(255, 255, 255, 0.6)',
+        'uploader_hover': 'rgba(139, 92, 246, 0.02)',
+        'uploaded_file': 'rgba(255, 255, 255, 0.6)',
+        'text': '#334155',
+        'heading': '#1e293b',
+        'input_text': '#334155',
+        'text_secondary': '#64748b',
+        'border': '#cbd5e1',
+        'border_subtle': '#e2e8f0',
+        'border_dashed': '#94a3b8',
+        'shadow': 'rgba(0, 0, 0, 0.1)'
+    }
+
+# Stylesheet shared by every theme; $names are palette entries ($primary_NN = primary at NN% opacity)
+BASE_CSS = Template("""
+    /* Hide Streamlit branding */
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    header {visibility: hidden;}
+
+    /* Remove top padding */
+    .main > div {
+        padding-top: 0rem;
+    }
+
+    /* Main App Background */
+    .stApp {
+        background-color: $canvas !important;
+        color: $text !important;
+    }
+
+    /* Sidebar */
+    .stSidebar > div {
+        background-color: $sidebar !important;
+    }
+
+    /* Remove Unwanted Container Backgrounds */
+    .stContainer, .element-container, .block-container {
+        background-color: transparent !important;
+        border: none !important;
+    }
+
+    /* Text Elements */
+    .stMarkdown, .stText, p, span, div, label {
+        color: $text !important;
+    }
+
+    /* Headers */
+    h1, h2, h3, h4, h5, h6 {
+        color: $heading !important;
+        font-weight: 600 !important;
+    }
+
+    /* Input Fields */
+    .stTextInput > div > div > input {
+        background-color: $surface !important;
+        color: $input_text !important;
+        border: 1px solid $border !important;
+        border-radius: 6px !important;
+        padding: 0.5rem 0.75rem !important;
+        min-height: 2.5rem !important;
+        height: 2.5rem !important;
+    }
+
+    .stTextInput > div > div > input:focus {
+        border-color: $primary !important;
+        box-shadow: 0 0 0 2px $primary_20 !important;
+    }
+
+    .stTextInput > div > div > input::placeholder {
+        color: $text_secondary !important;
+    }
+
+    /* File Uploader */
+    .stFileUploader {
+        border: 1px dashed $border_dashed !important;
+        border-radius: 8px !important;
+        padding: 1rem !important;
+        backdrop-filter: blur(10px) !important;
+    }
+
+    /* Selectbox - All Parts */
+    .stSelectbox > div > div > div {
+        background-color: $surface !important;
+        color: $input_text !important;
+        border: 1px solid $border !important;
+        border-radius: 6px !important;
+        min-height: 2.5rem !important;
+        height: 2.5rem !important;
+        padding: 0.5rem 0.75rem !important;
+    }
+
+    /* Selected Value and Input Text Color */
+    div[data-baseweb="select"] span, div[data-baseweb="select"] input {
+        color: $input_text !important;
+    }
+
+    /* Selected Value Container */
+    div[data-baseweb="select"] > div > div {
+        color: $input_text !important;
+    }
+
+    /* Sliders - Accent */
+    .stSidebar .stSlider > div > div > div > div {
+        background-color: $primary !important;
+    }
+
+    /* Primary Button */
+    .stButton > button {
+        background: linear-gradient(135deg, $primary 0%, $primary_hover 100%) !important;
+        color: $on_primary !important;
+        border: none !important;
+        border-radius: 6px !important;
+        padding: 0.75rem 1.5rem !important;
+        font-weight: 600 !important;
+        font-size: 0.95rem !important;
+        transition: all 0.2s ease !important;
+        box-shadow: 0 2px 4px $primary_30 !important;
+        min-height: 3rem !important;
+        height: 3rem !important;
+        width: 100% !important;
+        white-space: normal !important;
+        text-align: center !important;
+    }
+
+    .stButton > button:hover {
+        transform: translateY(-1px) !important;
+        box-shadow: 0 4px 8px $primary_40 !important;
+        background: linear-gradient(135deg, $primary_hover 0%, $primary_active 100%) !important;
+    }
+
+    /* Update Summary and Download Buttons */
+    button[kind="primary"],
+    button[data-testid*="update"],
+    button[title*="Update"],
+    .stDownloadButton > button {
+        background: linear-gradient(135deg, $primary 0%, $primary_hover 100%) !important;
+        color: $on_primary !important;
+        border: none !important;
+        border-radius: 6px !important;
+        padding: 0.75rem 1.5rem !important;
+        font-weight: 600 !important;
+        font-size: 0.95rem !important;
+        transition: all 0.2s ease !important;
+        box-shadow: 0 2px 4px $primary_30 !important;
+        min-height: 3rem !important;
+        height: 3rem !important;
+    }
+
+    button[kind="primary"]:hover,
+    button[data-testid*="update"]:hover,
+    button[title*="Update"]:hover,
+    .stDownloadButton > button:hover {
+        transform: translateY(-1px) !important;
+        box-shadow: 0 4px 8px $primary_40 !important;
+        background: linear-gradient(135deg, $primary_hover 0%, $primary_active 100%) !important;
+    }
+
+    /* Browse Files Button */
+    .stFileUploader button {
+        background: linear-gradient(135deg, $primary 0%, $primary_hover 100%) !important;
+        color: $on_primary_small !important;
+        border: none !important;
+        border-radius: 6px !important;
+        padding: 0.5rem 1rem !important;
+        font-weight: 600 !important;
+        font-size: 0.875rem !important;
+        transition: all 0.2s ease !important;
+        min-height: 2.5rem !important;
+        height: 2.5rem !important;
+    }
+
+    /* JSON Display */
+    .stJson {
+        background-color: $surface !important;
+        border: 1px solid $surface_border !important;
+        border-radius: 8px !important;
+        padding: 1rem !important;
+        box-shadow: 0 2px 8px $shadow !important;
+    }
+
+    /* Expanders */
+    div[data-testid="stExpander"] details summary {
+        background: $panel !important;
+        color: $input_text !important;
+        border: 1px solid $border_subtle !important;
+        border-radius: 8px 8px 0 0 !important;
+        padding: 1rem !important;
+        font-weight: 600 !important;
+        box-shadow: 0 2px 8px $shadow !important;
+        backdrop-filter: blur(10px) !important;
+    }
+
+    div[data-testid="stExpander"] details summary:hover {
+        background: $panel_hover !important;
+        border-color: $primary_30 !important;
+    }
+
+    div[data-testid="stExpander"] > div > div {
+        background: $panel_body !important;
+        color: $text !important;
+        border: 1px solid $border_subtle !important;
+        border-top: none !important;
+        border-radius: 0 0 8px 8px !important;
+        padding: 1rem !important;
+        box-shadow: 0 2px 8px $shadow !important;
+        backdrop-filter: blur(10px) !important;
+    }
+
+    /* Column Alignment Fix */
+    div[data-testid="column"] {
+        display: flex !important;
+        height: 100% !important;
+    }
+
+    div[data-testid="column"] > div {
+        display: flex !important;
+        flex-direction: column !important;
+        height: 100% !important;
+    }
+
+    div[data-testid="column"] .stButton {
+        flex: 1 !important;
+        display: flex !important;
+    }
+
+    /* Progress Bar */
+    .stProgress > div > div > div {
+        background: linear-gradient(90deg, $primary, $primary_hover) !important;
+    }
+
+    /* Alerts & Messages */
+    .stAlert {
+        background-color: $surface !important;
+        border: 1px solid $surface_border !important;
+        border-radius: 6px !important;
+        padding: 1rem !important;
+    }
+
+    .stSidebar h1, .stSidebar h2, .stSidebar h3 {
+        color: $heading !important;
+    }
+
+    /* Caption Text */
+    .stCaption {
+        color: $text_secondary !important;
+    }
+
+    /* Match spacing between elements */
+    .element-container {
+        margin-bottom: 1rem !important;
+    }
+
+    /* Ensure consistent component heights */
+    .stTextInput, .stSelectbox, .stFileUploader {
+        min-height: auto !important;
+    }
+""")
+
+# Extra rules per color scheme
+SCHEME_CSS = {
+    'light': Template("""
+    /* Main App Background */
+    .stApp {
+        background: linear-gradient(135deg, $background 0%, $background_end 100%) !important;
+    }
+
+    .stSidebar > div {
+        border-right: 1px solid $sidebar_border !important;
+    }
+
+    /* Room below the (invisible) header */
+    .main .block-container {
+        padding-top: 2rem !important;
+    }
+
+    /* Frosted glass panels */
+    .stTextInput > div > div > input, .stJson, .stAlert {
+        backdrop-filter: blur(10px) !important;
+    }
+
+    .stTextInput > div > div > input:focus {
+        box-shadow: 0 0 0 2px $primary_10 !important;
+    }
+
+    .stFileUploader {
+        background-color: $uploader !important;
+    }
+
+    .stFileUploader:hover {
+        border-color: $primary !important;
+        background-color: $uploader_hover !important;
+    }
+
+    /* Softer button glow */
+    .stButton > button {
+        box-shadow: 0 2px 4px $primary_20 !important;
+    }
+
+    .stButton > button:hover {
+        box-shadow: 0 4px 12px $primary_30 !important;
+    }
+
+    .stJson {
+        background-color: $panel !important;
+    }
+
+    /* Sidebar Specific Elements */
+    .stSidebar .stSelectbox > div > div {
+        background-color: $surface !important;
+        border: 1px solid $border_subtle !important;
+        min-height: 2.5rem !important;
+        height: 2.5rem !important;
+    }
+"""),
+    'dark': Template("""
+    /* Page background behind the app */
+    html, body, #root, .stApp {
+        background-color: $background !important;
+    }
+
+    /* Hide header and decorator completely */
+    header[data-testid="stHeader"], div[data-testid="stDecoration"] {
+        display: none !important;
+    }
+
+    .main .block-container {
+        padding-top: 0rem !important;
+    }
+
+    .stSidebar > div, .stSidebar label, .stCheckbox > label {
+        color: $text !important;
+    }
+
+    .stSlider > div > div > div > div {
+        background-color: $primary !important;
+    }
+
+    .stJson pre, .stAlert {
+        color: $input_text !important;
+    }
+
+    /* Sidebar Specific Elements */
+    .stSidebar .stSelectbox > div > div > div {
+        background-color: $surface !important;
+        color: $input_text !important;
+        border: 1px solid $border !important;
+        min-height: 2.5rem !important;
+        height: 2.5rem !important;
+    }
+
+    /* File Uploader */
+    .stFileUploader {
+        background: $uploader !important;
+        box-shadow: none !important;
+    }
+
+    .stFileUploader:hover {
+        border-color: $primary_50 !important;
+        background: $uploader_hover !important;
+        transform: none !important;
+        transition: all 0.3s ease !important;
+    }
+
+    .stFileUploader button:hover {
+        transform: translateY(-1px) !important;
+        box-shadow: 0 4px 12px $primary_40 !important;
+    }
+
+    /* Selected Value Container */
+    div[data-baseweb="select"] > div > div {
+        background-color: $surface !important;
+    }
+
+    /* Dropdown Menu */
+    div[data-baseweb="menu"] {
+        background-color: $surface !important;
+        border: 1px solid $border !important;
+    }
+
+    div[data-baseweb="menu"] ul {
+        background-color: $surface !important;
+    }
+
+    div[data-baseweb="menu"] li {
+        background-color: $surface !important;
+        color: $input_text !important;
+        padding: 0.75rem !important;
+        font-weight: 500 !important;
+    }
+
+    div[data-baseweb="menu"] li:hover {
+        background-color: $surface_hover !important;
+        color: $input_text !important;
+    }
+
+    div[data-baseweb="menu"] span {
+        color: $input_text !important;
+    }
+
+    /* File Uploader Text */
+    .stFileUploader label {
+        color: $input_text !important;
+        font-weight: 600 !important;
+        font-size: 1rem !important;
+    }
+
+    .stFileUploader div, .stFileUploader section > div {
+        color: $input_text !important;
+        font-weight: 500 !important;
+    }
+
+    .stFileUploader span {
+        color: $input_text !important;
+        font-weight: 400 !important;
+    }
+
+    .stFileUploader *, .stFileUploader small {
+        color: $input_text !important;
+    }
+
+    /* Uploaded File Display */
+    .stFileUploader > div > div {
+        background: $uploaded_file !important;
+        border: 1px solid $border_subtle !important;
+        border-radius: 6px !important;
+        color: $input_text !important;
+        padding: 0.75rem !important;
+    }
+
+    /* Stubborn white backgrounds */
+    div[data-testid="stFileUploader"], div[data-testid="stFileUploader"] > div {
+        background-color: $surface !important;
+    }
+
+    div[data-testid="stFileUploader"] section {
+        background-color: $surface !important;
+        border: 2px dashed $border_dashed !important;
+        padding: 1rem !important;
+    }
+
+    div[data-testid="stFileUploader"] section > div {
+        background-color: transparent !important;
+    }
+
+    .uploadedFile {
+        background-color: $surface !important;
+        border: 1px solid $border !important;
+        padding: 0.75rem !important;
+    }
+
+    .stApp > div > div > div > div {
+        background-color: transparent !important;
+    }
+
+    div[style*="background-color: rgb(255, 255, 255)"],
+    div[style*="background: rgb(255, 255, 255)"],
+    .stFileUploader > div > div > div {
+        background-color: $surface !important;
+    }
+""")
+}
+
+HEX_COLOR = re.compile(r"^#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})$")
+SAFE_VALUE = re.compile(r"^[#\w\s().,%-]+$")  # CSS colors, nothing that could close a rule
+GLOW_OPACITIES = (10, 20, 30, 40, 50)
+_STRINGS = re.compile(r"(\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*')")
+_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+
+def _rgba(hex_color, opacity):
+    """#rrggbb (or #rgb) at an opacity in percent"""
+    digits = hex_color.lstrip('#')
+    if len(digits) == 3:
+        digits = ''.join(c * 2 for c in digits)
+    red, green, blue = (int(digits[i:i + 2], 16) for i in (0, 2, 4))
+    return f"rgba({red},{green},{blue},{opacity / 100:g})"
+
+def minify_css(css):
+    """Strip comments and whitespace outside quoted strings"""
+    parts = _STRINGS.split(css)
+    for i in range(0, len(parts), 2):  # Even parts are outside strings
+        text = re.sub(r"/\*.*?\*/", "", parts[i], flags=re.S)
+        text = re.sub(r"\s+", " ", text)
+        text = re.sub(r"\s*([{};:,>])\s*", r"\1", text)
+        text = re.sub(r"\s+!important", "!important", text)
+        parts[i] = text.replace(";}", "}")
+    return "".join(parts).strip()
+
+def dedupe_css(css):
+    """
+    Drop declarations a later rule with the same selector overrides
+
+    Only declarations that can never apply are removed (same selector and
+    property later on, with at least the same importance), so the cascade
+    is unchanged; rules left empty disappear.
+    """
+    rules = [(selector, body.split(';')) for selector, body in _RULE.findall(css)]
+    winners = {}  # (selector, property) -> last declaration is !important
+    kept = []
+    for selector, declarations in reversed(rules):
+        body = []
+        for declaration in reversed(declarations):
+            prop = declaration.split(':', 1)[0]
+            important = declaration.endswith('!important')
+            later_important = winners.get((selector, prop))
+            if later_important is not None and (later_important or not important):
+                continue
+            winners[(selector, prop)] = important or bool(later_important)
+            body.append(declaration)
+        if body:
+            kept.append(f"{selector}{{{';'.join(reversed(body))}}}")
+    return "".join(reversed(kept))
+
+@lru_cache(maxsize=32)
+def _compile_css(palette_items):
+    """Minified <style> block for a palette (memoized: built once per process per palette)"""
+    palette = dict(palette_items)
+    values = dict(palette, **{f"primary_{o}": _rgba(palette['primary'], o) for o in GLOW_OPACITIES})
+    css = BASE_CSS.substitute(values) + SCHEME_CSS[palette['scheme']].substitute(values)
+    return f"<style>{dedupe_css(minify_css(css))}</style>"
+
+def create_custom_theme(colors, base='light'):
+    """
+    Create a custom theme with provided color scheme
+
+    Args:
+        colors (dict): ThemeConfig keys to override, e.g. {'primary': '#0ea5e9'}
+        base (str): 'light' or 'dark' palette to start from (and its extra rules)
+
+    Returns:
+        str: Minified <style> block for st.markdown (memoized per palette)
+    """
+    palette = dict(ThemeConfig.DARK_COLORS if base == 'dark' else ThemeConfig.LIGHT_COLORS)
+    palette.update(colors)
+    unknown = set(palette) - set(ThemeConfig.LIGHT_COLORS)
+    if unknown:
+        raise ValueError(f"Unknown theme colors: {', '.join(sorted(unknown))}")
+    if palette['scheme'] not in SCHEME_CSS:
+        raise ValueError(f"Unknown color scheme: {palette['scheme']}")
+    if not HEX_COLOR.match(palette['primary']):
+        raise ValueError("The primary color must be a hex color such as #8b5cf6")
+    for key, value in palette.items():
+        if not SAFE_VALUE.match(str(value)):
+            raise ValueError(f"Invalid CSS color for {key}: {value!r}")
+    return _compile_css(tuple(sorted(palette.items())))
+
 def get_dark_theme_css():
     """Return CSS for dark theme - Clean Matte Black & Grey"""
-    return """
-        <style>
-            /* Hide Streamlit branding */
-            #MainMenu {visibility: hidden;}
-            footer {visibility: hidden;}
-            header {visibility: hidden;}
-            
-            /* Nuclear simple approach - ADD THIS */
-            html, body, #root, .stApp {
-                background-color: #1a1a1a !important;
-            }
-            
-            /* Remove top padding */
-            .main > div {
-                padding-top: 0rem;
-            }
-            /* Hide header and decorator completely */
-            header[data-testid="stHeader"] {
-                display: none !important;
-            }
-
-            div[data-testid="stDecoration"] {
-                display: none !important;
-            }
-
-            /* Remove top padding */
-            .main .block-container {
-                padding-top: 0rem !important;
-            }
-            
-            /* Main App Background - Matte Black */
-            .stApp {
-                background-color: #1a1a1a !important;
-                color: #e5e5e5 !important;
-            }
-
-            /* Main App Background - Matte Black */
-            .stApp {
-                background-color: #1a1a1a !important;
-                color: #e5e5e5 !important;
-            }
-            
-            /* Sidebar - Matte Dark Grey */
-            .stSidebar > div {
-                background-color: #2d2d2d !important;
-                color: #e5e5e5 !important;
-            }
-            
-            /* Remove Unwanted Container Backgrounds */
-            .stContainer, .element-container, .block-container {
-                background-color: transparent !important;
-                border: none !important;
-            }
-            
-            /* Text Elements */
-            .stMarkdown, .stText, p, span, div, label {
-                color: #e5e5e5 !important;
-            }
-            
-            /* Headers */
-            h1, h2, h3, h4, h5, h6 {
-                color: #ffffff !important;
-                font-weight: 600 !important;
-            }
-            
-            /* Input Fields - Match Light Mode Size */
-            .stTextInput > div > div > input {
-                background-color: #404040 !important;
-                color: #ffffff !important;
-                border: 1px solid #555555 !important;
-                border-radius: 6px !important;
-                padding: 0.5rem 0.75rem !important;
-                min-height: 2.5rem !important;
-                height: 2.5rem !important;
-            }
-            
-            .stTextInput > div > div > input:focus {
-                border-color: #8b5cf6 !important;
-                box-shadow: 0 0 0 2px rgba(139, 92, 246, 0.2) !important;
-            }
-            
-            .stTextInput > div > div > input::placeholder {
-                color: #aaaaaa !important;
-            }
-            
-            /* Fix Selectbox - Complete Dark Theme Solution */
-            .stSelectbox > div > div > div {
-                background-color: #404040 !important;
-                color: #ffffff !important;
-                border: 1px solid #555555 !important;
-                border-radius: 6px !important;
-                min-height: 2.5rem !important;
-                height: 2.5rem !important;
-                padding: 0.5rem 0.75rem !important;
-            }
-
-            /* Force Selected Value Text Color */
-            div[data-baseweb="select"] span {
-                color: #ffffff !important;
-            }
-
-            /* Force Input Text Color */
-            div[data-baseweb="select"] input {
-                color: #ffffff !important;
-            }
-
-            /* Selected Value Container */
-            div[data-baseweb="select"] > div > div {
-                color: #ffffff !important;
-                background-color: #404040 !important;
-            }
-
-            /* Dropdown Menu Container */
-            div[data-baseweb="menu"] {
-                background-color: #404040 !important;
-                border: 1px solid #555555 !important;
-            }
-
-            /* Dropdown Menu List */
-            div[data-baseweb="menu"] ul {
-                background-color: #404040 !important;
-            }
-
-            /* Individual Dropdown Options */
-            div[data-baseweb="menu"] li {
-                background-color: #404040 !important;
-                color: #ffffff !important;
-                padding: 0.75rem !important;
-                font-weight: 500 !important;
-            }
-
-            /* Dropdown Options Hover Effect */
-            div[data-baseweb="menu"] li:hover {
-                background-color: #555555 !important;
-                color: #ffffff !important;
-            }
-
-            /* Force Option Text Color */
-            div[data-baseweb="menu"] span {
-                color: #ffffff !important;
-            }
-            
-            /* File Uploader - Match Light Mode Size */
-            .stFileUploader {
-                background: rgba(45, 45, 45, 0.95) !important;
-                border: 1px dashed #666666 !important;
-                border-radius: 8px !important;
-                padding: 1rem !important;
-                backdrop-filter: blur(10px) !important;
-                box-shadow: none !important;
-            }
-
-            .stFileUploader:hover {
-                border-color: rgba(139, 92, 246, 0.5) !important;
-                background: rgba(55, 55, 55, 0.95) !important;
-                transform: none !important;
-                transition: all 0.3s ease !important;
-            }
-
-            /* File Uploader Text */
-            .stFileUploader label {
-                color: #ffffff !important;
-                font-weight: 600 !important;
-                font-size: 1rem !important;
-            }
-
-            .stFileUploader div {
-                color: #ffffff !important;
-                font-weight: 500 !important;
-            }
-
-            /* Drag and Drop Text */
-            .stFileUploader section > div {
-                color: #ffffff !important;
-                font-weight: 500 !important;
-            }
-
-            /* File Info Text */
-            .stFileUploader span {
-                color: #ffffff !important;
-                font-weight: 400 !important;
-            }
-
-            /* File Size and Type Info */
-            .stFileUploader small {
-                color: #ffffff !important;
-            }
-
-            /* Any remaining blue text */
-            .stFileUploader * {
-                color: #ffffff !important;
-            }
-
-            /* Browse Files Button - Match Light Mode Size */
-            .stFileUploader button {
-                background: linear-gradient(135deg, #8b5cf6 0%, #7c3aed 100%) !important;
-                color: #ffffff !important;
-                border: none !important;
-                border-radius: 6px !important;
-                padding: 0.5rem 1rem !important;
-                font-weight: 600 !important;
-                font-size: 0.875rem !important;
-                transition: all 0.2s ease !important;
-                min-height: 2.5rem !important;
-                height: 2.5rem !important;
-            }
-
-            .stFileUploader button:hover {
-                transform: translateY(-1px) !important;
-                box-shadow: 0 4px 12px rgba(139, 92, 246, 0.4) !important;
-            }
-
-            /* Uploaded File Display - Match Light Mode */
-            .stFileUploader > div > div {
-                background: rgba(35, 35, 35, 0.9) !important;
-                border: 1px solid rgba(255, 255, 255, 0.1) !important;
-                border-radius: 6px !important;
-                color: #ffffff !important;
-                padding: 0.75rem !important;
-            }
-            
-            /* Sliders - Purple Accent */
-            .stSlider > div > div > div > div {
-                background-color: #8b5cf6 !important;
-            }
-            
-            /* Primary Button - Match Light Mode Size Exactly */
-            .stButton > button {
-                background: linear-gradient(135deg, #8b5cf6 0%, #7c3aed 100%) !important;
-                color: white !important;
-                border: none !important;
-                border-radius: 6px !important;
-                padding: 0.75rem 1.5rem !important;
-                font-weight: 600 !important;
-                font-size: 0.95rem !important;
-                transition: all 0.2s ease !important;
-                box-shadow: 0 2px 4px rgba(139, 92, 246, 0.3) !important;
-                min-height: 3rem !important;
-                height: 3rem !important;
-                width: 100% !important;
-                white-space: normal !important;
-                text-align: center !important;
-            }
-
-            .stButton > button:hover {
-                transform: translateY(-1px) !important;
-                box-shadow: 0 4px 8px rgba(139, 92, 246, 0.4) !important;
-                background: linear-gradient(135deg, #7c3aed 0%, #6d28d9 100%) !important;
-            }
-
-            /* Update Summary Button - Force Purple Styling */
-            button[kind="primary"], 
-            button[data-testid*="update"], 
-            button[title*="Update"], 
-            .stDownloadButton > button {
-                background: linear-gradient(135deg, #8b5cf6 0%, #7c3aed 100%) !important;
-                color: white !important;
-                border: none !important;
-                border-radius: 6px !important;
-                padding: 0.75rem 1.5rem !important;
-                font-weight: 600 !important;
-                font-size: 0.95rem !important;
-                transition: all 0.2s ease !important;
-                box-shadow: 0 2px 4px rgba(139, 92, 246, 0.3) !important;
-                min-height: 3rem !important;
-                height: 3rem !important;
-            }
-
-            button[kind="primary"]:hover, 
-            button[data-testid*="update"]:hover, 
-            button[title*="Update"]:hover,
-            .stDownloadButton > button:hover {
-                transform: translateY(-1px) !important;
-                box-shadow: 0 4px 8px rgba(139, 92, 246, 0.4) !important;
-                background: linear-gradient(135deg, #7c3aed 0%, #6d28d9 100%) !important;
-            }
-
-            /* JSON Display - Match Light Mode Size */
-            .stJson {
-                background-color: #404040 !important;
-                border: 1px solid #555555 !important;
-                border-radius: 8px !important;
-                padding: 1rem !important;
-                box-shadow: 0 2px 8px rgba(0, 0, 0, 0.15) !important;
-            }
-
-            /* JSON Content Text Color */
-            .stJson pre {
-                color: #ffffff !important;
-            }
-
-            /* Expanders - Match Light Mode Size */
-            div[data-testid="stExpander"] details summary {
-                background: rgba(45, 45, 45, 0.95) !important;
-                color: #ffffff !important;
-                border: 1px solid rgba(255, 255, 255, 0.1) !important;
-                border-radius: 8px 8px 0 0 !important;
-                padding: 1rem !important;
-                font-weight: 600 !important;
-                box-shadow: 0 2px 8px rgba(0, 0, 0, 0.15) !important;
-                backdrop-filter: blur(10px) !important;
-            }
-
-            div[data-testid="stExpander"] details summary:hover {
-                background: rgba(55, 55, 55, 0.95) !important;
-                border-color: rgba(139, 92, 246, 0.3) !important;
-            }
-
-            div[data-testid="stExpander"] > div > div {
-                background: rgba(40, 40, 40, 0.95) !important;
-                color: #e5e5e5 !important;
-                border: 1px solid rgba(255, 255, 255, 0.1) !important;
-                border-top: none !important;
-                border-radius: 0 0 8px 8px !important;
-                padding: 1rem !important;
-                box-shadow: 0 2px 8px rgba(0, 0, 0, 0.15) !important;
-                backdrop-filter: blur(10px) !important;
-            }
-
-            /* Column Alignment Fix */
-            div[data-testid="column"] {
-                display: flex !important;
-                height: 100% !important;
-            }
-
-            div[data-testid="column"] > div {
-                display: flex !important;
-                flex-direction: column !important;
-                height: 100% !important;
-            }
-
-            div[data-testid="column"] .stButton {
-                flex: 1 !important;
-                display: flex !important;
-            }
-            
-            /* Progress Bar */
-            .stProgress > div > div > div {
-                background: linear-gradient(90deg, #8b5cf6, #7c3aed) !important;
-            }
-            
-            /* Alerts & Messages - Match Light Mode */
-            .stAlert {
-                background-color: #404040 !important;
-                color: #ffffff !important;
-                border: 1px solid #555555 !important;
-                border-radius: 6px !important;
-                padding: 1rem !important;
-            }
-            
-            /* Sidebar Specific Elements */
-            .stSidebar .stSelectbox > div > div > div {
-                background-color: #404040 !important;
-                color: #ffffff !important;
-                border: 1px solid #555555 !important;
-                min-height: 2.5rem !important;
-                height: 2.5rem !important;
-            }
-            
-            .stSidebar .stSlider > div > div > div > div {
-                background-color: #8b5cf6 !important;
-            }
-            
-            .stSidebar h1, .stSidebar h2, .stSidebar h3 {
-                color: #ffffff !important;
-            }
-            
-            .stSidebar label {
-                color: #e5e5e5 !important;
-            }
-            
-            /* Caption Text */
-            .stCaption {
-                color: #aaaaaa !important;
-            }
-            
-            /* Fix Toggle Switch */
-            .stCheckbox > label {
-                color: #e5e5e5 !important;
-            }
-            
-            /* AGGRESSIVE FIXES FOR STUBBORN WHITE BACKGROUNDS */
-            
-            /* Fix File Uploader Inner Container */
-            div[data-testid="stFileUploader"] {
-                background-color: #404040 !important;
-            }
-            
-            div[data-testid="stFileUploader"] > div {
-                background-color: #404040 !important;
-            }
-            
-            div[data-testid="stFileUploader"] section {
-                background-color: #404040 !important;
-                border: 2px dashed #666666 !important;
-                padding: 1rem !important;
-            }
-            
-            div[data-testid="stFileUploader"] section > div {
-                background-color: transparent !important;
-            }
-            
-            /* File Upload Drop Area */
-            .uploadedFile {
-                background-color: #404040 !important;
-                border: 1px solid #555555 !important;
-                padding: 0.75rem !important;
-            }
-            
-            /* Fix Any Remaining White Containers */
-            .stApp > div > div > div > div {
-                background-color: transparent !important;
-            }
-            
-            /* Nuclear option for any white divs */
-            div[style*="background-color: rgb(255, 255, 255)"] {
-                background-color: #404040 !important;
-            }
-            
-            div[style*="background: rgb(255, 255, 255)"] {
-                background-color: #404040 !important;
-            }
-            
-            /* Fix specific file uploader elements */
-            .stFileUploader > div > div > div {
-                background-color: #404040 !important;
-            }
-            
-            .stFileUploader button {
-                background: linear-gradient(135deg, #8b5cf6 0%, #7c3aed 100%) !important;
-                color: #ffffff !important;
-                border: none !important;
-                min-height: 2.5rem !important;
-                height: 2.5rem !important;
-                padding: 0.5rem 1rem !important;
-            }
-
-            /* Match spacing between elements */
-            .element-container {
-                margin-bottom: 1rem !important;
-            }
-
-            /* Ensure consistent component heights */
-            .stTextInput, .stSelectbox, .stFileUploader {
-                min-height: auto !important;
-            }
-        </style>
-    """
+    return create_custom_theme({}, base='dark')
 
 def get_light_theme_css():
     """Return CSS for light theme - Clean & Professional"""
-    return """
-        <style>
-             /* Hide Streamlit branding - ADD THIS SECTION */
-            #MainMenu {visibility: hidden;}
-            footer {visibility: hidden;}
-            header {visibility: hidden;}
-            
-            /* Remove top padding */
-            .main > div {
-                padding-top: 0rem;
-            }
-            
-            /* Main App Background - Matte Black */
-            .stApp {
-                background-color: #1a1a1a !important;
-                color: #e5e5e5 !important;
-            }
-
-            /* Main App Background - Clean White */
-            .stApp {
-                background: linear-gradient(135deg, #ffffff 0%, #f8fafc 100%) !important;
-                color: #334155 !important;
-            }
-            
-            /* Sidebar - Subtle Light */
-            .stSidebar > div {
-                background-color: rgba(248, 250, 252, 0.95) !important;
-                border-right: 1px solid #e2e8f0 !important;
-            }
-            
-            /* Remove Box Backgrounds - Keep It Clean */
-            .stContainer, .element-container, .block-container {
-                background-color: transparent !important;
-                border: none !important;
-            }
-            
-            /* Text Elements - Proper Contrast */
-            .stMarkdown, .stText, p, span, div, label {
-                color: #334155 !important;
-            }
-            
-            /* Headers - Clean Dark */
-            h1, h2, h3, h4, h5, h6 {
-                color: #1e293b !important;
-                font-weight: 600 !important;
-            }
-            
-            /* Input Fields - Consistent Size */
-            .stTextInput > div > div > input {
-                background-color: rgba(255, 255, 255, 0.8) !important;
-                color: #334155 !important;
-                border: 1px solid #cbd5e1 !important;
-                border-radius: 6px !important;
-                backdrop-filter: blur(10px) !important;
-                padding: 0.5rem 0.75rem !important;
-                min-height: 2.5rem !important;
-                height: 2.5rem !important;
-            }
-            
-            .stTextInput > div > div > input:focus {
-                border-color: #8b5cf6 !important;
-                box-shadow: 0 0 0 2px rgba(139, 92, 246, 0.1) !important;
-            }
-            
-            .stTextInput > div > div > input::placeholder {
-                color: #64748b !important;
-            }
-            
-            /* File Uploader - Consistent Size */
-            .stFileUploader {
-                background-color: rgba(255, 255, 255, 0.6) !important;
-                border: 1px dashed #94a3b8 !important;
-                border-radius: 8px !important;
-                backdrop-filter: blur(10px) !important;
-                padding: 1rem !important;
-            }
-            
-            .stFileUploader:hover {
-                border-color: #8b5cf6 !important;
-                background-color: rgba(139, 92, 246, 0.02) !important;
-            }
-            
-            /* Fix Selectbox - All Parts */
-            .stSelectbox > div > div > div {
-                background-color: rgba(255, 255, 255, 0.8) !important;
-                color: #334155 !important;
-                border: 1px solid #cbd5e1 !important;
-                border-radius: 6px !important;
-                min-height: 2.5rem !important;
-                height: 2.5rem !important;
-                padding: 0.5rem 0.75rem !important;
-            }
-
-            /* Force Selected Value Text Color */
-            div[data-baseweb="select"] span {
-                color: #334155 !important;
-            }
-
-            /* Force Input Text Color */
-            div[data-baseweb="select"] input {
-                color: #334155 !important;
-            }
-
-            /* Selected Value Container */
-            div[data-baseweb="select"] > div > div {
-                color: #334155 !important;
-            }
-            
-            /* Primary Button - Consistent Size */
-            .stButton > button {
-                background: linear-gradient(135deg, #8b5cf6 0%, #7c3aed 100%) !important;
-                color: white !important;
-                border: none !important;
-                border-radius: 6px !important;
-                padding: 0.75rem 1.5rem !important;
-                font-weight: 600 !important;
-                font-size: 0.95rem !important;
-                transition: all 0.2s ease !important;
-                box-shadow: 0 2px 4px rgba(139, 92, 246, 0.2) !important;
-                min-height: 3rem !important;
-                height: 3rem !important;
-                width: 100% !important;
-                white-space: normal !important;
-                text-align: center !important;
-            }
-            
-            .stButton > button:hover {
-                transform: translateY(-1px) !important;
-                box-shadow: 0 4px 12px rgba(139, 92, 246, 0.3) !important;
-                background: linear-gradient(135deg, #7c3aed 0%, #6d28d9 100%) !important;
-            }
-
-            /* Update Summary Button - Force Purple Styling */
-            button[kind="primary"], 
-            button[data-testid*="update"], 
-            button[title*="Update"], 
-            .stDownloadButton > button {
-                background: linear-gradient(135deg, #8b5cf6 0%, #7c3aed 100%) !important;
-                color: white !important;
-                border: none !important;
-                border-radius: 6px !important;
-                padding: 0.75rem 1.5rem !important;
-                font-weight: 600 !important;
-                font-size: 0.95rem !important;
-                transition: all 0.2s ease !important;
-                box-shadow: 0 2px 4px rgba(139, 92, 246, 0.3) !important;
-                min-height: 3rem !important;
-                height: 3rem !important;
-            }
-
-            button[kind="primary"]:hover, 
-            button[data-testid*="update"]:hover, 
-            button[title*="Update"]:hover,
-            .stDownloadButton > button:hover {
-                transform: translateY(-1px) !important;
-                box-shadow: 0 4px 8px rgba(139, 92, 246, 0.4) !important;
-                background: linear-gradient(135deg, #7c3aed 0%, #6d28d9 100%) !important;
-            }
-            
-            /* JSON Display - Consistent Size */
-            .stJson {
-                background-color: rgba(248, 250, 252, 0.8) !important;
-                border: 1px solid #e2e8f0 !important;
-                border-radius: 8px !important;
-                backdrop-filter: blur(10px) !important;
-                padding: 1rem !important;
-                box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1) !important;
-            }
-            
-            /* Expanders - Consistent Size */
-            div[data-testid="stExpander"] details summary {
-                background: rgba(248, 250, 252, 0.8) !important;
-                color: #334155 !important;
-                border: 1px solid #e2e8f0 !important;
-                border-radius: 8px 8px 0 0 !important;
-                padding: 1rem !important;
-                font-weight: 600 !important;
-                box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1) !important;
-                backdrop-filter: blur(10px) !important;
-            }
-
-            div[data-testid="stExpander"] details summary:hover {
-                background: rgba(228, 232, 237, 0.8) !important;
-                border-color: rgba(139, 92, 246, 0.3) !important;
-            }
-
-            div[data-testid="stExpander"] > div > div {
-                background: rgba(255, 255, 255, 0.6) !important;
-                color: #334155 !important;
-                border: 1px solid #e2e8f0 !important;
-                border-top: none !important;
-                border-radius: 0 0 8px 8px !important;
-                padding: 1rem !important;
-                box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1) !important;
-                backdrop-filter: blur(10px) !important;
-            }
-
-            /* Browse Files Button - Consistent Size */
-            .stFileUploader button {
-                background: linear-gradient(135deg, #8b5cf6 0%, #7c3aed 100%) !important;
-                color: #ffffff !important;
-                border: none !important;
-                border-radius: 6px !important;
-                padding: 0.5rem 1rem !important;
-                font-weight: 600 !important;
-                font-size: 0.875rem !important;
-                transition: all 0.2s ease !important;
-                min-height: 2.5rem !important;
-                height: 2.5rem !important;
-            }
-
-            /* Column Alignment Fix */
-            div[data-testid="column"] {
-                display: flex !important;
-                height: 100% !important;
-            }
-
-            div[data-testid="column"] > div {
-                display: flex !important;
-                flex-direction: column !important;
-                height: 100% !important;
-            }
-
-            div[data-testid="column"] .stButton {
-                flex: 1 !important;
-                display: flex !important;
-            }
-            
-            /* Progress Bar */
-            .stProgress > div > div > div {
-                background: linear-gradient(90deg, #8b5cf6, #7c3aed) !important;
-            }
-            
-            /* Alerts & Messages - Consistent Size */
-            .stAlert {
-                background-color: rgba(255, 255, 255, 0.8) !important;
-                border: 1px solid #e2e8f0 !important;
-                border-radius: 6px !important;
-                backdrop-filter: blur(10px) !important;
-                padding: 1rem !important;
-            }
-            
-            /* Sidebar Elements */
-            .stSidebar .stSlider > div > div > div > div {
-                background-color: #8b5cf6 !important;
-            }
-            
-            .stSidebar .stSelectbox > div > div {
-                background-color: rgba(255, 255, 255, 0.8) !important;
-                border: 1px solid #e2e8f0 !important;
-                min-height: 2.5rem !important;
-                height: 2.5rem !important;
-            }
-            
-            .stSidebar h1, .stSidebar h2, .stSidebar h3 {
-                color: #1e293b !important;
-            }
-            
-            /* Remove Unnecessary Borders */
-            .main .block-container {
-                padding-top: 2rem !important;
-            }
-            
-            /* Captions and Small Text */
-            .stCaption {
-                color: #64748b !important;
-            }
-
-            /* Match spacing between elements */
-            .element-container {
-                margin-bottom: 1rem !important;
-            }
-
-            /* Ensure consistent component heights */
-            .stTextInput, .stSelectbox, .stFileUploader {
-                min-height: auto !important;
-            }
-        </style>
-    """
+    return create_custom_theme({}, base='light')
+
+def theme_payload_bytes():
+    """Bytes of theme CSS sent to the browser on every rerun, per built-in theme"""
+    return {
+        'dark': len(get_dark_theme_css().encode('utf-8')),
+        'light': len(get_light_theme_css().encode('utf-8'))
+    }
 
 def apply_theme():
     """Apply the selected theme based on session state"""
+    # The CSS is generated once per process; each rerun only re-sends the cached string
     if st.session_state.dark_mode:
         st.markdown(get_dark_theme_css(), unsafe_allow_html=True)
     else:
@@ -755,41 +641,9 @@ def setup_theme_system():
     render_theme_toggle()
     apply_theme()
 
-# Additional utility functions for future enhancements
-class ThemeConfig:
-    """Configuration class for theme customization"""
-    
-    DARK_COLORS = {
-        'primary': '#8b5cf6',
-        'primary_hover': '#7c3aed',
-        'background': '#1e1e1e',
-        'sidebar': '#2a2a2a',
-        'surface': '#404040',
-        'text': '#ffffff',
-        'text_secondary': '#aaaaaa',
-        'border': '#555555'
-    }
-    
-    LIGHT_COLORS = {
-        'primary': '#8b5cf6',
-        'primary_hover': '#7c3aed',
-        'background': '#ffffff',
-        'sidebar': '#f8f9fa',
-        'surface': '#f8f9fa',
-        'text': '#333333',
-        'text_secondary': '#888888',
-        'border': '#ddd'
-    }
-
-def create_custom_theme(colors):
-    """Create a custom theme with provided color scheme"""
-    # This function can be extended to create themes programmatically
-    # using the provided color dictionary
-    pass
-
 def get_current_theme_colors():
     """Get current theme color scheme"""
     if st.session_state.get('dark_mode', False):
         return ThemeConfig.DARK_COLORS
     else:
-        return ThemeConfig.LIGHT_COLORS
\ No newline at end of file
+        return ThemeConfig.LIGHT_COLORS
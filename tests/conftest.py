@@ -0,0 +1,56 @@
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+# The app modules import each other as top-level modules from groq/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "groq"))
+
+# Keep caches and stored indexes out of the user's cache directory, and skip
+# the embedding model warm-up (tests use hashing embeddings)
+os.environ["ACADEMIC_ASSISTANT_CACHE_DIR"] = tempfile.mkdtemp(prefix="academic-assistant-tests-")
+os.environ["EMBEDDING_WARMUP"] = "0"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Start a local Groq API stub; call the fixture with its settings
+
+    Returns the base URL to give ``GroqClient`` and a function reading the
+    stub's request counters.
+    """
+    import httpx
+    import uvicorn
+
+    from stub_llm_server import create_stub_app
+
+    servers = []
+
+    def start(**settings):
+        port = _free_port()
+        server = uvicorn.Server(uvicorn.Config(create_stub_app(**settings), host="127.0.0.1", port=port,
+                                               log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        deadline = time.monotonic() + 10
+        while not server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Stub server did not start")
+            time.sleep(0.02)
+        servers.append(server)
+        root = f"http://127.0.0.1:{port}"
+        return f"{root}/openai/v1", lambda: httpx.get(f"{root}/stats").json()
+
+    yield start
+    for server in servers:
+        server.should_exit = True
@@ -0,0 +1,41 @@
+from answer_cache import SemanticAnswerCache, specific_tokens
+
+NAMESPACE = SemanticAnswerCache.namespace("set", "model", 0.2, 512)
+# Embeddings of near-identical questions: the cosine similarity is ~0.999
+VECTOR = [1.0, 0.2, 0.1]
+NEAR_VECTOR = [1.0, 0.21, 0.1]
+
+
+def cached(question):
+    cache = SemanticAnswerCache()
+    cache.store(NAMESPACE, question, VECTOR, {"answer": question})
+    return cache
+
+
+def test_specific_tokens_are_numbers_and_identifiers():
+    assert specific_tokens("What does Theorem 3.1 say about x_i in exercise 4a?") == ("3.1", "4a", "x_i")
+    assert specific_tokens("Why is DNA a double helix?") == ("dna",)
+    assert specific_tokens("What is entropy?") == ()
+
+
+def test_semantic_hit_for_a_rephrased_question():
+    cache = cached("What does theorem 3.1 state?")
+
+    hit = cache.lookup(NAMESPACE, "What is stated by theorem 3.1?", NEAR_VECTOR)
+
+    assert hit["match"] == "semantic"
+    assert hit["payload"] == {"answer": "What does theorem 3.1 state?"}
+
+
+def test_different_numbers_or_identifiers_are_never_a_semantic_hit():
+    for stored, asked in [
+        ("What does theorem 3.1 state?", "What does theorem 3.2 state?"),
+        ("Solve exercise 4a", "Solve exercise 4b"),
+        ("Explain chapter 2", "Explain chapter 2 and 3"),
+        ("What is x_1?", "What is x_2?"),
+    ]:
+        cache = cached(stored)
+
+        assert cache.lookup(NAMESPACE, asked, NEAR_VECTOR) is None
+        assert cache.lookup(NAMESPACE, stored.upper(), NEAR_VECTOR)["match"] == "exact"
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,89 @@
+import gc
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import STUB_ANSWER, create_app
+from benchmark import HashingEmbeddings
+from shared_models import get_index_store
+
+NOTES = ("notes.txt", b"Photosynthesis turns light into chemical energy in the chloroplast. " * 200, "text/plain")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # The default factory picks the stub model from the environment, so no Groq key is needed
+    monkeypatch.setenv("ACADEMIC_ASSISTANT_LLM", "stub")
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    with TestClient(create_app(embeddings=HashingEmbeddings())) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def document_set(client):
+    response = client.post("/ingest", files=[("files", NOTES)])
+    assert response.status_code == 200
+    return response.json()["document_set"]
+
+
+def test_ingest_reuses_a_document_set(client, document_set):
+    again = client.post("/ingest", files=[("files", NOTES)]).json()
+
+    assert again == {"document_set": document_set, "status": "shared", "errors": []}
+    assert client.get("/health").json() == {"status": "ok", "document_sets": 1}
+
+
+def test_ask_answers_with_the_stub_model(client, document_set):
+    question = {"document_set": document_set, "question": "Where does photosynthesis happen?"}
+
+    first = client.post("/ask", json=question).json()
+    second = client.post("/ask", json=question).json()
+
+    assert first["answer"] == STUB_ANSWER
+    assert first["source_document"] == "notes.txt"
+    assert not first["cached"]
+    assert second["cached"]
+
+
+def test_ask_stream_sends_tokens_then_the_result(client, document_set):
+    question = {"document_set": document_set, "question": "What does light turn into?"}
+
+    with client.stream("POST", "/ask/stream", json=question) as response:
+        body = response.read().decode()
+
+    events = [line[len("event: "):].strip() for line in body.splitlines() if line.startswith("event: ")]
+    data = [line[len("data: "):] for line in body.splitlines() if line.startswith("data: ")]
+    assert set(events[:-1]) == {"token"}
+    assert events[-1] == "result"
+    assert json.loads(data[-1])["answer"] == STUB_ANSWER
+
+
+def test_learning_tools_use_the_stub_model(client, document_set):
+    settings = {"document_set": document_set}
+
+    assert client.post("/summarize", json=settings).json()["summary"] == STUB_ANSWER
+    assert client.post("/mcqs", json=settings).json() == {"mcqs": STUB_ANSWER}
+    assert client.post("/explain", json=settings).json() == {"explanation": STUB_ANSWER}
+
+    pack = client.post("/study-pack", json=settings).json()
+    assert pack["cached"]
+    assert (pack["summary"], pack["mcqs"], pack["explanation"]) == (STUB_ANSWER,) * 3
+
+
+def test_unknown_document_set_is_rejected(client):
+    response = client.post("/ask", json={"document_set": "unknown", "question": "Anything?"})
+
+    assert response.status_code == 404
+
+
+def test_requests_release_the_shared_index(client, document_set):
+    client.post("/ask", json={"document_set": document_set, "question": "What is a chloroplast?"})
+    gc.collect()
+
+    assert get_index_store().stats()["sessions"] == 0
+    assert get_index_store().evict_idle(idle_seconds=0) >= 1
+
+    # An evicted set is mapped again by the next request
+    answer = client.post("/ask", json={"document_set": document_set, "question": "What is light?"}).json()
+    assert answer["answer"] == STUB_ANSWER
@@ -0,0 +1,53 @@
+from langchain_core.documents import Document
+
+from context_packer import ContextPacker
+from model_limits import MIN_PROMPT_TOKENS, PROMPT_SAFETY_TOKENS, context_window, estimate_tokens, prompt_budget
+
+# Formula-heavy text: a Llama 3 tokenizer splits it into 26 pieces, one per 1.5 characters
+DENSE = "x_{12} = 3.14159 * (a_3 + b^2) / 1024; "
+DENSE_PIECES = 26
+PROSE = "The chloroplast turns light into chemical energy during photosynthesis. "
+
+
+def dense_chunk(page, repeats=40):
+    return Document(page_content=DENSE * repeats, metadata={"source": "formulas.pdf", "page": page})
+
+
+def test_dense_text_is_not_underestimated():
+    text = DENSE * 50
+
+    # Repeated, each trailing space joins the next "x": one piece fewer per copy
+    assert estimate_tokens(text) > (DENSE_PIECES - 1) * 50 > len(text) // 3
+    # Prose keeps the plain character ratio
+    assert estimate_tokens(PROSE * 50) == len(PROSE * 50) // 3 + 1
+
+
+def test_dense_chunks_are_packed_close_to_the_budget_without_exceeding_it():
+    budget = 1000
+    documents = [dense_chunk(page) for page in range(10)]
+
+    packed, report = ContextPacker(budget).pack(documents)
+
+    packed_tokens = sum(estimate_tokens(d.page_content) for d in packed) + len(packed) - 1
+    assert report["tokens_out"] == packed_tokens
+    assert budget - estimate_tokens(documents[0].page_content) < packed_tokens <= budget
+    assert report["dropped"] == len(documents) - len(packed) > 0
+
+
+def test_oversized_dense_chunk_is_cut_to_the_budget():
+    budget = 300
+
+    packed, report = ContextPacker(budget).pack([dense_chunk(0, repeats=200)])
+
+    assert len(packed) == 1
+    assert budget - 10 <= estimate_tokens(packed[0].page_content) == report["tokens_out"] <= budget
+    assert DENSE * 200 != packed[0].page_content
+    assert (DENSE * 200).startswith(packed[0].page_content)
+
+
+def test_prompt_budget_keeps_a_safety_margin():
+    window = context_window("llama3-8b-8192")
+
+    assert prompt_budget("llama3-8b-8192", 1024) == window - 1024 - 256 - PROMPT_SAFETY_TOKENS
+    # A huge completion request is clamped so a usable prompt still fits
+    assert prompt_budget("llama3-8b-8192", 100000) == MIN_PROMPT_TOKENS
@@ -0,0 +1,40 @@
+import numpy as np
+
+from hybrid_retrieval import BM25Index, tokenize
+
+TEXTS = [
+    "Theorem 3.1 states the Noether result about symmetry.",
+    "Entropy measures the disorder of a system.",
+    "Gradients flow downhill; theorem 3.2 bounds their step size.",
+    "",
+]
+
+
+def test_tokenize_keeps_compound_terms_and_their_parts():
+    assert tokenize("Theorem 3.2 of Euler-Lagrange") == [
+        "theorem", "3.2", "3", "2", "of", "euler-lagrange", "euler", "lagrange"
+    ]
+
+
+def test_search_ranks_exact_terms_first():
+    index = BM25Index(TEXTS)
+
+    assert index.search("theorem 3.2", 2) == [2, 0]
+    assert index.search("unknown words", 3) == []
+
+
+def test_saved_index_is_memory_mapped_and_scores_the_same(tmp_path):
+    built = BM25Index(iter(TEXTS), documents=TEXTS)
+    built.save(str(tmp_path))
+
+    loaded = BM25Index.load(str(tmp_path), documents=TEXTS)
+
+    assert isinstance(loaded.weights, np.memmap)
+    assert loaded.size == built.size == len(TEXTS)
+    for query in ("theorem 3.1", "entropy system", "step size", "missing"):
+        np.testing.assert_array_equal(loaded.scores(query), built.scores(query))
+    assert [loaded.documents[i] for i in loaded.search("entropy", 1)] == [TEXTS[1]]
+
+
+def test_load_without_saved_index_returns_none(tmp_path):
+    assert BM25Index.load(str(tmp_path)) is None
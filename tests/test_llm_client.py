@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_client import GroqClient, LLMRequestError, PooledChatGroq
+
+
+def payload(prompt):
+    return {"model": "stub-model", "messages": [{"role": "user", "content": prompt}]}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+@pytest.fixture
+def make_client():
+    clients = []
+
+    def make(base_url, **settings):
+        client = GroqClient(base_url=base_url, **settings)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_rate_limited_requests_are_retried(stub_server, make_client):
+    base_url, stub_stats = stub_server(latency_seconds=0.01, requests_per_second=5, burst=1)
+    client = make_client(base_url, max_retries=10, backoff_seconds=0.05)
+
+    async def ask_all():
+        return await asyncio.gather(*(client.achat("key", payload(f"question {i}")) for i in range(4)))
+
+    responses = asyncio.run(ask_all())
+
+    assert [r["choices"][0]["message"]["content"] for r in responses] == [
+        f"Stub answer from stub-model: question {i}" for i in range(4)
+    ]
+    assert stub_stats()["rate_limited"] >= 1
+    assert client.stats()["retries"] == stub_stats()["rate_limited"]
+    assert client.stats()["failures"] == 0
+
+
+def test_retries_give_up_after_max_retries(stub_server, make_client):
+    base_url, stub_stats = stub_server(error_rate=1.0)
+    client = make_client(base_url, max_retries=2, backoff_seconds=0.01)
+
+    with pytest.raises(LLMRequestError) as raised:
+        client.chat("key", payload("always fails"))
+
+    assert raised.value.status_code == 503
+    assert stub_stats()["requests"] == 3
+    assert client.stats()["retries"] == 2
+
+
+def test_identical_requests_share_one_upstream_call(stub_server, make_client):
+    base_url, stub_stats = stub_server(latency_seconds=0.5)
+    client = make_client(base_url)
+    results = []
+
+    def ask():
+        results.append(client.chat("key", payload("same question")))
+
+    threads = [threading.Thread(target=ask) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8
+    assert all(result == results[0] for result in results)
+    assert stub_stats()["requests"] == 1
+    assert client.stats()["coalesced"] == 7
+
+    # Different keys are never coalesced
+    client.chat("other key", payload("same question"))
+    assert stub_stats()["requests"] == 2
+
+
+def test_stream_fans_out_to_identical_streams(stub_server, make_client):
+    base_url, stub_stats = stub_server(latency_seconds=0.5)
+    client = make_client(base_url)
+    llm = PooledChatGroq(client=client, groq_api_key="key", model_name="stub-model")
+
+    async def read(delay):
+        await asyncio.sleep(delay)
+        return [chunk.content async for chunk in llm.astream("stream this answer")]
+
+    async def read_both():
+        # The second reader joins mid-stream and gets the chunks it missed replayed
+        return await asyncio.gather(read(0), read(0.2))
+
+    first, second = asyncio.run(read_both())
+
+    assert "".join(first) == "Stub answer from stub-model: stream this answer"
+    assert second == first
+    assert stub_stats()["requests"] == 1
+    assert client.stats()["coalesced"] == 1
+
+
+def test_last_reader_leaving_cancels_upstream_stream(stub_server, make_client):
+    base_url, stub_stats = stub_server(latency_seconds=5)
+    client = make_client(base_url)
+
+    stream = client.stream("key", payload("a long answer nobody finishes reading"))
+    next(stream)
+    stream.close()
+
+    assert wait_for(lambda: client.stats()["in_flight"] == 0)
+    assert wait_for(lambda: stub_stats()["streams_cancelled"] == 1)
+
+
+def test_cancelled_caller_does_not_cancel_shared_call(stub_server, make_client):
+    base_url, stub_stats = stub_server(latency_seconds=0.5)
+    client = make_client(base_url)
+
+    async def run():
+        leaving = asyncio.ensure_future(client.achat("key", payload("shared question")))
+        staying = asyncio.ensure_future(client.achat("key", payload("shared question")))
+        await asyncio.sleep(0.1)
+        leaving.cancel()
+        return await staying, leaving.cancelled()
+
+    response, cancelled = asyncio.run(run())
+
+    assert cancelled
+    assert response["choices"][0]["message"]["content"] == "Stub answer from stub-model: shared question"
+    assert stub_stats()["requests"] == 1
@@ -0,0 +1,51 @@
+import time
+
+from langchain_core.documents import Document
+
+from rerank import CrossEncoderReranker
+
+
+class SlowModel:
+    """Cross-encoder stand-in: scores a chunk by its number, taking a fixed time per pair"""
+
+    def __init__(self, seconds_per_pair):
+        self.seconds_per_pair = seconds_per_pair
+        self.pairs = 0
+
+    def predict(self, pairs, batch_size=None):
+        time.sleep(self.seconds_per_pair * len(pairs))
+        self.pairs += len(pairs)
+        return [float(text.split()[-1]) for _, text in pairs]
+
+
+def candidates(count):
+    return [Document(page_content=f"chunk {i}") for i in range(count)]
+
+
+def test_candidates_are_ranked_by_score_within_the_budget():
+    reranker = CrossEncoderReranker(SlowModel(0.001), batch_size=4)
+
+    kept, report = reranker.rerank("query", candidates(10), top_n=3, budget_ms=1000)
+
+    assert [d.page_content for d in kept] == ["chunk 9", "chunk 8", "chunk 7"]
+    assert report["scored"] == 10
+    assert not report["fallback"]
+
+
+def test_budget_caps_the_batches_and_unscored_chunks_keep_retriever_order():
+    model = SlowModel(0.01)
+    reranker = CrossEncoderReranker(model, batch_size=16)
+
+    kept, report = reranker.rerank("query", candidates(40), top_n=40, budget_ms=100)
+
+    # No batch was started that the measured throughput said would overrun
+    assert report["seconds"] < 0.1 + 5 * model.seconds_per_pair
+    assert report["fallback"]
+    assert 0 < report["scored"] == model.pairs < 40
+    scored = report["scored"]
+    assert [d.page_content for d in kept[:scored]] == [f"chunk {i}" for i in reversed(range(scored))]
+    assert [d.page_content for d in kept[scored:]] == [f"chunk {i}" for i in range(scored, 40)]
+
+    # Scores computed before the budget ran out are reused by the next call
+    _, again = reranker.rerank("query", candidates(40), top_n=4, budget_ms=100)
+    assert again["cached"] == scored